@@ -137,7 +137,7 @@ export const getApiErrorMessage = (error: unknown, fallback: string) => {
   return friendly ?? detail ?? fallback;
 };
 
-export async function apiFetch<T>(path: string, options?: RequestInit): Promise<T> {
+async function apiResponse(path: string, options?: RequestInit): Promise<Response> {
   const token = getStoredToken();
   const response = await fetch(`${apiBaseUrl}${path}`, {
     headers: {
@@ -159,7 +159,27 @@ export async function apiFetch<T>(path: string, options?: RequestInit): Promise<
     }
     throw new ApiError(response.status, detail);
   }
-  return (await response.json()) as T;
+  return response;
+}
+
+export async function apiFetch<T>(path: string, options?: RequestInit): Promise<T> {
+  return (await (await apiResponse(path, options)).json()) as T;
+}
+
+// Paginated lists return one page per request and the next page's cursor in
+// the X-Next-Cursor header; follow it until the last page.
+export async function apiFetchAllPages<T>(path: string): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const separator = path.includes("?") ? "&" : "?";
+    const response = await apiResponse(
+      cursor ? `${path}${separator}cursor=${encodeURIComponent(cursor)}` : path,
+    );
+    items.push(...((await response.json()) as T[]));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return items;
 }
 
 export const createSubject = async (name: string) => {
@@ -220,7 +240,7 @@ export const createNote = async (payload: {
 };
 
 export const fetchNoteStrokes = async (noteId: number) => {
-  return apiFetch<NoteStroke[]>(`/api/notes/${noteId}/strokes`);
+  return apiFetchAllPages<NoteStroke>(`/api/notes/${noteId}/strokes`);
 };
 
 export const enqueueNoteOcr = async (noteId: number) => {
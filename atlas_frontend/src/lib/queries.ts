@@ -1,6 +1,7 @@
 import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query";
 import {
   apiFetch,
+  apiFetchAllPages,
   changePassword,
   createNotebook,
   createNote,
@@ -37,7 +38,7 @@ export const useSubjectNotebooks = (subjectId?: string) => {
 export const useNotebookNotes = (notebookId?: string) => {
   return useQuery({
     queryKey: ["notebooks", notebookId, "notes"],
-    queryFn: () => apiFetch<NoteSummary[]>(`/api/notebooks/${notebookId}/notes`),
+    queryFn: () => apiFetchAllPages<NoteSummary>(`/api/notebooks/${notebookId}/notes`),
     enabled: Boolean(notebookId),
   });
 };
@@ -0,0 +1,93 @@
+"""Pack note stroke payloads into the binary columnar format.
+
+Revision ID: 0003_pack_note_stroke_payloads
+Revises: 0002_add_inbox_and_ocr_fields
+Create Date: 2025-03-03 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from strokes.codec import is_packed, pack_stroke_batch, stroke_batch_to_json, unpack_stroke_batch
+
+revision = "0003_pack_note_stroke_payloads"
+down_revision = "0002_add_inbox_and_ocr_fields"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def _column_type(table_name: str, column_name: str):
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for column in inspector.get_columns(table_name):
+        if column["name"] == column_name:
+            return column["type"]
+    return None
+
+
+def _convert_rows(source: str, target: str, convert) -> None:
+    bind = op.get_bind()
+    table = sa.table(
+        "note_strokes",
+        sa.column("id", sa.Integer),
+        sa.column(source),
+        sa.column(target),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c[source])
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            table.update()
+            .where(table.c.id == sa.bindparam("row_id"))
+            .values({target: sa.bindparam("converted")}),
+            [{"row_id": row_id, "converted": convert(value)} for row_id, value in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def _pack(value) -> bytes:
+    if is_packed(value):
+        return bytes(value)
+    return pack_stroke_batch(unpack_stroke_batch(value))
+
+
+def _unpack(value) -> str:
+    batch = unpack_stroke_batch(value)
+    if batch.raw is not None:
+        return batch.raw
+    return stroke_batch_to_json(batch)
+
+
+def _swap_payload_column(new_type, convert) -> None:
+    op.add_column("note_strokes", sa.Column("payload_converted", new_type, nullable=True))
+    _convert_rows("payload", "payload_converted", convert)
+    with op.batch_alter_table("note_strokes") as batch_op:
+        batch_op.drop_column("payload")
+        batch_op.alter_column(
+            "payload_converted",
+            new_column_name="payload",
+            existing_type=new_type,
+            nullable=False,
+        )
+
+
+def upgrade() -> None:
+    if isinstance(_column_type("note_strokes", "payload"), sa.LargeBinary):
+        return
+    _swap_payload_column(sa.LargeBinary(), _pack)
+
+
+def downgrade() -> None:
+    if not isinstance(_column_type("note_strokes", "payload"), sa.LargeBinary):
+        return
+    _swap_payload_column(sa.Text(), _unpack)
+
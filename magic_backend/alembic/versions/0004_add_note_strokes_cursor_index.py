@@ -0,0 +1,32 @@
+"""Add the (note_id, id) index used by incremental stroke reads.
+
+Revision ID: 0004_add_note_strokes_cursor_index
+Revises: 0003_pack_note_stroke_payloads
+Create Date: 2025-03-10 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_add_note_strokes_cursor_index"
+down_revision = "0003_pack_note_stroke_payloads"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_note_strokes_note_id_id"
+
+
+def _index_exists(table_name: str, index_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return any(index["name"] == index_name for index in inspector.get_indexes(table_name))
+
+
+def upgrade() -> None:
+    if not _index_exists("note_strokes", INDEX_NAME):
+        op.create_index(INDEX_NAME, "note_strokes", ["note_id", "id"])
+
+
+def downgrade() -> None:
+    if _index_exists("note_strokes", INDEX_NAME):
+        op.drop_index(INDEX_NAME, table_name="note_strokes")
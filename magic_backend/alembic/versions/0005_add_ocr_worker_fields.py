@@ -0,0 +1,46 @@
+"""Add OCR worker claim and heartbeat fields to ai_jobs.
+
+Revision ID: 0005_add_ocr_worker_fields
+Revises: 0004_add_note_strokes_cursor_index
+Create Date: 2025-03-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_add_ocr_worker_fields"
+down_revision = "0004_add_note_strokes_cursor_index"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(table_name: str, column_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = [column["name"] for column in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+def upgrade() -> None:
+    if not _column_exists("ai_jobs", "worker_id"):
+        op.add_column("ai_jobs", sa.Column("worker_id", sa.String(), nullable=True))
+    if not _column_exists("ai_jobs", "heartbeat_at"):
+        op.add_column("ai_jobs", sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+    if not _column_exists("ai_jobs", "attempts"):
+        op.add_column(
+            "ai_jobs",
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+
+def _drop_column_if_exists(table_name: str, column_name: str) -> None:
+    if not _column_exists(table_name, column_name):
+        return
+    with op.batch_alter_table(table_name) as batch_op:
+        batch_op.drop_column(column_name)
+
+
+def downgrade() -> None:
+    _drop_column_if_exists("ai_jobs", "attempts")
+    _drop_column_if_exists("ai_jobs", "heartbeat_at")
+    _drop_column_if_exists("ai_jobs", "worker_id")
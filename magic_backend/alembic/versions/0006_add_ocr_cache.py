@@ -0,0 +1,50 @@
+"""Add the ocr_cache table for reusing OCR results of unchanged stroke sets.
+
+Revision ID: 0006_add_ocr_cache
+Revises: 0005_add_ocr_worker_fields
+Create Date: 2025-03-24 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_add_ocr_cache"
+down_revision = "0005_add_ocr_worker_fields"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    if _table_exists("ocr_cache"):
+        return
+    op.create_table(
+        "ocr_cache",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("stroke_hash", sa.String(length=64), nullable=False),
+        sa.Column("engine", sa.String(), nullable=False),
+        sa.Column("engine_version", sa.String(), nullable=False),
+        sa.Column("ocr_text", sa.Text(), nullable=False, server_default=""),
+        sa.Column("ocr_confidence", sa.Float(), nullable=True),
+        sa.Column("hit_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("last_used_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint(
+            "stroke_hash", "engine", "engine_version", name="uq_ocr_cache_key"
+        ),
+    )
+    op.create_index("ix_ocr_cache_id", "ocr_cache", ["id"])
+    op.create_index("ix_ocr_cache_last_used_at", "ocr_cache", ["last_used_at"])
+
+
+def downgrade() -> None:
+    if not _table_exists("ocr_cache"):
+        return
+    op.drop_index("ix_ocr_cache_last_used_at", table_name="ocr_cache")
+    op.drop_index("ix_ocr_cache_id", table_name="ocr_cache")
+    op.drop_table("ocr_cache")
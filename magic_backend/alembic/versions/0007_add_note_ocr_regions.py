@@ -0,0 +1,55 @@
+"""Add note_ocr_regions for incremental, per-line OCR results.
+
+Revision ID: 0007_add_note_ocr_regions
+Revises: 0006_add_ocr_cache
+Create Date: 2025-03-31 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_add_note_ocr_regions"
+down_revision = "0006_add_ocr_cache"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    if _table_exists("note_ocr_regions"):
+        return
+    op.create_table(
+        "note_ocr_regions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "note_id",
+            sa.Integer(),
+            sa.ForeignKey("notes.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("stroke_key", sa.String(length=64), nullable=False),
+        sa.Column("min_x", sa.Float(), nullable=False),
+        sa.Column("min_y", sa.Float(), nullable=False),
+        sa.Column("max_x", sa.Float(), nullable=False),
+        sa.Column("max_y", sa.Float(), nullable=False),
+        sa.Column("ocr_text", sa.Text(), nullable=False, server_default=""),
+        sa.Column("ocr_confidence", sa.Float(), nullable=True),
+        sa.Column("engine", sa.String(), nullable=False),
+        sa.Column("engine_version", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_note_ocr_regions_id", "note_ocr_regions", ["id"])
+    op.create_index("ix_note_ocr_regions_note_id", "note_ocr_regions", ["note_id"])
+
+
+def downgrade() -> None:
+    if not _table_exists("note_ocr_regions"):
+        return
+    op.drop_index("ix_note_ocr_regions_note_id", table_name="note_ocr_regions")
+    op.drop_index("ix_note_ocr_regions_id", table_name="note_ocr_regions")
+    op.drop_table("note_ocr_regions")
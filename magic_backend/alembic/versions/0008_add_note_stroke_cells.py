@@ -0,0 +1,97 @@
+"""Add the note_stroke_cells spatial index and backfill it.
+
+Revision ID: 0008_add_note_stroke_cells
+Revises: 0007_add_note_ocr_regions
+Create Date: 2025-04-07 00:00:00.000000
+
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+from strokes import index_cells, unpack_stroke_batch
+
+revision = "0008_add_note_stroke_cells"
+down_revision = "0007_add_note_ocr_regions"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+# Same knobs as settings.py, read directly so migrations don't need API secrets.
+STROKE_INDEX_CELL_SIZE = float(os.environ.get("STROKE_INDEX_CELL_SIZE", "512"))
+STROKE_INDEX_MAX_CELLS = int(os.environ.get("STROKE_INDEX_MAX_CELLS", "64"))
+
+
+def _table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def _backfill() -> None:
+    bind = op.get_bind()
+    strokes = sa.table(
+        "note_strokes",
+        sa.column("id", sa.Integer),
+        sa.column("note_id", sa.Integer),
+        sa.column("payload", sa.LargeBinary),
+    )
+    cells = sa.table(
+        "note_stroke_cells",
+        sa.column("note_id", sa.Integer),
+        sa.column("cell_x", sa.Integer),
+        sa.column("cell_y", sa.Integer),
+        sa.column("stroke_id", sa.Integer),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(strokes.c.id, strokes.c.note_id, strokes.c.payload)
+            .where(strokes.c.id > last_id, strokes.c.note_id.is_not(None))
+            .order_by(strokes.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        entries = [
+            {"note_id": note_id, "cell_x": cell_x, "cell_y": cell_y, "stroke_id": stroke_id}
+            for stroke_id, note_id, payload in rows
+            for cell_x, cell_y in index_cells(
+                unpack_stroke_batch(payload), STROKE_INDEX_CELL_SIZE, STROKE_INDEX_MAX_CELLS
+            )
+        ]
+        if entries:
+            bind.execute(cells.insert(), entries)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    if _table_exists("note_stroke_cells"):
+        return
+    op.create_table(
+        "note_stroke_cells",
+        sa.Column(
+            "note_id",
+            sa.Integer(),
+            sa.ForeignKey("notes.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("cell_x", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("cell_y", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column(
+            "stroke_id",
+            sa.Integer(),
+            sa.ForeignKey("note_strokes.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+    )
+    op.create_index("ix_note_stroke_cells_stroke_id", "note_stroke_cells", ["stroke_id"])
+    _backfill()
+
+
+def downgrade() -> None:
+    if not _table_exists("note_stroke_cells"):
+        return
+    op.drop_index("ix_note_stroke_cells_stroke_id", table_name="note_stroke_cells")
+    op.drop_table("note_stroke_cells")
@@ -0,0 +1,56 @@
+"""Add note_stroke_lods for cached level-of-detail stroke payloads.
+
+Revision ID: 0009_add_note_stroke_lods
+Revises: 0008_add_note_stroke_cells
+Create Date: 2025-04-14 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_add_note_stroke_lods"
+down_revision = "0008_add_note_stroke_cells"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    if _table_exists("note_stroke_lods"):
+        return
+    op.create_table(
+        "note_stroke_lods",
+        sa.Column(
+            "stroke_id",
+            sa.Integer(),
+            sa.ForeignKey("note_strokes.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("lod", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column(
+            "note_id",
+            sa.Integer(),
+            sa.ForeignKey("notes.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("tolerance", sa.Float(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("point_count", sa.Integer(), nullable=False),
+        sa.Column("byte_size", sa.Integer(), nullable=False),
+        sa.Column("source_point_count", sa.Integer(), nullable=False),
+        sa.Column("source_byte_size", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_note_stroke_lods_note_id", "note_stroke_lods", ["note_id"])
+
+
+def downgrade() -> None:
+    if not _table_exists("note_stroke_lods"):
+        return
+    op.drop_index("ix_note_stroke_lods_note_id", table_name="note_stroke_lods")
+    op.drop_table("note_stroke_lods")
@@ -0,0 +1,40 @@
+"""Add thumbnail fields to notes.
+
+Revision ID: 0010_add_note_thumbnails
+Revises: 0009_add_note_stroke_lods
+Create Date: 2025-04-21 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_add_note_thumbnails"
+down_revision = "0009_add_note_stroke_lods"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(table_name: str, column_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = [column["name"] for column in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+def upgrade() -> None:
+    if not _column_exists("notes", "thumbnail_key"):
+        op.add_column("notes", sa.Column("thumbnail_key", sa.String(), nullable=True))
+    if not _column_exists("notes", "thumbnail_stroke_id"):
+        op.add_column("notes", sa.Column("thumbnail_stroke_id", sa.Integer(), nullable=True))
+
+
+def _drop_column_if_exists(table_name: str, column_name: str) -> None:
+    if not _column_exists(table_name, column_name):
+        return
+    with op.batch_alter_table(table_name) as batch_op:
+        batch_op.drop_column(column_name)
+
+
+def downgrade() -> None:
+    _drop_column_if_exists("notes", "thumbnail_stroke_id")
+    _drop_column_if_exists("notes", "thumbnail_key")
@@ -0,0 +1,53 @@
+"""Add content-addressed stored_blobs and link note_files to them.
+
+Revision ID: 0011_add_stored_blobs
+Revises: 0010_add_note_thumbnails
+Create Date: 2025-04-28 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_add_stored_blobs"
+down_revision = "0010_add_note_thumbnails"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def _column_exists(table_name: str, column_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = [column["name"] for column in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+def upgrade() -> None:
+    if not _table_exists("stored_blobs"):
+        op.create_table(
+            "stored_blobs",
+            sa.Column("digest", sa.String(length=64), primary_key=True),
+            sa.Column("storage_key", sa.String(), nullable=False),
+            sa.Column("size", sa.BigInteger(), nullable=False),
+            sa.Column("content_type", sa.String(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("touched_at", sa.DateTime(), nullable=False),
+        )
+    if not _column_exists("note_files", "blob_digest"):
+        op.add_column("note_files", sa.Column("blob_digest", sa.String(length=64), nullable=True))
+        op.create_index("ix_note_files_blob_digest", "note_files", ["blob_digest"])
+
+
+def downgrade() -> None:
+    if _column_exists("note_files", "blob_digest"):
+        op.drop_index("ix_note_files_blob_digest", table_name="note_files")
+        with op.batch_alter_table("note_files") as batch_op:
+            batch_op.drop_column("blob_digest")
+    if _table_exists("stored_blobs"):
+        op.drop_table("stored_blobs")
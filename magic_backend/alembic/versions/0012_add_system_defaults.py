@@ -0,0 +1,124 @@
+"""Key provisioned subjects/notebooks and track per-user default provisioning.
+
+Revision ID: 0012_add_system_defaults
+Revises: 0011_add_stored_blobs
+Create Date: 2025-05-06 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012_add_system_defaults"
+down_revision = "0011_add_stored_blobs"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(table_name: str, column_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = [column["name"] for column in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+def _index_exists(table_name: str, index_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return any(index["name"] == index_name for index in inspector.get_indexes(table_name))
+
+
+subjects = sa.table(
+    "subjects",
+    sa.column("id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("user_id", sa.Integer),
+    sa.column("system_key", sa.String),
+)
+notebooks = sa.table(
+    "notebooks",
+    sa.column("id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("user_id", sa.Integer),
+    sa.column("subject_id", sa.Integer),
+    sa.column("is_inbox", sa.Boolean),
+    sa.column("inbox_type", sa.String),
+    sa.column("system_key", sa.String),
+)
+
+
+def _backfill_system_keys() -> None:
+    """Key the defaults created before this revision (the oldest one per user
+    where duplicates exist), so provisioning finds them instead of adding more."""
+    for key, name in (("unsorted", "Unsorted"), ("inbox", "Inbox")):
+        oldest = (
+            sa.select(sa.func.min(subjects.c.id))
+            .where(subjects.c.name == name)
+            .group_by(subjects.c.user_id)
+        )
+        op.execute(
+            subjects.update().where(subjects.c.id.in_(oldest)).values(system_key=key)
+        )
+    oldest_unsorted = (
+        sa.select(sa.func.min(notebooks.c.id))
+        .select_from(notebooks.join(subjects, subjects.c.id == notebooks.c.subject_id))
+        .where(subjects.c.system_key == "unsorted", notebooks.c.name == "Unsorted")
+        .group_by(notebooks.c.user_id)
+    )
+    op.execute(
+        notebooks.update()
+        .where(notebooks.c.id.in_(oldest_unsorted))
+        .values(system_key="unsorted")
+    )
+    oldest_inboxes = (
+        sa.select(sa.func.min(notebooks.c.id))
+        .where(notebooks.c.is_inbox.is_(True), notebooks.c.inbox_type.is_not(None))
+        .group_by(notebooks.c.user_id, notebooks.c.inbox_type)
+    )
+    op.execute(
+        notebooks.update()
+        .where(notebooks.c.id.in_(oldest_inboxes))
+        .values(system_key="inbox:" + notebooks.c.inbox_type)
+    )
+
+
+def upgrade() -> None:
+    if not _column_exists("users", "defaults_version"):
+        op.add_column(
+            "users",
+            sa.Column("defaults_version", sa.Integer(), nullable=False, server_default="0"),
+        )
+    if not _column_exists("subjects", "system_key"):
+        op.add_column("subjects", sa.Column("system_key", sa.String(), nullable=True))
+    if not _column_exists("notebooks", "system_key"):
+        op.add_column("notebooks", sa.Column("system_key", sa.String(), nullable=True))
+    _backfill_system_keys()
+    if not _index_exists("subjects", "uq_subjects_user_id_system_key"):
+        op.create_index(
+            "uq_subjects_user_id_system_key",
+            "subjects",
+            ["user_id", "system_key"],
+            unique=True,
+        )
+    if not _index_exists("notebooks", "uq_notebooks_user_id_system_key"):
+        op.create_index(
+            "uq_notebooks_user_id_system_key",
+            "notebooks",
+            ["user_id", "system_key"],
+            unique=True,
+        )
+
+
+def downgrade() -> None:
+    if _index_exists("notebooks", "uq_notebooks_user_id_system_key"):
+        op.drop_index("uq_notebooks_user_id_system_key", table_name="notebooks")
+    if _index_exists("subjects", "uq_subjects_user_id_system_key"):
+        op.drop_index("uq_subjects_user_id_system_key", table_name="subjects")
+    if _column_exists("notebooks", "system_key"):
+        with op.batch_alter_table("notebooks") as batch_op:
+            batch_op.drop_column("system_key")
+    if _column_exists("subjects", "system_key"):
+        with op.batch_alter_table("subjects") as batch_op:
+            batch_op.drop_column("system_key")
+    if _column_exists("users", "defaults_version"):
+        with op.batch_alter_table("users") as batch_op:
+            batch_op.drop_column("defaults_version")
@@ -0,0 +1,89 @@
+"""Add maintained notebook/note counters for the library endpoints.
+
+Revision ID: 0013_add_library_counters
+Revises: 0012_add_system_defaults
+Create Date: 2025-05-13 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013_add_library_counters"
+down_revision = "0012_add_system_defaults"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(table_name: str, column_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = [column["name"] for column in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+subjects = sa.table(
+    "subjects",
+    sa.column("id", sa.Integer),
+    sa.column("notebook_count", sa.Integer),
+)
+notebooks = sa.table(
+    "notebooks",
+    sa.column("id", sa.Integer),
+    sa.column("subject_id", sa.Integer),
+    sa.column("note_count", sa.Integer),
+    sa.column("notes_updated_at", sa.DateTime),
+)
+notes = sa.table(
+    "notes",
+    sa.column("id", sa.Integer),
+    sa.column("notebook_id", sa.Integer),
+    sa.column("updated_at", sa.DateTime),
+)
+
+
+def _backfill() -> None:
+    op.execute(
+        subjects.update().values(
+            notebook_count=sa.select(sa.func.count(notebooks.c.id))
+            .where(notebooks.c.subject_id == subjects.c.id)
+            .scalar_subquery()
+        )
+    )
+    op.execute(
+        notebooks.update().values(
+            note_count=sa.select(sa.func.count(notes.c.id))
+            .where(notes.c.notebook_id == notebooks.c.id)
+            .scalar_subquery(),
+            notes_updated_at=sa.select(sa.func.max(notes.c.updated_at))
+            .where(notes.c.notebook_id == notebooks.c.id)
+            .scalar_subquery(),
+        )
+    )
+
+
+def upgrade() -> None:
+    if not _column_exists("subjects", "notebook_count"):
+        op.add_column(
+            "subjects",
+            sa.Column("notebook_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+    if not _column_exists("notebooks", "note_count"):
+        op.add_column(
+            "notebooks",
+            sa.Column("note_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+    if not _column_exists("notebooks", "notes_updated_at"):
+        op.add_column("notebooks", sa.Column("notes_updated_at", sa.DateTime(), nullable=True))
+    _backfill()
+
+
+def downgrade() -> None:
+    if _column_exists("notebooks", "notes_updated_at"):
+        with op.batch_alter_table("notebooks") as batch_op:
+            batch_op.drop_column("notes_updated_at")
+    if _column_exists("notebooks", "note_count"):
+        with op.batch_alter_table("notebooks") as batch_op:
+            batch_op.drop_column("note_count")
+    if _column_exists("subjects", "notebook_count"):
+        with op.batch_alter_table("subjects") as batch_op:
+            batch_op.drop_column("notebook_count")
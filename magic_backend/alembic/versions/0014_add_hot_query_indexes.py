@@ -0,0 +1,50 @@
+"""Add composite indexes for the API's hot filters and sorts.
+
+Revision ID: 0014_add_hot_query_indexes
+Revises: 0013_add_library_counters
+Create Date: 2025-05-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0014_add_hot_query_indexes"
+down_revision = "0013_add_library_counters"
+branch_labels = None
+depends_on = None
+
+# (index, table, columns); benchmarks/check_query_plans.py checks the plans
+# they are for.
+INDEXES = [
+    ("ix_subjects_user_id_created_at", "subjects", ["user_id", "created_at"]),
+    ("ix_notebooks_user_id_created_at", "notebooks", ["user_id", "created_at"]),
+    ("ix_notebooks_subject_id_created_at", "notebooks", ["subject_id", "created_at"]),
+    ("ix_notes_notebook_id_updated_at_id", "notes", ["notebook_id", "updated_at", "id"]),
+    (
+        "ix_note_strokes_note_id_created_at_id",
+        "note_strokes",
+        ["note_id", "created_at", "id"],
+    ),
+    ("ix_note_files_note_id_created_at_id", "note_files", ["note_id", "created_at", "id"]),
+    ("ix_flashcards_note_id", "flashcards", ["note_id"]),
+    ("ix_ai_jobs_note_id_job_type_created_at", "ai_jobs", ["note_id", "job_type", "created_at"]),
+    ("ix_ai_jobs_job_type_status_created_at", "ai_jobs", ["job_type", "status", "created_at"]),
+]
+
+
+def _index_exists(table_name: str, index_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return any(index["name"] == index_name for index in inspector.get_indexes(table_name))
+
+
+def upgrade() -> None:
+    for index_name, table_name, columns in INDEXES:
+        if not _index_exists(table_name, index_name):
+            op.create_index(index_name, table_name, columns)
+
+
+def downgrade() -> None:
+    for index_name, table_name, _ in reversed(INDEXES):
+        if _index_exists(table_name, index_name):
+            op.drop_index(index_name, table_name=table_name)
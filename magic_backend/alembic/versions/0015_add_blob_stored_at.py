@@ -0,0 +1,34 @@
+"""Record when a stored blob's object has been written.
+
+Revision ID: 0015_add_blob_stored_at
+Revises: 0014_add_hot_query_indexes
+Create Date: 2025-05-27 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0015_add_blob_stored_at"
+down_revision = "0014_add_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(table_name: str, column_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = [column["name"] for column in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+def upgrade() -> None:
+    # Existing rows stay NULL: whether their object was written is unknown,
+    # so the next upload of those bytes writes it once more and marks it.
+    if not _column_exists("stored_blobs", "stored_at"):
+        op.add_column("stored_blobs", sa.Column("stored_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    if _column_exists("stored_blobs", "stored_at"):
+        with op.batch_alter_table("stored_blobs") as batch_op:
+            batch_op.drop_column("stored_at")
@@ -0,0 +1,64 @@
+"""Track when a stored blob lost its last reference; recount references.
+
+Revision ID: 0016_add_blob_unlinked_at
+Revises: 0015_add_blob_stored_at
+Create Date: 2025-05-27 00:00:00.000000
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0016_add_blob_unlinked_at"
+down_revision = "0015_add_blob_stored_at"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(table_name: str, column_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = [column["name"] for column in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+stored_blobs = sa.table(
+    "stored_blobs",
+    sa.column("digest", sa.String),
+    sa.column("ref_count", sa.Integer),
+    sa.column("unlinked_at", sa.DateTime),
+)
+note_files = sa.table(
+    "note_files",
+    sa.column("id", sa.Integer),
+    sa.column("blob_digest", sa.String),
+)
+
+
+def upgrade() -> None:
+    if not _column_exists("stored_blobs", "unlinked_at"):
+        op.add_column("stored_blobs", sa.Column("unlinked_at", sa.DateTime(), nullable=True))
+    # Until now cascading deletes left ref_count stale and the collector
+    # recounted it; start the maintained counts from the real links. Blobs
+    # with none get a full grace period from now.
+    op.execute(
+        stored_blobs.update()
+        .where(stored_blobs.c.ref_count >= 0)
+        .values(
+            ref_count=sa.select(sa.func.count(note_files.c.id))
+            .where(note_files.c.blob_digest == stored_blobs.c.digest)
+            .scalar_subquery()
+        )
+    )
+    op.execute(
+        stored_blobs.update()
+        .where(stored_blobs.c.ref_count == 0, stored_blobs.c.unlinked_at.is_(None))
+        .values(unlinked_at=datetime.datetime.utcnow())
+    )
+
+
+def downgrade() -> None:
+    if _column_exists("stored_blobs", "unlinked_at"):
+        with op.batch_alter_table("stored_blobs") as batch_op:
+            batch_op.drop_column("unlinked_at")
@@ -0,0 +1,245 @@
+"""Measure API throughput under concurrent clients on the main read endpoints.
+
+Starts the API with uvicorn in a subprocess on a fresh SQLite database,
+seeds one user with a notebook of notes and strokes, then drives
+``GET /api/library``, ``GET /api/notes/{id}`` and ``GET /api/notes/{id}/strokes``
+with ``--concurrency`` clients each and reports requests per second and
+latency percentiles.
+
+Local SQLite answers in microseconds, which hides what a managed Postgres
+round trip costs; ``--db-latency-ms`` adds that delay to every statement, on
+the thread that runs it, as the network would. Set ``DATABASE_URL`` to an
+empty Postgres database to benchmark against the real thing instead (tables
+are created if missing; the latency shim only applies to SQLite).
+
+``--app-dir`` points at another checkout of ``magic_backend/``, which is how
+to compare revisions:
+
+    git worktree add /tmp/before <revision>
+    python benchmarks/bench_load.py --app-dir /tmp/before/magic_backend
+    python benchmarks/bench_load.py
+
+Run from ``magic_backend/``:
+
+    python benchmarks/bench_load.py [--concurrency 32] [--requests 600] [--db-latency-ms 2]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sqlite3
+import sqlite3.dbapi2
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def install_sqlite_latency(latency: float) -> None:
+    """Delay every SQLite statement by ``latency`` seconds.
+
+    SQLAlchemy's sync driver connects through ``sqlite3.dbapi2.connect`` and
+    aiosqlite through ``sqlite3.connect``; wrapping both covers both. The
+    sleep happens on whichever thread executes the statement, like a
+    blocking network read.
+    """
+
+    class SlowCursor(sqlite3.Cursor):
+        def execute(self, *args, **kwargs):
+            time.sleep(latency)
+            return super().execute(*args, **kwargs)
+
+        def executemany(self, *args, **kwargs):
+            time.sleep(latency)
+            return super().executemany(*args, **kwargs)
+
+    class SlowConnection(sqlite3.Connection):
+        def cursor(self, factory=SlowCursor):
+            return super().cursor(factory)
+
+    connect = sqlite3.connect
+
+    def slow_connect(*args, **kwargs):
+        kwargs.setdefault("factory", SlowConnection)
+        return connect(*args, **kwargs)
+
+    sqlite3.connect = sqlite3.dbapi2.connect = slow_connect
+
+
+def serve(app_dir: str, port: int, latency_ms: float) -> None:
+    """Subprocess entry point: create the schema and run the app."""
+    if latency_ms:
+        install_sqlite_latency(latency_ms / 1000)
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+    import uvicorn
+
+    import server
+    from models import Base
+
+    Base.metadata.create_all(server.engine)
+    uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(app_dir: str, latency_ms: float) -> Tuple[subprocess.Popen, str]:
+    workdir = tempfile.mkdtemp(prefix="bench_load_")
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+    env.setdefault("JWT_SECRET", "bench-secret-" + "x" * 32)
+    env["STORAGE_DIR"] = os.path.join(workdir, "storage")
+    # Keep the debounced preview renders out of the measurement.
+    env["THUMBNAIL_DEBOUNCE_SECONDS"] = env["THUMBNAIL_MAX_DELAY_SECONDS"] = "3600"
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--serve",
+            "--app-dir",
+            app_dir,
+            "--port",
+            str(port),
+            "--db-latency-ms",
+            str(latency_ms),
+        ],
+        env=env,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_until_up(client, process: subprocess.Popen) -> None:
+    for _ in range(200):
+        if process.poll() is not None:
+            raise RuntimeError("API process exited during startup")
+        try:
+            await client.get("/api/auth/me")
+            return
+        except Exception:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("API did not start")
+
+
+def stroke_payload(seed: int, strokes: int, points: int) -> Dict:
+    return {
+        "strokes": [
+            {
+                "points": [
+                    {"x": (seed * 37 + stroke * 11 + point) % 1000, "y": stroke * 20 + point % 7, "p": 0.5}
+                    for point in range(points)
+                ]
+            }
+            for stroke in range(strokes)
+        ]
+    }
+
+
+async def seed(client, notes: int, stroke_rows: int) -> Tuple[Dict[str, str], List[int]]:
+    response = await client.post(
+        "/api/auth/signup", json={"email": "bench@example.com", "password": "benchmark"}
+    )
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    note_ids = []
+    for index in range(notes):
+        response = await client.post(
+            "/api/notes", json={"title": f"Bench {index}"}, headers=headers
+        )
+        response.raise_for_status()
+        note_id = response.json()["id"]
+        note_ids.append(note_id)
+        batches = [
+            {"note_id": note_id, **stroke_payload(row, strokes=4, points=40)}
+            for row in range(stroke_rows)
+        ]
+        (await client.post("/api/strokes/bulk", json={"batches": batches}, headers=headers)).raise_for_status()
+    return headers, note_ids
+
+
+async def drive(client, paths: List[str], headers: Dict[str, str], concurrency: int) -> Tuple[float, List[float]]:
+    queue = list(reversed(paths))
+    latencies: List[float] = []
+
+    async def worker() -> None:
+        while queue:
+            path = queue.pop()
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def bench(args: argparse.Namespace) -> None:
+    import httpx
+
+    process, base_url = spawn_server(os.path.abspath(args.app_dir), args.db_latency_ms)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            await wait_until_up(client, process)
+            headers, note_ids = await seed(client, args.notes, args.stroke_rows)
+            endpoints = {
+                "library": lambda index: "/api/library",
+                "note": lambda index: f"/api/notes/{note_ids[index % len(note_ids)]}",
+                "strokes": lambda index: f"/api/notes/{note_ids[index % len(note_ids)]}/strokes",
+            }
+            print(
+                f"app={args.app_dir} concurrency={args.concurrency} "
+                f"db_latency_ms={args.db_latency_ms:g}"
+            )
+            print(f"{'endpoint':<9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+            for name, build_path in endpoints.items():
+                # Warm up connections and caches before measuring.
+                await drive(client, [build_path(i) for i in range(args.concurrency)], headers, args.concurrency)
+                elapsed, latencies = await drive(
+                    client, [build_path(i) for i in range(args.requests)], headers, args.concurrency
+                )
+                print(
+                    f"{name:<9} {args.requests / elapsed:>8.0f} "
+                    f"{statistics.median(latencies) * 1000:>8.1f} "
+                    f"{percentile(latencies, 0.99) * 1000:>8.1f}"
+                )
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app-dir", default=APP_DIR)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=600, help="requests per endpoint")
+    parser.add_argument("--notes", type=int, default=20)
+    parser.add_argument("--stroke-rows", type=int, default=20, help="stroke batches per note")
+    parser.add_argument(
+        "--db-latency-ms", type=float, default=2.0, help="simulated database round trip (SQLite)"
+    )
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.app_dir, args.port, args.db_latency_ms)
+        return
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Measure login latency under a burst, and what it does to stroke uploads.
+
+Starts the API like ``bench_load.py``, signs up ``--users`` accounts, then
+fires ``--logins`` logins from ``--concurrency`` clients while a few other
+clients keep posting stroke batches. Reports login p50/p99 (and how many
+were turned away with 503) next to the stroke upload latency and status
+codes during the burst, which is where a blocked event loop shows up.
+
+Run from ``magic_backend/`` (``--app-dir`` compares another checkout):
+
+    python benchmarks/bench_login.py [--logins 64] [--concurrency 32] [--rounds 12]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from bench_load import APP_DIR, percentile, spawn_server, stroke_payload, wait_until_up
+
+
+async def signup(client, email: str) -> Dict[str, str]:
+    response = await client.post("/api/auth/signup", json={"email": email, "password": "benchmark"})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def bench(args: argparse.Namespace) -> None:
+    import httpx
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    process, base_url = spawn_server(os.path.abspath(args.app_dir), args.db_latency_ms)
+    limits = httpx.Limits(max_connections=args.concurrency + args.uploaders)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300) as client:
+            await wait_until_up(client, process)
+            emails = [f"bench{index}@example.com" for index in range(args.users)]
+            for email in emails:
+                await signup(client, email)
+            headers = await signup(client, "uploader@example.com")
+            note_id = (
+                await client.post("/api/notes", json={"title": "Burst"}, headers=headers)
+            ).json()["id"]
+
+            login_latencies: List[float] = []
+            upload_latencies: List[float] = []
+            statuses: Dict[int, int] = {}
+            upload_statuses: Dict[int, int] = {}
+            queue = list(range(args.logins))
+            burst_over = asyncio.Event()
+
+            async def login_worker() -> None:
+                while queue:
+                    email = emails[queue.pop() % len(emails)]
+                    start = time.perf_counter()
+                    response = await client.post(
+                        "/api/auth/login", json={"email": email, "password": "benchmark"}
+                    )
+                    login_latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            async def upload_worker(seed: int) -> None:
+                while not burst_over.is_set():
+                    start = time.perf_counter()
+                    response = await client.post(
+                        f"/api/notes/{note_id}/strokes",
+                        json=stroke_payload(seed, strokes=2, points=40),
+                        headers=headers,
+                    )
+                    upload_latencies.append(time.perf_counter() - start)
+                    upload_statuses[response.status_code] = (
+                        upload_statuses.get(response.status_code, 0) + 1
+                    )
+                    await asyncio.sleep(0.05)
+
+            uploaders = [asyncio.ensure_future(upload_worker(seed)) for seed in range(args.uploaders)]
+            start = time.perf_counter()
+            await asyncio.gather(*(login_worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - start
+            burst_over.set()
+            await asyncio.gather(*uploaders)
+
+            metrics = await client.get("/api/metrics/password-hashing")
+            print(
+                f"app={args.app_dir} rounds={args.rounds} logins={args.logins} "
+                f"concurrency={args.concurrency} uploaders={args.uploaders}"
+            )
+            print(
+                f"login statuses {dict(sorted(statuses.items()))}, "
+                f"stroke upload statuses {dict(sorted(upload_statuses.items()))}, "
+                f"{args.logins / elapsed:.1f} logins/s"
+            )
+            print(f"{'':<8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+            for name, values in (("login", login_latencies), ("strokes", upload_latencies)):
+                if not values:
+                    continue
+                print(
+                    f"{name:<8} {statistics.median(values) * 1000:>8.0f} "
+                    f"{percentile(values, 0.99) * 1000:>8.0f} {max(values) * 1000:>8.0f}"
+                )
+            if metrics.status_code == 200:
+                print("hashing", metrics.json())
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app-dir", default=APP_DIR)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--uploaders", type=int, default=4, help="clients posting strokes meanwhile")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS for the API")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Compare the NumPy stroke normalizer with the original per-point loop.
+
+Two timings are reported per payload: normalization alone, and the whole
+ingest step (normalize + encode for ``NoteStroke.payload``), which was
+``json.dumps`` of the normalized dicts before and is now the packed codec.
+
+Run from ``magic_backend/``:
+
+    python benchmarks/bench_normalize.py [--repeat 3]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from strokes.codec import batch_to_normalized, pack_stroke_batch  # noqa: E402
+from strokes.normalize import normalize_stroke_batch  # noqa: E402
+
+POINT_COUNTS = (10_000, 100_000, 1_000_000)
+POINTS_PER_STROKE = 250
+
+
+def legacy_normalize_stroke_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """The per-point loop that ``server.py`` used before ``strokes.normalize``."""
+    strokes = payload.get("strokes") or []
+    normalized_strokes: List[Dict[str, Any]] = []
+
+    for stroke in strokes:
+        if not isinstance(stroke, dict):
+            continue
+        candidates = stroke.get("points") or stroke.get("path") or stroke.get("segments")
+        if isinstance(stroke.get("x"), list) and isinstance(stroke.get("y"), list):
+            candidates = list(zip(stroke.get("x"), stroke.get("y")))
+
+        normalized_points: List[Dict[str, Any]] = []
+        if candidates:
+            for point in candidates:
+                x = y = None
+                pressure = tilt = dt = None
+                if isinstance(point, dict):
+                    x = point.get("x")
+                    y = point.get("y")
+                    pressure = point.get("p", point.get("pressure"))
+                    tilt = point.get("t", point.get("tilt"))
+                    dt = point.get("dt")
+                elif isinstance(point, (list, tuple)) and len(point) >= 2:
+                    x, y = point[0], point[1]
+                if x is None or y is None:
+                    continue
+                normalized_point: Dict[str, Any] = {
+                    "x": float(x),
+                    "y": float(y),
+                    "pressure": None if pressure is None else float(pressure),
+                    "tilt": None if tilt is None else float(tilt),
+                }
+                if dt is not None:
+                    try:
+                        normalized_point["dt"] = int(dt)
+                    except (TypeError, ValueError):
+                        pass
+                normalized_points.append(normalized_point)
+
+        normalized_stroke = dict(stroke)
+        normalized_stroke["points"] = normalized_points
+        normalized_strokes.append(normalized_stroke)
+
+    normalized_payload = dict(payload)
+    normalized_payload["strokes"] = normalized_strokes
+    return normalized_payload
+
+
+def make_payload(point_count: int, shape: str, seed: int = 7) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    strokes: List[Dict[str, Any]] = []
+    remaining = point_count
+    while remaining > 0:
+        size = min(POINTS_PER_STROKE, remaining)
+        remaining -= size
+        x, y = rng.uniform(0, 2000), rng.uniform(0, 3000)
+        points: List[Any] = []
+        for _ in range(size):
+            x += rng.uniform(-3, 3)
+            y += rng.uniform(-3, 3)
+            if shape == "points":
+                points.append(
+                    {
+                        "x": round(x, 1),
+                        "y": round(y, 1),
+                        "p": round(rng.random(), 3),
+                        "t": round(rng.random(), 3),
+                        "dt": rng.randint(4, 20),
+                    }
+                )
+            else:
+                points.append([round(x, 1), round(y, 1)])
+        if shape == "xy":
+            strokes.append(
+                {"x": [point[0] for point in points], "y": [point[1] for point in points]}
+            )
+        else:
+            strokes.append({shape: points, "width": 2})
+    return {"strokes": strokes, "captured_at": "2025-01-01T00:00:00"}
+
+
+def legacy_ingest(payload: Dict[str, Any]) -> str:
+    return json.dumps(legacy_normalize_stroke_payload(payload))
+
+
+def packed_ingest(payload: Dict[str, Any]) -> bytes:
+    return pack_stroke_batch(normalize_stroke_batch(payload))
+
+
+def best_of(repeat: int, func, payload: Dict[str, Any]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(payload)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--shapes", default="points,path,xy")
+    args = parser.parse_args()
+
+    print(
+        f"{'shape':<7} {'points':>9} {'legacy s':>10} {'numpy s':>10} {'speedup':>8}"
+        f" {'ingest legacy s':>16} {'ingest packed s':>16} {'speedup':>8}"
+    )
+    for shape in args.shapes.split(","):
+        for point_count in POINT_COUNTS:
+            payload = make_payload(point_count, shape)
+            expected = legacy_normalize_stroke_payload(payload)
+            if batch_to_normalized(normalize_stroke_batch(payload)) != expected:
+                raise SystemExit(f"Output mismatch for shape={shape} points={point_count}")
+            legacy = best_of(args.repeat, legacy_normalize_stroke_payload, payload)
+            vectorized = best_of(args.repeat, normalize_stroke_batch, payload)
+            ingest_legacy = best_of(args.repeat, legacy_ingest, payload)
+            ingest_packed = best_of(args.repeat, packed_ingest, payload)
+            print(
+                f"{shape:<7} {point_count:>9} {legacy:>10.4f} {vectorized:>10.4f}"
+                f" {legacy / vectorized:>7.1f}x"
+                f" {ingest_legacy:>16.4f} {ingest_packed:>16.4f}"
+                f" {ingest_legacy / ingest_packed:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Compare the tiled grayscale OCR renderer with the old full-canvas RGB render.
+
+Each case runs in a fresh process so peak RSS is attributable to it. Two
+kinds of notes are generated: ``page`` fills the canvas with handwriting-like
+strokes, ``stray`` is a small note plus one point far away (the case that
+used to allocate a canvas for the empty space in between).
+
+Run from ``magic_backend/``:
+
+    python benchmarks/bench_render.py [--sizes 10000,20000,40000] [--legacy-max 10000]
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from strokes.raster import iter_stroke_tiles, layout_tiles  # noqa: E402
+from strokes.regions import PlacedStroke, place_stroke, union_bounds  # noqa: E402
+
+STROKES_PER_MEGAPIXEL = 20
+POINTS_PER_STROKE = 40
+TILE_SIZE = 2048
+
+
+def make_strokes(size: int, kind: str, seed: int = 7) -> List[PlacedStroke]:
+    rng = np.random.default_rng(seed)
+    extent = size if kind == "page" else 1500
+    count = max(1, int(extent * extent / 1_000_000 * STROKES_PER_MEGAPIXEL))
+    strokes = []
+    for index in range(count):
+        start = rng.uniform(0, extent, 2)
+        steps = rng.normal(0, 4, (POINTS_PER_STROKE, 2))
+        points = np.clip(start + np.cumsum(steps, axis=0), 0, extent)
+        strokes.append(place_stroke((index, 0), points[:, 0], points[:, 1], 3))
+    if kind == "stray":
+        far = np.array([float(size)])
+        strokes.append(place_stroke((count, 0), far, far, 3))
+    return strokes
+
+
+def legacy_render(strokes: List[PlacedStroke]) -> int:
+    """The single-canvas RGB render ``server.py`` used before tiling."""
+    from PIL import Image, ImageDraw
+
+    min_x, min_y, max_x, max_y = union_bounds([stroke.bounds for stroke in strokes])
+    padding = 20
+    width = max(1, int(math.ceil(max_x - min_x + padding * 2)))
+    height = max(1, int(math.ceil(max_y - min_y + padding * 2)))
+    image = Image.new("RGB", (width, height), color="white")
+    draw = ImageDraw.Draw(image)
+    offset = np.array([padding - min_x, padding - min_y])
+    for stroke in strokes:
+        translated = (stroke.points + offset).ravel().tolist()
+        if len(translated) == 2:
+            x, y = translated
+            draw.ellipse((x - 3, y - 3, x + 3, y + 3), fill="black")
+        else:
+            draw.line(translated, fill="black", width=stroke.width, joint="curve")
+    return np.asarray(image).nbytes
+
+
+def tiled_render(strokes: List[PlacedStroke]) -> int:
+    layout = layout_tiles(strokes, TILE_SIZE)
+    total = 0
+    for tile in iter_stroke_tiles(layout):
+        total += tile.pixels.nbytes
+    return total
+
+
+def run_case(queue, mode: str, size: int, kind: str) -> None:
+    strokes = make_strokes(size, kind)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    pixels = (legacy_render if mode == "legacy" else tiled_render)(strokes)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, (peak - baseline) / 1024, pixels / 1e6))
+
+
+def measure(mode: str, size: int, kind: str) -> Tuple[float, float, float]:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_case, args=(queue, mode, size, kind))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,20000,40000")
+    parser.add_argument("--kinds", default="page,stray")
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=10000,
+        help="skip the full-canvas render above this size (it needs size*size*3 bytes)",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'kind':<6} {'canvas':>7} {'mode':<7} {'seconds':>8}"
+        f" {'peak MB':>9} {'pixels MB':>10}"
+    )
+    for kind in args.kinds.split(","):
+        for size in map(int, args.sizes.split(",")):
+            for mode in ("legacy", "tiled"):
+                if mode == "legacy" and size > args.legacy_max:
+                    print(f"{kind:<6} {size:>7} {mode:<7} {'skipped':>8}")
+                    continue
+                elapsed, peak_mb, pixel_mb = measure(mode, size, kind)
+                print(
+                    f"{kind:<6} {size:>7} {mode:<7} {elapsed:>8.2f}"
+                    f" {peak_mb:>9.1f} {pixel_mb:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
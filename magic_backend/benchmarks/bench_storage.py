@@ -0,0 +1,139 @@
+"""Measure storage backend throughput under concurrent requests.
+
+Compares the local backend with the S3 backend at several connection pool
+sizes (botocore's default is 10). By default the S3 side talks to the
+stand-in from ``fake_s3.py``, started as a subprocess with ``--latency-ms``
+of simulated round trip; set ``S3_ENDPOINT_URL`` (plus ``S3_BUCKET``, ``S3_ACCESS_KEY_ID``
+and ``S3_SECRET_ACCESS_KEY``) to benchmark a real MinIO or bucket instead.
+
+Run from ``magic_backend/``:
+
+    python benchmarks/bench_storage.py [--objects 400] [--size 65536] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from blobstore import LocalStorage, S3Storage, StorageBackend  # noqa: E402
+
+FAKE_S3 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_s3.py")
+
+
+def spawn_fake_s3(latency_ms: float) -> Tuple[subprocess.Popen, str]:
+    """Run the stand-in in its own process so it does not share our GIL."""
+    process = subprocess.Popen(
+        [sys.executable, FAKE_S3, "--port", "0", "--latency-ms", str(latency_ms)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    endpoint_url = process.stdout.readline().split()[-1]
+    return process, endpoint_url
+
+
+async def run_concurrently(
+    count: int, concurrency: int, operation: Callable[[int], "asyncio.Future"]
+) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(index: int) -> None:
+        async with semaphore:
+            await operation(index)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(index) for index in range(count)))
+    return time.perf_counter() - start
+
+
+async def bench_backend(
+    backend: StorageBackend, objects: int, size: int, concurrency: int
+) -> List[Tuple[str, float]]:
+    payload = os.urandom(size)
+    keys = [f"bench/{index:06d}" for index in range(objects)]
+    results = []
+    elapsed = await run_concurrently(
+        objects,
+        concurrency,
+        lambda index: backend.put_bytes(keys[index], payload, "application/octet-stream"),
+    )
+    results.append(("put", elapsed))
+    elapsed = await run_concurrently(objects, concurrency, lambda index: backend.get_bytes(keys[index]))
+    results.append(("get", elapsed))
+    elapsed = await run_concurrently(objects, concurrency, lambda index: backend.exists(keys[index]))
+    results.append(("exists", elapsed))
+    elapsed = await run_concurrently(objects, concurrency, lambda index: backend.delete(keys[index]))
+    results.append(("delete", elapsed))
+    return results
+
+
+def s3_backend(endpoint_url: str, bucket: str, pool: int) -> S3Storage:
+    backend = S3Storage(
+        bucket=bucket,
+        region=os.environ.get("S3_REGION", "us-east-1"),
+        endpoint_url=endpoint_url,
+        access_key_id=os.environ.get("S3_ACCESS_KEY_ID", "bench"),
+        secret_access_key=os.environ.get("S3_SECRET_ACCESS_KEY", "bench"),
+        max_pool_connections=pool,
+    )
+    try:
+        backend.client.create_bucket(Bucket=bucket)
+    except Exception:
+        pass
+    return backend
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=400)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--pools", default="10,32,64", help="S3 connection pool sizes to compare")
+    parser.add_argument(
+        "--latency-ms", type=float, default=50.0, help="simulated round trip for the stand-in"
+    )
+    args = parser.parse_args()
+
+    endpoint_url = os.environ.get("S3_ENDPOINT_URL")
+    bucket = os.environ.get("S3_BUCKET", "bench")
+    fake = None
+    if not endpoint_url:
+        fake, endpoint_url = spawn_fake_s3(args.latency_ms)
+        print(f"Using fake S3 at {endpoint_url} with {args.latency_ms:g} ms latency")
+
+    cases: List[Tuple[str, Callable[[], StorageBackend]]] = [
+        ("local", lambda: LocalStorage(tempfile.mkdtemp(prefix="bench_storage_")))
+    ]
+    for pool in map(int, args.pools.split(",")):
+        cases.append((f"s3 pool={pool}", lambda pool=pool: s3_backend(endpoint_url, bucket, pool)))
+
+    print(f"{'backend':<12} {'op':<7} {'seconds':>8} {'ops/s':>9} {'MB/s':>8}")
+    try:
+        for label, build in cases:
+            backend = build()
+            try:
+                results = asyncio.run(
+                    bench_backend(backend, args.objects, args.size, args.concurrency)
+                )
+            finally:
+                backend.close()
+            for operation, elapsed in results:
+                rate = args.objects / elapsed
+                throughput = (
+                    f"{args.objects * args.size / elapsed / 1e6:>8.1f}"
+                    if operation in ("put", "get")
+                    else f"{'':>8}"
+                )
+                print(f"{label:<12} {operation:<7} {elapsed:>8.2f} {rate:>9.0f} {throughput}")
+    finally:
+        if fake is not None:
+            fake.terminate()
+
+
+if __name__ == "__main__":
+    main()
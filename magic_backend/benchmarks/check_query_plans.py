@@ -0,0 +1,327 @@
+"""Check the API's hot queries for full table scans.
+
+Seeds a scratch database with ``--users`` users' worth of subjects,
+notebooks, notes, strokes, files, flashcards and OCR jobs, then drives the
+endpoints the clients call in-process, records every statement the request
+handlers send, and EXPLAINs each one:
+
+- SQLite (the default, a fresh file): ``EXPLAIN QUERY PLAN``; a ``SCAN`` of a
+  table holding at least ``--min-rows`` rows is a failure.
+- Postgres (set ``DATABASE_URL`` to an empty scratch database; tables are
+  created if missing): ``EXPLAIN (FORMAT JSON)`` with ``enable_seqscan``
+  off, so the planner only picks a ``Seq Scan`` over such a table when no
+  index can serve the query at all, however small the seed.
+
+Exits with status 1 and lists the statements and plans that scan, so a
+dropped index or a rewritten query shows up before it reaches production.
+
+Run from ``magic_backend/``:
+
+    python benchmarks/check_query_plans.py [--users 100] [--min-rows 1000] [--verbose]
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import re
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+def configure_environment() -> None:
+    workdir = tempfile.mkdtemp(prefix="check_query_plans_")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/plans.db")
+    os.environ.setdefault("JWT_SECRET", "plans-secret-" + "x" * 32)
+    os.environ["STORAGE_DIR"] = os.path.join(workdir, "storage")
+    os.environ["STORAGE_BACKEND"] = "local"
+    # Enqueue records a job for the worker instead of running OCR here.
+    os.environ["OCR_ENABLED"] = "true"
+    os.environ["OCR_QUEUE_MODE"] = "worker"
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.environ["THUMBNAIL_DEBOUNCE_SECONDS"] = os.environ["THUMBNAIL_MAX_DELAY_SECONDS"] = "3600"
+    sys.path.insert(0, APP_DIR)
+
+
+def seed(engine, users: int) -> None:
+    """Bulk-insert other users' libraries so the probed tables are large."""
+    from sqlalchemy import insert
+
+    from models import AIJob, Flashcard, Note, NoteFile, NoteStroke, NoteStrokeCell, Notebook, Subject, User
+    from strokes import normalize_stroke_batch, pack_stroke_batch
+
+    payload = pack_stroke_batch(
+        normalize_stroke_batch({"strokes": [{"points": [{"x": i, "y": i} for i in range(20)]}]})
+    )
+    now = datetime.datetime.utcnow()
+    with engine.begin() as conn:
+        for user_index in range(users):
+            user_id = conn.execute(
+                insert(User)
+                .values(email=f"seed{user_index}@example.com", password_hash="-", defaults_version=1)
+                .returning(User.id)
+            ).scalar_one()
+            subject_ids = conn.execute(
+                insert(Subject).returning(Subject.id, sort_by_parameter_order=True),
+                [{"name": f"Subject {i}", "user_id": user_id, "notebook_count": 4} for i in range(3)],
+            ).scalars().all()
+            notebook_ids = conn.execute(
+                insert(Notebook).returning(Notebook.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "name": f"Notebook {i}",
+                        "user_id": user_id,
+                        "subject_id": subject_ids[i % len(subject_ids)],
+                        "note_count": 20,
+                        "notes_updated_at": now,
+                    }
+                    for i in range(12)
+                ],
+            ).scalars().all()
+            note_ids = conn.execute(
+                insert(Note).returning(Note.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "title": f"Note {i}",
+                        "notebook_id": notebook_id,
+                        "created_at": now,
+                        "updated_at": now - datetime.timedelta(minutes=i),
+                    }
+                    for notebook_id in notebook_ids
+                    for i in range(20)
+                ],
+            ).scalars().all()
+            stroke_ids = conn.execute(
+                insert(NoteStroke).returning(NoteStroke.id, sort_by_parameter_order=True),
+                [{"note_id": note_id, "payload": payload} for note_id in note_ids for _ in range(5)],
+            ).scalars().all()
+            conn.execute(
+                insert(NoteStrokeCell),
+                [
+                    {"note_id": note_ids[index // 5], "cell_x": 0, "cell_y": 0, "stroke_id": stroke_id}
+                    for index, stroke_id in enumerate(stroke_ids)
+                ],
+            )
+            conn.execute(
+                insert(NoteFile),
+                [
+                    {
+                        "note_id": note_id,
+                        "stored_filename": f"seed-{note_id}.txt",
+                        "original_filename": "seed.txt",
+                        "content_type": "text/plain",
+                    }
+                    for note_id in note_ids[::4]
+                ],
+            )
+            conn.execute(
+                insert(Flashcard),
+                [{"note_id": note_id, "question": "q", "answer": "a"} for note_id in note_ids[::2]],
+            )
+            conn.execute(
+                insert(AIJob),
+                [
+                    {"user_id": user_id, "note_id": note_id, "job_type": "ocr", "status": "success"}
+                    for note_id in note_ids
+                ],
+            )
+
+
+def drive(client, record: "Recorder") -> None:
+    """Call each endpoint the clients use, labelling the statements it sends."""
+    from bench_load import stroke_payload
+
+    def call(label: str, method: str, path: str, **kwargs: Any) -> Any:
+        record.label = label
+        response = client.request(method, path, **kwargs)
+        record.label = None
+        if response.status_code >= 400:
+            raise RuntimeError(f"{label}: {response.status_code} {response.text}")
+        return response
+
+    credentials = {"email": "probe@example.com", "password": "probe-password"}
+    token = call("signup", "POST", "/api/auth/signup", json=credentials).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    call("login", "POST", "/api/auth/login", json=credentials)
+    call("me", "GET", "/api/auth/me", headers=headers)
+
+    subject_id = call("create subject", "POST", "/api/subjects", json={"name": "Probe"}, headers=headers).json()["id"]
+    notebook_id = call(
+        "create notebook", "POST", f"/api/subjects/{subject_id}/notebooks", json={"name": "Probe"}, headers=headers
+    ).json()["id"]
+    note_id = call(
+        "create note", "POST", "/api/notes", json={"title": "Probe", "notebook_id": notebook_id}, headers=headers
+    ).json()["id"]
+    call("create note", "POST", "/api/notes", json={"title": "Second", "notebook_id": notebook_id}, headers=headers)
+    call("create inbox note", "POST", "/api/notes", json={"title": "Inbox"}, headers=headers)
+    call("create device note", "POST", "/api/device/notes", json={"device_type": "tablet"}, headers=headers)
+    call("inbox", "GET", "/api/notebooks/inbox?type=tablet", headers=headers)
+
+    call("add strokes", "POST", f"/api/notes/{note_id}/strokes", json=stroke_payload(1, 2, 20), headers=headers)
+    call(
+        "bulk strokes",
+        "POST",
+        "/api/strokes/bulk",
+        json={"batches": [{"note_id": note_id, **stroke_payload(2, 2, 20)}]},
+        headers=headers,
+    )
+    call(
+        "upload",
+        "POST",
+        f"/api/notes/{note_id}/upload",
+        files={"file": ("probe.txt", b"probe", "text/plain")},
+        headers=headers,
+    )
+
+    call("library", "GET", "/api/library", headers=headers)
+    call("subjects", "GET", "/api/subjects", headers=headers)
+    call("subject notebooks", "GET", f"/api/subjects/{subject_id}/notebooks", headers=headers)
+    notes = call("notebook notes", "GET", f"/api/notebooks/{notebook_id}/notes?limit=1", headers=headers)
+    call(
+        "notebook notes page",
+        "GET",
+        f"/api/notebooks/{notebook_id}/notes?limit=1&cursor={notes.headers['X-Next-Cursor']}",
+        headers=headers,
+    )
+    call("note", "GET", f"/api/notes/{note_id}", headers=headers)
+    strokes = call("strokes", "GET", f"/api/notes/{note_id}/strokes", headers=headers)
+    cursor = strokes.headers.get("X-Stroke-Cursor", "0")
+    first_page = call("strokes page", "GET", f"/api/notes/{note_id}/strokes?limit=1", headers=headers)
+    call(
+        "strokes next page",
+        "GET",
+        f"/api/notes/{note_id}/strokes?limit=1&cursor={first_page.headers['X-Next-Cursor']}",
+        headers=headers,
+    )
+    call(
+        "strokes ndjson next page",
+        "GET",
+        f"/api/notes/{note_id}/strokes?format=ndjson&limit=1&cursor={first_page.headers['X-Next-Cursor']}",
+        headers=headers,
+    )
+    call("strokes after_id", "GET", f"/api/notes/{note_id}/strokes?after_id={cursor}", headers=headers)
+    call("strokes bbox", "GET", f"/api/notes/{note_id}/strokes?bbox=0,0,100,100", headers=headers)
+    call("strokes lod", "GET", f"/api/notes/{note_id}/strokes?lod=1", headers=headers)
+    call("strokes ndjson", "GET", f"/api/notes/{note_id}/strokes?format=ndjson", headers=headers)
+    call("lod stats", "GET", f"/api/notes/{note_id}/strokes/lod-stats", headers=headers)
+    call("file", "GET", f"/api/notes/{note_id}/file", headers=headers)
+    call("ocr enqueue", "POST", f"/api/notes/{note_id}/ocr/enqueue", headers=headers)
+    call("ocr status", "GET", f"/api/notes/{note_id}/ocr", headers=headers)
+
+
+class Recorder:
+    """Collects the statements sent while a label is set."""
+
+    def __init__(self) -> None:
+        self.label: Optional[str] = None
+        self.statements: Dict[str, Tuple[str, Any]] = {}
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self.label is None or statement.lstrip().upper().startswith("EXPLAIN"):
+            return
+        if not re.match(r"\s*(SELECT|UPDATE|DELETE|INSERT INTO \S+ \(.*\) SELECT|WITH)", statement, re.S):
+            return
+        if executemany:
+            parameters = parameters[0]
+        self.statements.setdefault(statement, (self.label, parameters))
+
+
+def sqlite_scans(plan_rows: List[Any], large_tables: Set[str]) -> List[str]:
+    scans = []
+    for row in plan_rows:
+        match = SQLITE_SCAN.match(row[-1])
+        # SQLAlchemy aliases repeated tables as "<table>_<n>".
+        if match and re.sub(r"_\d+$", "", match.group(1)) in large_tables:
+            scans.append(match.group(1))
+    return scans
+
+
+def postgres_scans(plan: Dict[str, Any], large_tables: Set[str]) -> List[str]:
+    scans = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in large_tables:
+        scans.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        scans.extend(postgres_scans(child, large_tables))
+    return scans
+
+
+async def explain(
+    async_engine, statements: Dict[str, Tuple[str, Any]], large_tables: Set[str], verbose: bool
+) -> int:
+    postgres = async_engine.dialect.name == "postgresql"
+    failures = 0
+    async with async_engine.connect() as conn:
+        if postgres:
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, (label, parameters) in statements.items():
+            if postgres:
+                result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+                plan = result.scalar_one()
+                plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+                scans = postgres_scans(plan, large_tables)
+                lines = json.dumps(plan, indent=1, default=str).splitlines()
+            else:
+                rows = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)).all()
+                scans = sqlite_scans(rows, large_tables)
+                lines = [row[-1] for row in rows]
+            if scans:
+                failures += 1
+            if scans or verbose:
+                print(f"{'SCAN ' + ', '.join(scans) if scans else 'ok'} [{label}]")
+                print("  " + " ".join(statement.split())[:400])
+                for line in lines:
+                    print("    " + line)
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100, help="seeded users (240 notes each)")
+    parser.add_argument(
+        "--min-rows", type=int, default=1000, help="only scans of tables this large fail"
+    )
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    configure_environment()
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, func, select
+
+    import server
+    from models import Base
+
+    Base.metadata.create_all(server.engine)
+    seed(server.engine, args.users)
+    with server.engine.connect() as conn:
+        large_tables = {
+            table.name
+            for table in Base.metadata.sorted_tables
+            if conn.execute(select(func.count()).select_from(table)).scalar_one() >= args.min_rows
+        }
+    if server.engine.dialect.name == "postgresql":
+        with server.engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+    record = Recorder()
+    event.listen(server.async_engine.sync_engine, "before_cursor_execute", record)
+    with TestClient(server.app) as client:
+        drive(client, record)
+
+    failures = asyncio.run(
+        explain(server.async_engine, record.statements, large_tables, args.verbose)
+    )
+    print(
+        f"{len(record.statements)} statements checked against {', '.join(sorted(large_tables))}; "
+        f"{failures} with full scans"
+    )
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""A minimal in-memory S3-compatible server for offline storage benchmarks.
+
+Implements just what ``blobstore.S3Storage`` uses, path-style only: bucket
+create, object PUT/GET/HEAD/DELETE, and multipart uploads. Signatures are
+not checked. ``--latency-ms`` delays every response to mimic the network
+round trip to a real bucket, which is what connection pooling pays off on.
+Point ``S3_ENDPOINT_URL`` at a real MinIO instead for numbers closer to
+production.
+
+Run from ``magic_backend/``:
+
+    python benchmarks/fake_s3.py [--port 9000] [--latency-ms 20]
+"""
+import argparse
+import hashlib
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ERROR_BODY = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    "<Error><Code>{code}</Code><Message>{code}</Message></Error>"
+)
+
+
+def _decode_aws_chunked(body: bytes) -> bytes:
+    """Strip ``aws-chunked`` framing (``size[;ext]\\r\\ndata\\r\\n ... 0\\r\\ntrailers``)."""
+    decoded = bytearray()
+    position = 0
+    while True:
+        line_end = body.index(b"\r\n", position)
+        size = int(body[position:line_end].split(b";")[0], 16)
+        position = line_end + 2
+        if size == 0:
+            return bytes(decoded)
+        decoded += body[position : position + size]
+        position += size + 2
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeS3Server"
+
+    def log_message(self, format: str, *args) -> None:
+        return None
+
+    def _target(self) -> Tuple[str, str, Dict[str, str]]:
+        parts = urlsplit(self.path)
+        bucket, _, key = parts.path.lstrip("/").partition("/")
+        query = {
+            name: values[0]
+            for name, values in parse_qs(parts.query, keep_blank_values=True).items()
+        }
+        return bucket, unquote(key), query
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                body += self.rfile.read(size)
+                self.rfile.readline()
+            data = bytes(body)
+        else:
+            data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if "aws-chunked" in self.headers.get("Content-Encoding", ""):
+            data = _decode_aws_chunked(data)
+        return data
+
+    def _reply(self, status: int, body: bytes = b"", headers: Dict[str, str] = None) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.command != "HEAD" or "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status: int, code: str) -> None:
+        self._reply(
+            status, ERROR_BODY.format(code=code).encode(), {"Content-Type": "application/xml"}
+        )
+
+    def do_PUT(self) -> None:
+        bucket, key, query = self._target()
+        body = self._read_body()
+        if not key:
+            self.server.buckets.add(bucket)
+            self._reply(200)
+            return
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        with self.server.lock:
+            if "uploadId" in query:
+                upload = self.server.uploads.get(query["uploadId"])
+                if upload is None:
+                    self._error(404, "NoSuchUpload")
+                    return
+                upload[1][int(query["partNumber"])] = body
+            else:
+                self.server.objects[(bucket, key)] = (
+                    body,
+                    self.headers.get("Content-Type", "binary/octet-stream"),
+                )
+        self._reply(200, headers={"ETag": etag})
+
+    def do_POST(self) -> None:
+        bucket, key, query = self._target()
+        self._read_body()
+        with self.server.lock:
+            if "uploads" in query:
+                upload_id = uuid.uuid4().hex
+                self.server.uploads[upload_id] = (
+                    self.headers.get("Content-Type", "binary/octet-stream"),
+                    {},
+                )
+                body = (
+                    "<InitiateMultipartUploadResult>"
+                    f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>"
+                    "</InitiateMultipartUploadResult>"
+                )
+                self._reply(200, body.encode(), {"Content-Type": "application/xml"})
+                return
+            upload = self.server.uploads.pop(query.get("uploadId"), None)
+            if upload is None:
+                self._error(404, "NoSuchUpload")
+                return
+            content_type, parts = upload
+            self.server.objects[(bucket, key)] = (
+                b"".join(parts[number] for number in sorted(parts)),
+                content_type,
+            )
+        body = (
+            "<CompleteMultipartUploadResult>"
+            f"<Bucket>{bucket}</Bucket><Key>{key}</Key><ETag>\"multipart\"</ETag>"
+            "</CompleteMultipartUploadResult>"
+        )
+        self._reply(200, body.encode(), {"Content-Type": "application/xml"})
+
+    def do_GET(self) -> None:
+        bucket, key, _ = self._target()
+        stored = self.server.objects.get((bucket, key))
+        if stored is None:
+            self._error(404, "NoSuchKey")
+            return
+        data, content_type = stored
+        self._reply(200, data, {"Content-Type": content_type, "ETag": '"object"'})
+
+    def do_HEAD(self) -> None:
+        bucket, key, _ = self._target()
+        stored = self.server.objects.get((bucket, key))
+        if stored is None:
+            self._reply(404)
+            return
+        data, content_type = stored
+        self._reply(200, headers={"Content-Type": content_type, "Content-Length": str(len(data))})
+
+    def do_DELETE(self) -> None:
+        bucket, key, query = self._target()
+        with self.server.lock:
+            if "uploadId" in query:
+                self.server.uploads.pop(query["uploadId"], None)
+            else:
+                self.server.objects.pop((bucket, key), None)
+        self._reply(204)
+
+
+class FakeS3Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency_ms: float = 0.0) -> None:
+        super().__init__(address, FakeS3Handler)
+        self.latency = latency_ms / 1000
+        self.lock = threading.Lock()
+        self.buckets = set()
+        self.objects: Dict[Tuple[str, str], Tuple[bytes, str]] = {}
+        self.uploads: Dict[str, Tuple[str, Dict[int, bytes]]] = {}
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_fake_s3(port: int = 0, latency_ms: float = 0.0) -> FakeS3Server:
+    """Serve in a background thread; ``port=0`` picks a free port."""
+    server = FakeS3Server(("127.0.0.1", port), latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeS3Server(("127.0.0.1", args.port), args.latency_ms)
+    print(f"Fake S3 listening on {server.endpoint_url}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+from .base import DEFAULT_CHUNK_SIZE, ObjectNotFound, StorageBackend
+from .local import LocalStorage
+from .s3 import S3Storage
+
+__all__ = [
+    "DEFAULT_CHUNK_SIZE",
+    "LocalStorage",
+    "ObjectNotFound",
+    "S3Storage",
+    "StorageBackend",
+]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import AsyncIterable, AsyncIterator, Optional
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectNotFound(LookupError):
+    """Raised when a key does not exist in the backend."""
+
+
+class StorageBackend(ABC):
+    """Base interface for object storage.
+
+    Keys are ``/``-separated relative names. Every method that touches the
+    disk or the network is a coroutine and keeps blocking I/O off the event
+    loop; backends must be safe to share across requests.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def put(
+        self, key: str, chunks: AsyncIterable[bytes], content_type: str
+    ) -> int:
+        """Store the streamed bytes under ``key`` and return their size.
+
+        Readers never observe a partially written object; if ``chunks``
+        raises, nothing is stored and the error propagates.
+        """
+        pass
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str) -> int:
+        async def single() -> AsyncIterator[bytes]:
+            yield data
+
+        return await self.put(key, single(), content_type)
+
+    @abstractmethod
+    async def get_stream(
+        self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Open ``key`` for reading; raises ``ObjectNotFound`` before any bytes are read."""
+        pass
+
+    async def get_bytes(self, key: str) -> bytes:
+        stream = await self.get_stream(key)
+        return b"".join([chunk async for chunk in stream])
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove ``key``; deleting a missing key is not an error."""
+        pass
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        pass
+
+    async def presign(
+        self,
+        key: str,
+        expires: Optional[int] = None,
+        content_type: Optional[str] = None,
+        content_disposition: Optional[str] = None,
+    ) -> Optional[str]:
+        """A time-limited URL clients can fetch ``key`` from directly, or None
+        when the backend cannot hand out URLs and the API must serve the bytes."""
+        return None
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of ``key`` for zero-copy serving, when there is one."""
+        return None
+
+    def close(self) -> None:
+        """Release pooled connections and threads."""
+        return None
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from functools import partial
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Optional
+
+from .base import DEFAULT_CHUNK_SIZE, ObjectNotFound, StorageBackend
+
+
+class LocalStorage(StorageBackend):
+    """Objects as files under ``root``; blocking calls run in the default executor."""
+
+    name = "local"
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Storage key escapes the storage root: {key!r}")
+        return path
+
+    async def _run(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(func, *args, **kwargs)
+        )
+
+    async def put(
+        self, key: str, chunks: AsyncIterable[bytes], content_type: str
+    ) -> int:
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        await self._run(os.makedirs, directory, exist_ok=True)
+        # Write beside the destination and rename, so readers never see a partial file.
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                async for chunk in chunks:
+                    await self._run(out.write, chunk)
+                    size += len(chunk)
+            await self._run(os.replace, temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return size
+
+    async def get_stream(
+        self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        try:
+            handle = await self._run(open, self._path(key), "rb")
+        except FileNotFoundError:
+            raise ObjectNotFound(key) from None
+        return self._read_chunks(handle, chunk_size)
+
+    async def _read_chunks(self, handle: BinaryIO, chunk_size: int) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                chunk = await self._run(handle.read, chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            handle.close()
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self._run(os.remove, self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def exists(self, key: str) -> bool:
+        return await self._run(os.path.isfile, self._path(key))
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
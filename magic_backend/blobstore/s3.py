@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Set
+
+from .base import DEFAULT_CHUNK_SIZE, ObjectNotFound, StorageBackend
+
+# S3 rejects multipart parts below 5 MiB (except the last one).
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+async def _iter_parts(chunks: AsyncIterable[bytes], part_size: int) -> AsyncIterator[bytes]:
+    """Regroup arbitrary chunks into ``part_size`` parts (the last may be short)."""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+class S3Storage(StorageBackend):
+    """S3 (or any S3-compatible service) through one pooled boto3 client.
+
+    boto3 is synchronous, so calls run on a dedicated thread pool sized to the
+    client's HTTP connection pool: every worker thread can hold a kept-alive
+    connection, and S3 latency never blocks the event loop or starves the
+    thread pool that serves sync endpoints.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        region: str,
+        endpoint_url: Optional[str],
+        access_key_id: str,
+        secret_access_key: str,
+        presigned_expires: int = 3600,
+        max_pool_connections: int = 32,
+        max_attempts: int = 3,
+        part_size: int = 8 * 1024 * 1024,
+        max_inflight_parts: int = 4,
+    ) -> None:
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.presigned_expires = presigned_expires
+        self.part_size = max(MIN_PART_SIZE, part_size)
+        self.max_inflight_parts = max(1, max_inflight_parts)
+        self.client = boto3.client(
+            "s3",
+            region_name=region,
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                retries={"max_attempts": max_attempts, "mode": "standard"},
+                tcp_keepalive=True,
+                # Self-hosted endpoints (MinIO and friends) rarely have
+                # per-bucket DNS names.
+                s3={"addressing_style": "path"} if endpoint_url else None,
+            ),
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_pool_connections, thread_name_prefix="s3"
+        )
+
+    async def _call(self, method: str, **kwargs: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, partial(getattr(self.client, method), Bucket=self.bucket, **kwargs)
+        )
+
+    def _is_missing(self, error: Exception) -> bool:
+        from botocore.exceptions import ClientError
+
+        if not isinstance(error, ClientError):
+            return False
+        code = error.response.get("Error", {}).get("Code")
+        return code in {"404", "NoSuchKey", "NotFound"}
+
+    async def put(
+        self, key: str, chunks: AsyncIterable[bytes], content_type: str
+    ) -> int:
+        parts = _iter_parts(chunks, self.part_size)
+        first = await anext(parts, b"")
+        second = await anext(parts, None)
+        if second is None:
+            # Fits in one part: a plain PUT is one request instead of three.
+            await self._call("put_object", Key=key, Body=first, ContentType=content_type)
+            return len(first)
+
+        upload_id = (
+            await self._call("create_multipart_upload", Key=key, ContentType=content_type)
+        )["UploadId"]
+
+        async def upload_part(number: int, body: bytes) -> Dict[str, Any]:
+            response = await self._call(
+                "upload_part", Key=key, UploadId=upload_id, PartNumber=number, Body=body
+            )
+            return {"PartNumber": number, "ETag": response["ETag"]}
+
+        async def all_parts() -> AsyncIterator[bytes]:
+            yield first
+            yield second
+            async for part in parts:
+                yield part
+
+        in_flight: Set[asyncio.Future] = set()
+        completed: List[Dict[str, Any]] = []
+        size = 0
+        try:
+            number = 0
+            async for body in all_parts():
+                number += 1
+                size += len(body)
+                in_flight.add(asyncio.ensure_future(upload_part(number, body)))
+                if len(in_flight) >= self.max_inflight_parts:
+                    done, in_flight = await asyncio.wait(
+                        in_flight, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    completed.extend(task.result() for task in done)
+            if in_flight:
+                completed.extend(await asyncio.gather(*in_flight))
+                in_flight = set()
+            completed.sort(key=lambda part: part["PartNumber"])
+            await self._call(
+                "complete_multipart_upload",
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": completed},
+            )
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            await self._call("abort_multipart_upload", Key=key, UploadId=upload_id)
+            raise
+        return size
+
+    async def get_stream(
+        self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        try:
+            response = await self._call("get_object", Key=key)
+        except Exception as error:
+            if self._is_missing(error):
+                raise ObjectNotFound(key) from None
+            raise
+        return self._read_chunks(response["Body"], chunk_size)
+
+    async def _read_chunks(self, body: Any, chunk_size: int) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self._executor, body.read, chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete(self, key: str) -> None:
+        await self._call("delete_object", Key=key)
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await self._call("head_object", Key=key)
+        except Exception as error:
+            if self._is_missing(error):
+                return False
+            raise
+        return True
+
+    async def presign(
+        self,
+        key: str,
+        expires: Optional[int] = None,
+        content_type: Optional[str] = None,
+        content_disposition: Optional[str] = None,
+    ) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": key}
+        if content_type:
+            params["ResponseContentType"] = content_type
+        if content_disposition:
+            params["ResponseContentDisposition"] = content_disposition
+        # Signing is local computation; no request is made.
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=expires or self.presigned_expires
+        )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,36 @@
+"""Check the maintained library counters against the rows they summarize.
+
+``Subject.notebook_count``, ``Notebook.note_count`` and
+``Notebook.notes_updated_at`` are updated by the API as it writes; this
+recomputes them and lists any that have drifted:
+
+    python check_library_counters.py [--user-id ID] [--fix]
+
+Exits with status 1 when drift is found (and not fixed), so it can run from
+cron or CI against a replica.
+"""
+import argparse
+import sys
+
+from server import SessionLocal, library_counter_drift
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", type=int, help="only this user's library")
+    parser.add_argument("--fix", action="store_true", help="overwrite drifted values")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        drift = library_counter_drift(db, user_id=args.user_id, fix=args.fix)
+        for entry in drift:
+            print(entry)
+        if args.fix:
+            db.commit()
+    print(f"{len(drift)} drifted row(s){' fixed' if args.fix and drift else ''}")
+    if drift and not args.fix:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,19 @@
 import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -13,6 +26,9 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Version of the default subjects/notebooks provisioned for this user;
+    # see DEFAULTS_VERSION in server.py.
+    defaults_version = Column(Integer, default=0, nullable=False)
 
     subjects = relationship("Subject", back_populates="user", cascade="all, delete-orphan")
     notebooks = relationship("Notebook", back_populates="user", cascade="all, delete-orphan")
@@ -21,11 +37,21 @@ class User(Base):
 
 class Subject(Base):
     __tablename__ = "subjects"
+    __table_args__ = (
+        Index("uq_subjects_user_id_system_key", "user_id", "system_key", unique=True),
+        Index("ix_subjects_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Set on subjects the backend provisions ("unsorted", "inbox"); NULL for
+    # the user's own. Names can be edited, keys cannot.
+    system_key = Column(String, nullable=True)
+    # Maintained by the API as notebooks are created and deleted; see
+    # "Library counters" in server.py.
+    notebook_count = Column(Integer, default=0, nullable=False)
 
     user = relationship("User", back_populates="subjects")
     notebooks = relationship(
@@ -35,6 +61,11 @@ class Subject(Base):
 
 class Notebook(Base):
     __tablename__ = "notebooks"
+    __table_args__ = (
+        Index("uq_notebooks_user_id_system_key", "user_id", "system_key", unique=True),
+        Index("ix_notebooks_user_id_created_at", "user_id", "created_at"),
+        Index("ix_notebooks_subject_id_created_at", "subject_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -45,6 +76,12 @@ class Notebook(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     subject_id = Column(Integer, ForeignKey("subjects.id", ondelete="CASCADE"), nullable=False)
+    # "unsorted" or "inbox:<type>" on provisioned notebooks, else NULL.
+    system_key = Column(String, nullable=True)
+    # Maintained by the API: the number of notes, and the newest
+    # Note.updated_at among them (NULL while empty).
+    note_count = Column(Integer, default=0, nullable=False)
+    notes_updated_at = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="notebooks")
     subject = relationship("Subject", back_populates="notebooks")
@@ -53,6 +90,9 @@ class Notebook(Base):
 
 class Note(Base):
     __tablename__ = "notes"
+    __table_args__ = (
+        Index("ix_notes_notebook_id_updated_at_id", "notebook_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, default="Untitled Note")
@@ -64,27 +104,89 @@ class Note(Base):
     ocr_engine = Column(String, default="")
     ocr_confidence = Column(Float, nullable=True)
     ocr_updated_at = Column(DateTime, nullable=True)
+    # Storage key of the preview image (named by its content hash) and the newest
+    # stroke row it includes.
+    thumbnail_key = Column(String, nullable=True)
+    thumbnail_stroke_id = Column(Integer, nullable=True)
     notebook_id = Column(Integer, ForeignKey("notebooks.id", ondelete="CASCADE"), nullable=False)
     notebook = relationship("Notebook", back_populates="notes")
     strokes = relationship("NoteStroke", back_populates="note", cascade="all, delete-orphan")
     files = relationship("NoteFile", back_populates="note", cascade="all, delete-orphan")
     flashcards = relationship("Flashcard", back_populates="note", cascade="all, delete-orphan")
     ai_jobs = relationship("AIJob", back_populates="note", cascade="all, delete-orphan")
+    ocr_regions = relationship(
+        "NoteOCRRegion", back_populates="note", cascade="all, delete-orphan"
+    )
 
 
 class NoteStroke(Base):
     __tablename__ = "note_strokes"
+    __table_args__ = (
+        Index("ix_note_strokes_note_id_id", "note_id", "id"),
+        Index("ix_note_strokes_note_id_created_at_id", "note_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     note_id = Column(Integer, ForeignKey("notes.id", ondelete="CASCADE"))
-    payload = Column(Text, nullable=False)
+    # Packed columnar stroke batch; see strokes/codec.py for the layout.
+    payload = Column(LargeBinary, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     note = relationship("Note", back_populates="strokes")
 
 
+class NoteStrokeCell(Base):
+    """Uniform-grid spatial index: which stroke rows have ink in which cell.
+
+    Cells are ``STROKE_INDEX_CELL_SIZE`` note units square; see strokes/spatial.py.
+    """
+
+    __tablename__ = "note_stroke_cells"
+
+    note_id = Column(
+        Integer, ForeignKey("notes.id", ondelete="CASCADE"), primary_key=True
+    )
+    cell_x = Column(Integer, primary_key=True, autoincrement=False)
+    cell_y = Column(Integer, primary_key=True, autoincrement=False)
+    stroke_id = Column(
+        Integer,
+        ForeignKey("note_strokes.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+
+class NoteStrokeLOD(Base):
+    """Cached level-of-detail (simplified) copy of one stroke row.
+
+    Stroke rows are append-only, so an entry stays valid until the tolerance
+    configured for its level changes.
+    """
+
+    __tablename__ = "note_stroke_lods"
+
+    stroke_id = Column(
+        Integer, ForeignKey("note_strokes.id", ondelete="CASCADE"), primary_key=True
+    )
+    lod = Column(Integer, primary_key=True, autoincrement=False)
+    note_id = Column(
+        Integer, ForeignKey("notes.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    tolerance = Column(Float, nullable=False)
+    # Packed like NoteStroke.payload; see strokes/codec.py.
+    payload = Column(LargeBinary, nullable=False)
+    point_count = Column(Integer, nullable=False)
+    byte_size = Column(Integer, nullable=False)
+    source_point_count = Column(Integer, nullable=False)
+    source_byte_size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
 class NoteFile(Base):
     __tablename__ = "note_files"
+    __table_args__ = (
+        Index("ix_note_files_note_id_created_at_id", "note_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     note_id = Column(Integer, ForeignKey("notes.id", ondelete="CASCADE"))
@@ -92,15 +194,44 @@ class NoteFile(Base):
     original_filename = Column(String, nullable=False)
     content_type = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # SHA-256 of the content for uploads stored as shared blobs; legacy rows
+    # (one object per upload) have none.
+    blob_digest = Column(String(64), nullable=True, index=True)
 
     note = relationship("Note", back_populates="files")
 
 
+class StoredBlob(Base):
+    """A content-addressed upload shared by every NoteFile with the same bytes.
+
+    ``ref_count`` counts linked NoteFile rows plus uploads still in flight;
+    -1 marks a blob the garbage collector has claimed for deletion, which
+    uploads must not link to.
+    """
+
+    __tablename__ = "stored_blobs"
+
+    digest = Column(String(64), primary_key=True)
+    storage_key = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Last time an upload linked to the blob.
+    touched_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    # When ref_count last dropped to 0 (NULL while referenced); the collector
+    # deletes the blob once this is BLOB_GC_GRACE_HOURS old.
+    unlinked_at = Column(DateTime, nullable=True)
+    # Set once an upload has finished writing the object; until then every
+    # upload of these bytes writes it (same key, same bytes).
+    stored_at = Column(DateTime, nullable=True)
+
+
 class Flashcard(Base):
     __tablename__ = "flashcards"
 
     id = Column(Integer, primary_key=True, index=True)
-    note_id = Column(Integer, ForeignKey("notes.id", ondelete="CASCADE"))
+    note_id = Column(Integer, ForeignKey("notes.id", ondelete="CASCADE"), index=True)
     question = Column(Text, nullable=False)
     answer = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -110,6 +241,11 @@ class Flashcard(Base):
 
 class AIJob(Base):
     __tablename__ = "ai_jobs"
+    __table_args__ = (
+        # A note's latest job (enqueue, status) and the worker's queue scan.
+        Index("ix_ai_jobs_note_id_job_type_created_at", "note_id", "job_type", "created_at"),
+        Index("ix_ai_jobs_job_type_status_created_at", "job_type", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -121,6 +257,56 @@ class AIJob(Base):
     updated_at = Column(DateTime, default=datetime.datetime.utcnow)
     started_at = Column(DateTime, nullable=True)
     finished_at = Column(DateTime, nullable=True)
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
 
     user = relationship("User", back_populates="ai_jobs")
     note = relationship("Note", back_populates="ai_jobs")
+
+
+class OCRCacheEntry(Base):
+    """OCR output for an exact stroke set, shared by every note that renders it."""
+
+    __tablename__ = "ocr_cache"
+    __table_args__ = (
+        UniqueConstraint(
+            "stroke_hash", "engine", "engine_version", name="uq_ocr_cache_key"
+        ),
+        Index("ix_ocr_cache_last_used_at", "last_used_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # SHA-256 of the note's ordered NoteStroke payloads.
+    stroke_hash = Column(String(64), nullable=False)
+    engine = Column(String, nullable=False)
+    engine_version = Column(String, nullable=False)
+    ocr_text = Column(Text, nullable=False, default="")
+    ocr_confidence = Column(Float, nullable=True)
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class NoteOCRRegion(Base):
+    """Recognized text for one line band of a note, used by incremental OCR."""
+
+    __tablename__ = "note_ocr_regions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    note_id = Column(
+        Integer, ForeignKey("notes.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    # Hash of the (NoteStroke.id, stroke index) pairs drawn in this band.
+    stroke_key = Column(String(64), nullable=False)
+    min_x = Column(Float, nullable=False)
+    min_y = Column(Float, nullable=False)
+    max_x = Column(Float, nullable=False)
+    max_y = Column(Float, nullable=False)
+    ocr_text = Column(Text, nullable=False, default="")
+    ocr_confidence = Column(Float, nullable=True)
+    engine = Column(String, nullable=False)
+    engine_version = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    note = relationship("Note", back_populates="ocr_regions")
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Optional, Tuple
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 
 OCRResult = Tuple[str, Optional[float]]
+# A ``uint8`` array, grayscale (height, width) or RGB (height, width, 3), or a
+# path to an image file.
+OCRImage = Union[np.ndarray, str]
 
 
 class OCREngine(ABC):
@@ -19,11 +24,27 @@ class OCREngine(ABC):
         """Return True when the engine can be instantiated and used safely."""
         pass
 
+    def version(self) -> str:
+        """Identify the model/library build. Cached OCR results are keyed on it."""
+        return "0"
+
+    def warm_up(self) -> None:
+        """Load models ahead of the first job. Engines without warm-up cost keep the default."""
+        return None
+
     @abstractmethod
-    def run(self, image_path: str) -> OCRResult:
-        """Run OCR and return (text, confidence).
+    def run(self, image: OCRImage) -> OCRResult:
+        """Run OCR on an in-memory raster or image file and return (text, confidence).
 
         - text: extracted text or "" when no text is detected.
         - confidence: average confidence or None when unavailable.
         """
         pass
+
+    def run_batch(self, images: Sequence[OCRImage]) -> List[OCRResult]:
+        """Run OCR over several images and return one (text, confidence) per image.
+
+        Results are in the same order as ``images``. The default runs the
+        images one at a time; engines that can share work across images override it.
+        """
+        return [self.run(image) for image in images]
@@ -0,0 +1,259 @@
+"""Dedicated OCR worker: claims queued OCR jobs from the database and runs them.
+
+Run alongside the API with ``OCR_QUEUE_MODE=worker``:
+
+    python ocr_worker.py
+
+A supervisor process keeps ``OCR_WORKER_CONCURRENCY`` worker processes alive.
+Each one holds a warm OCR engine, claims queued ``AIJob`` rows in
+micro-batches (``OCR_BATCH_MAX_SIZE`` / ``OCR_BATCH_MAX_WAIT_SECONDS``), runs
+them through one batched engine call and sends heartbeats meanwhile, so a
+crashed worker's jobs are requeued instead of waiting out
+``OCR_JOB_TIMEOUT_MINUTES``.
+"""
+import datetime
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import select, update
+
+from models import AIJob
+from ocr.registry import get_engine
+from server import (
+    JOB_STATUS_QUEUED,
+    JOB_STATUS_RUNNING,
+    OCR_ENGINE,
+    SessionLocal,
+    engine as db_engine,
+    mark_stale_ocr_jobs,
+    prune_ocr_cache,
+    prune_ocr_debug_images,
+    run_ocr_jobs,
+)
+from settings import (
+    OCR_BATCH_MAX_SIZE,
+    OCR_BATCH_MAX_WAIT_SECONDS,
+    OCR_HEARTBEAT_SECONDS,
+    OCR_HEARTBEAT_TIMEOUT_SECONDS,
+    OCR_QUEUE_MODE,
+    OCR_WORKER_CONCURRENCY,
+    OCR_WORKER_POLL_SECONDS,
+)
+
+logger = logging.getLogger("ocr_worker")
+
+# Postgres hands each worker a different row; elsewhere (SQLite) a
+# compare-and-set UPDATE decides which worker wins a candidate row.
+SUPPORTS_SKIP_LOCKED = db_engine.dialect.name == "postgresql"
+CLAIM_CANDIDATES = 5
+BATCH_FILL_POLL_SECONDS = 0.1
+
+
+def _queued_ocr_jobs(limit: int):
+    return (
+        select(AIJob.id)
+        .where(AIJob.job_type == "ocr", AIJob.status == JOB_STATUS_QUEUED)
+        .order_by(AIJob.created_at.asc(), AIJob.id.asc())
+        .limit(limit)
+    )
+
+
+def claim_ocr_jobs(worker_id: str, limit: int) -> List[int]:
+    """Move up to ``limit`` of the oldest queued OCR jobs to running for this worker."""
+    db = SessionLocal()
+    try:
+        if SUPPORTS_SKIP_LOCKED:
+            candidates = list(
+                db.execute(
+                    _queued_ocr_jobs(limit).with_for_update(skip_locked=True)
+                ).scalars()
+            )
+        else:
+            candidates = list(
+                db.execute(_queued_ocr_jobs(limit + CLAIM_CANDIDATES)).scalars()
+            )
+        claimed: List[int] = []
+        for job_id in candidates:
+            if len(claimed) == limit:
+                break
+            now = datetime.datetime.utcnow()
+            result = db.execute(
+                update(AIJob)
+                .where(AIJob.id == job_id, AIJob.status == JOB_STATUS_QUEUED)
+                .values(
+                    status=JOB_STATUS_RUNNING,
+                    worker_id=worker_id,
+                    heartbeat_at=now,
+                    started_at=now,
+                    updated_at=now,
+                    attempts=AIJob.attempts + 1,
+                )
+            )
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        db.commit()
+        return claimed
+    finally:
+        db.close()
+
+
+def gather_ocr_batch(worker_id: str, stop_event) -> List[int]:
+    """Claim a micro-batch: up to OCR_BATCH_MAX_SIZE jobs, waiting at most
+    OCR_BATCH_MAX_WAIT_SECONDS after the first one for the batch to fill.
+
+    Returns an empty list when nothing is queued.
+    """
+    batch = claim_ocr_jobs(worker_id, OCR_BATCH_MAX_SIZE)
+    if not batch:
+        return batch
+    deadline = time.monotonic() + OCR_BATCH_MAX_WAIT_SECONDS
+    while len(batch) < OCR_BATCH_MAX_SIZE and not stop_event.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        stop_event.wait(min(remaining, BATCH_FILL_POLL_SECONDS))
+        batch.extend(claim_ocr_jobs(worker_id, OCR_BATCH_MAX_SIZE - len(batch)))
+    return batch
+
+
+def send_heartbeat(job_ids: Sequence[int], worker_id: str) -> int:
+    """Refresh ``heartbeat_at`` on jobs this worker still owns; returns how many."""
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            update(AIJob)
+            .where(
+                AIJob.id.in_(job_ids),
+                AIJob.worker_id == worker_id,
+                AIJob.status == JOB_STATUS_RUNNING,
+            )
+            .values(heartbeat_at=datetime.datetime.utcnow())
+        )
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+@contextmanager
+def heartbeat(job_ids: Sequence[int], worker_id: str) -> Iterator[None]:
+    done = threading.Event()
+
+    def beat() -> None:
+        while not done.wait(OCR_HEARTBEAT_SECONDS):
+            try:
+                owned = send_heartbeat(job_ids, worker_id)
+                if owned < len(job_ids):
+                    logger.warning(
+                        "Lost ownership of %s of OCR jobs %s",
+                        len(job_ids) - owned,
+                        list(job_ids),
+                    )
+                if not owned:
+                    return
+            except Exception:  # noqa: BLE001 - a missed beat must not kill the job
+                logger.exception("OCR heartbeat failed for jobs %s", list(job_ids))
+
+    thread = threading.Thread(target=beat, name="ocr-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def worker_main(stop_event) -> None:
+    # The supervisor owns shutdown; workers finish their current batch first.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    engine = get_engine(OCR_ENGINE)
+    if engine:
+        logger.info("Warming OCR engine %s in %s", engine.name, worker_id)
+        engine.warm_up()
+
+    while not stop_event.is_set():
+        job_ids = gather_ocr_batch(worker_id, stop_event)
+        if not job_ids:
+            stop_event.wait(OCR_WORKER_POLL_SECONDS)
+            continue
+        logger.info("Claimed OCR jobs %s in %s", job_ids, worker_id)
+        with heartbeat(job_ids, worker_id):
+            run_ocr_jobs(job_ids)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    # In inline mode the API runs jobs itself; a worker would race it for them.
+    if OCR_QUEUE_MODE != "worker":
+        logger.error(
+            "OCR_QUEUE_MODE is %r; set OCR_QUEUE_MODE=worker for the API and "
+            "the worker before starting ocr_worker.py. Exiting.",
+            OCR_QUEUE_MODE,
+        )
+        raise SystemExit(1)
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    # Signal handlers only flip this flag: setting ``stop_event`` from a handler
+    # can deadlock on its lock while the main thread is inside ``wait()``.
+    stopping = False
+
+    def request_stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    workers: List[Optional[multiprocessing.process.BaseProcess]] = [
+        None
+    ] * OCR_WORKER_CONCURRENCY
+    stale_check_interval = max(OCR_HEARTBEAT_TIMEOUT_SECONDS // 2, 1)
+    next_stale_check = 0.0
+    while not stopping:
+        for slot, process in enumerate(workers):
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logger.warning(
+                    "OCR worker pid=%s exited with %s; restarting.",
+                    process.pid,
+                    process.exitcode,
+                )
+            process = context.Process(
+                target=worker_main, args=(stop_event,), name=f"ocr-worker-{slot}"
+            )
+            process.start()
+            workers[slot] = process
+        if time.monotonic() >= next_stale_check:
+            try:
+                mark_stale_ocr_jobs()
+            except Exception:  # noqa: BLE001 - keep supervising through DB blips
+                logger.exception("Stale OCR job check failed")
+            prune_ocr_debug_images()
+            try:
+                prune_ocr_cache()
+            except Exception:  # noqa: BLE001 - eviction can wait for the next pass
+                logger.exception("OCR cache eviction failed")
+            next_stale_check = time.monotonic() + stale_check_interval
+        time.sleep(1)
+
+    logger.info("Stopping OCR workers; waiting for running jobs to finish.")
+    stop_event.set()
+    for process in workers:
+        if process is not None:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
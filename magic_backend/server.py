@@ -1,36 +1,165 @@
+import asyncio
+import base64
 import datetime
+import email.utils
+import hashlib
 import importlib.util
 import json
 import logging
-import math
 import os
+import re
 import tempfile
+import threading
+import time
 import uuid
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from urllib.parse import quote
 
 import bcrypt
 import jwt
-from fastapi import BackgroundTasks, Depends, FastAPI, File, HTTPException, Query, UploadFile
+import numpy as np
+from fastapi import (
+    BackgroundTasks,
+    Depends,
+    FastAPI,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import (
+    FileResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 
-from sqlalchemy import create_engine, func, select
-from sqlalchemy.orm import Session, sessionmaker
-
-from models import AIJob, Flashcard, Note, NoteFile, NoteStroke, Notebook, Subject, User
+from sqlalchemy import (
+    DateTime,
+    String,
+    and_,
+    case,
+    create_engine,
+    delete,
+    event,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+
+from blobstore import LocalStorage, ObjectNotFound, S3Storage, StorageBackend
+from models import (
+    AIJob,
+    Flashcard,
+    Note,
+    NoteFile,
+    NoteOCRRegion,
+    NoteStroke,
+    NoteStrokeCell,
+    NoteStrokeLOD,
+    Notebook,
+    OCRCacheEntry,
+    StoredBlob,
+    Subject,
+    User,
+)
+from ocr.base import OCREngine, OCRResult
 from ocr.registry import get_engine
+from strokes import (
+    OVERSIZED_CELL,
+    THUMBNAIL_CONTENT_TYPES,
+    BBox,
+    PlacedStroke,
+    StrokeBatch,
+    TileLayout,
+    StrokeRegion,
+    cell_range,
+    clip_batch,
+    encode_thumbnail,
+    group_line_regions,
+    index_cells,
+    iter_stroke_tiles,
+    layout_tiles,
+    normalize_stroke_batch,
+    pack_stroke_batch,
+    parse_bbox,
+    place_stroke,
+    point_count,
+    render_thumbnail,
+    simplify_batch,
+    stroke_batch_to_json,
+    unpack_stroke_batch,
+)
 from settings import (
+    AUTH_CACHE_MAX_ENTRIES,
+    AUTH_CACHE_TTL_SECONDS,
+    BCRYPT_ROUNDS,
+    BLOB_GC_GRACE_HOURS,
+    BLOB_GC_INTERVAL_HOURS,
     CORS_ORIGINS,
     CORS_ORIGIN_REGEX,
     DATABASE_URL,
+    INBOX_CACHE_TTL_SECONDS,
     JWT_EXPIRES_SECONDS,
     JWT_SECRET,
+    NOTE_PAGE_MAX_SIZE,
+    OCR_CACHE_MAX_ENTRIES,
+    OCR_CACHE_TTL_DAYS,
+    OCR_DEBUG_IMAGE_RETENTION_HOURS,
+    OCR_DEBUG_IMAGES,
     OCR_ENABLED,
+    OCR_INCREMENTAL,
+    OCR_HEARTBEAT_TIMEOUT_SECONDS,
     OCR_JOB_TIMEOUT_MINUTES,
+    OCR_MAX_ATTEMPTS,
+    OCR_QUEUE_MODE,
+    OCR_REGION_LINE_GAP,
+    OCR_TILE_BATCH_SIZE,
+    OCR_TILE_SIZE,
+    PASSWORD_HASH_MAX_QUEUE,
+    PASSWORD_HASH_WORKERS,
     STORAGE_BACKEND,
     STORAGE_DIR,
-    get_s3_client,
+    STROKE_BULK_MAX_BATCHES,
+    STROKE_INDEX_CELL_SIZE,
+    STROKE_INDEX_MAX_CELLS,
+    STROKE_LOD_TOLERANCES,
+    STROKE_PAGE_MAX_SIZE,
+    STROKE_STREAM_BATCH_SIZE,
+    THUMBNAIL_DEBOUNCE_SECONDS,
+    THUMBNAIL_FORMAT,
+    THUMBNAIL_MAX_DELAY_SECONDS,
+    THUMBNAIL_SIZE,
+    UPLOAD_CHUNK_BYTES,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_S3_MAX_INFLIGHT_PARTS,
     s3_settings,
 )
 
@@ -45,11 +174,66 @@ if DATABASE_URL.startswith("sqlite"):
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+
+def async_database_url(url: str) -> URL:
+    """DATABASE_URL with its async driver: asyncpg for Postgres, aiosqlite for SQLite."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        query = dict(parsed.query)
+        # asyncpg takes libpq's sslmode values under the name "ssl".
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return parsed.set(drivername="postgresql+asyncpg", query=query)
+    return parsed
+
+
+# Request handlers use the async engine, so a query waiting on the database
+# never blocks the event loop. Work that already runs in threads (OCR jobs,
+# thumbnail renders, ocr_worker.py) keeps the sync engine.
 engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(async_database_url(DATABASE_URL), pool_pre_ping=True)
+# Objects stay loaded after commit: reloading an expired attribute is implicit
+# IO, which an AsyncSession cannot do outside an await.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
-if STORAGE_BACKEND == "local":
-    os.makedirs(STORAGE_DIR, exist_ok=True)
+
+def _enable_sqlite_foreign_keys(dbapi_connection, _connection_record) -> None:
+    # SQLite ignores foreign keys, and so every ON DELETE CASCADE, unless
+    # each connection opts in.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _enable_sqlite_foreign_keys)
+    event.listen(async_engine.sync_engine, "connect", _enable_sqlite_foreign_keys)
+# INSERT ... ON CONFLICT support for the two databases we deploy on.
+dialect_insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+
+
+def build_storage() -> StorageBackend:
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=s3_settings.bucket,
+            region=s3_settings.region,
+            endpoint_url=s3_settings.endpoint_url,
+            access_key_id=s3_settings.access_key_id,
+            secret_access_key=s3_settings.secret_access_key,
+            presigned_expires=s3_settings.presigned_expires,
+            max_pool_connections=s3_settings.max_pool_connections,
+            max_attempts=s3_settings.max_attempts,
+            part_size=UPLOAD_CHUNK_BYTES,
+            max_inflight_parts=UPLOAD_S3_MAX_INFLIGHT_PARTS,
+        )
+    return LocalStorage(STORAGE_DIR)
+
+
+storage = build_storage()
 OCR_IMAGE_DIR = os.path.join(STORAGE_DIR, "ocr")
 os.makedirs(OCR_IMAGE_DIR, exist_ok=True)
 OCR_ENGINE = "paddleocr"
@@ -62,6 +246,11 @@ JOB_STATUS_SUCCESS = "success"
 JOB_STATUS_FAILED = "failed"
 
 OCR_JOB_TIMEOUT = datetime.timedelta(minutes=OCR_JOB_TIMEOUT_MINUTES)
+OCR_HEARTBEAT_TIMEOUT = datetime.timedelta(seconds=OCR_HEARTBEAT_TIMEOUT_SECONDS)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STROKE_CURSOR_HEADER = "X-Stroke-Cursor"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
 # ------------------------------------------------------------------
 # App setup
@@ -75,12 +264,28 @@ app.add_middleware(
     allow_origin_regex=CORS_ORIGIN_REGEX,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", STROKE_CURSOR_HEADER, NEXT_CURSOR_HEADER],
 )
 
 
 @app.on_event("startup")
 def startup_tasks() -> None:
     mark_stale_ocr_jobs()
+    prune_ocr_debug_images()
+    prune_ocr_cache()
+
+
+@app.on_event("startup")
+async def start_background_tasks() -> None:
+    app.state.blob_collector = asyncio.ensure_future(collect_blobs_periodically())
+
+
+@app.on_event("shutdown")
+async def shutdown_tasks() -> None:
+    app.state.blob_collector.cancel()
+    storage.close()
+    password_hasher.close()
+    await async_engine.dispose()
 
 # ------------------------------------------------------------------
 # Auth + DB helpers
@@ -89,20 +294,125 @@ def startup_tasks() -> None:
 security = HTTPBearer(auto_error=False)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool, off the event loop.
+
+    bcrypt releases the GIL, so up to ``workers`` hashes run in parallel
+    while requests keep being served; the pool is kept separate so a login
+    burst cannot take the threads sync endpoints and file I/O run on. When
+    ``max_queue`` calls are already waiting for a thread, further ones are
+    turned away with 503 instead of queueing for seconds.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_queue: int) -> None:
+        self.rounds = rounds
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="bcrypt"
+        )
+        # Counters are updated from the loop and from pool threads.
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    async def _run(self, function: Any, *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                rejected = True
+            else:
+                rejected = False
+                self._pending += 1
+                self._peak_pending = max(self._peak_pending, self._pending)
+        if rejected:
+            logger.warning("Password hashing queue full (%s waiting)", self.max_queue)
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-ins at once, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        submitted = time.perf_counter()
+
+        def timed() -> Any:
+            started = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._pending -= 1
+                    self._completed += 1
+                    self._wait_seconds += started - submitted
+                    self._run_seconds += finished - started
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+
+    async def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(self.rounds)
+        hashed = await self._run(bcrypt.hashpw, password.encode("utf-8"), salt)
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(
+            bcrypt.checkpw, password.encode("utf-8"), password_hash.encode("utf-8")
+        )
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True when the hash was made with a different cost than ``rounds``."""
+        try:
+            return int(password_hash.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": min(self._pending, self.workers),
+                "queued": max(0, self._pending - self.workers),
+                "peak_pending": self._peak_pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": self._wait_seconds / completed * 1000 if completed else None,
+                "avg_run_ms": self._run_seconds / completed * 1000 if completed else None,
+            }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher(BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
+
+async def release_connection(db: AsyncSession) -> None:
+    """End the session's read transaction before a slow bcrypt call.
+
+    The connection goes back to the pool, so logins queued for a hashing
+    thread cannot starve other requests of connections; loaded objects stay
+    usable (``expire_on_commit=False``) and the next query checks one out.
+    """
+    await db.commit()
+
 
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
 
-def verify_password(password: str, password_hash: str) -> bool:
-    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await password_hasher.verify(password, password_hash)
 
 
 def create_access_token(user: User) -> str:
@@ -120,7 +430,65 @@ def create_access_token(user: User) -> str:
     return token
 
 
-def serialize_user(user: User) -> Dict[str, Any]:
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as handlers see it: plain values, no session."""
+
+    id: int
+    email: str
+    created_at: datetime.datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, email=user.email, created_at=user.created_at)
+
+
+class UserCache:
+    """Small per-process LRU of values keyed by (user id, detail).
+
+    Entries live for ``ttl`` seconds and the least recently used go first
+    beyond ``max_entries``. It is only touched from the event loop, so it
+    needs no lock; ``invalidate`` only reaches this process, and other
+    workers drop their copies within ``ttl``.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, Any], Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, user_id: int, detail: Any) -> Any:
+        key = (user_id, detail)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, user_id: int, detail: Any, value: Any) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        key = (user_id, detail)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        for key in [key for key in self._entries if key[0] == user_id]:
+            del self._entries[key]
+
+
+# Authenticated principals by token ``iat``; saves the user lookup on every
+# authenticated request.
+principal_cache = UserCache(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
+
+
+def serialize_user(user: Union[User, Principal]) -> Dict[str, Any]:
     return {
         "id": user.id,
         "email": user.email,
@@ -128,10 +496,10 @@ def serialize_user(user: User) -> Dict[str, Any]:
     }
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
     if not credentials or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=401, detail="Not authenticated")
 
@@ -146,11 +514,18 @@ def get_current_user(
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    user = db.get(User, user_id)
+    issued_at = payload.get("iat")
+    principal = principal_cache.get(user_id, issued_at)
+    if principal is not None:
+        return principal
+
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(user_id, issued_at, principal)
+    return principal
 
 
 def serialize_ai_job(job: AIJob) -> Dict[str, Any]:
@@ -167,86 +542,53 @@ def serialize_ai_job(job: AIJob) -> Dict[str, Any]:
     }
 
 
-def serialize_note_stroke(stroke: NoteStroke) -> Dict[str, Any]:
-    try:
-        payload: Any = json.loads(stroke.payload)
-    except json.JSONDecodeError:
-        payload = stroke.payload
-    return {
-        "id": stroke.id,
-        "note_id": stroke.note_id,
-        "payload": payload,
-        "created_at": stroke.created_at.isoformat(),
-    }
+def serialize_note_stroke(
+    stroke: NoteStroke, bbox: Optional[BBox] = None, payload: Optional[bytes] = None
+) -> Optional[str]:
+    """Return the stroke row as a JSON object string.
+
+    The payload JSON is written straight from the packed columns, so no
+    per-point dicts are built on the way out. ``payload`` substitutes another
+    packed payload for the row's own (a level-of-detail copy). With ``bbox``
+    only the strokes intersecting it are kept, and rows left empty return
+    ``None``.
+    """
+    batch = unpack_stroke_batch(stroke.payload if payload is None else payload)
+    if bbox is not None:
+        batch = clip_batch(batch, bbox)
+        if not batch.strokes:
+            return None
+    payload = stroke_batch_to_json(batch)
+    return (
+        f'{{"id":{stroke.id},"note_id":{json.dumps(stroke.note_id)},'
+        f'"payload":{payload},"created_at":"{stroke.created_at.isoformat()}"}}'
+    )
 
 
-def normalize_stroke_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
-    strokes = payload.get("strokes") or []
-    normalized_strokes: List[Dict[str, Any]] = []
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak If-None-Match comparison, as RFC 9110 specifies for GET."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return etag.removeprefix("W/") in candidates
 
-    for stroke in strokes:
-        if not isinstance(stroke, dict):
-            continue
-        candidates = stroke.get("points") or stroke.get("path") or stroke.get("segments")
-        if isinstance(stroke.get("x"), list) and isinstance(stroke.get("y"), list):
-            candidates = list(zip(stroke.get("x"), stroke.get("y")))
-
-        normalized_points: List[Dict[str, Any]] = []
-        if candidates:
-            for point in candidates:
-                x = y = None
-                pressure = tilt = dt = None
-                if isinstance(point, dict):
-                    x = point.get("x")
-                    y = point.get("y")
-                    pressure = point.get("p", point.get("pressure"))
-                    tilt = point.get("t", point.get("tilt"))
-                    dt = point.get("dt")
-                elif isinstance(point, (list, tuple)) and len(point) >= 2:
-                    x, y = point[0], point[1]
-                if x is None or y is None:
-                    continue
-                normalized_point: Dict[str, Any] = {
-                    "x": float(x),
-                    "y": float(y),
-                    "pressure": None if pressure is None else float(pressure),
-                    "tilt": None if tilt is None else float(tilt),
-                }
-                if dt is not None:
-                    try:
-                        normalized_point["dt"] = int(dt)
-                    except (TypeError, ValueError):
-                        pass
-                normalized_points.append(normalized_point)
-
-        normalized_stroke = dict(stroke)
-        normalized_stroke["points"] = normalized_points
-        normalized_strokes.append(normalized_stroke)
-
-    normalized_payload = dict(payload)
-    normalized_payload["strokes"] = normalized_strokes
-    return normalized_payload
-
-
-def _iter_stroke_points(stroke: Dict[str, Any]) -> Iterable[Tuple[float, float]]:
-    candidates = stroke.get("points") or stroke.get("path") or stroke.get("segments")
-    if isinstance(stroke.get("x"), list) and isinstance(stroke.get("y"), list):
-        candidates = list(zip(stroke.get("x"), stroke.get("y")))
-    if not candidates:
-        return []
-    points: List[Tuple[float, float]] = []
-    for point in candidates:
-        if isinstance(point, dict):
-            x = point.get("x")
-            y = point.get("y")
-        elif isinstance(point, (list, tuple)) and len(point) >= 2:
-            x, y = point[0], point[1]
-        else:
-            continue
-        if x is None or y is None:
-            continue
-        points.append((float(x), float(y)))
-    return points
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def json_response_with_etag(request: Request, body: Any) -> Response:
+    content = json.dumps(body, separators=(",", ":")).encode("utf-8")
+    headers = {
+        "ETag": f'"{hashlib.sha1(content).hexdigest()}"',
+        "Cache-Control": "private, no-cache",
+    }
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    return Response(content=content, media_type="application/json", headers=headers)
 
 
 def _stroke_width(stroke: Dict[str, Any]) -> int:
@@ -260,61 +602,61 @@ def _stroke_width(stroke: Dict[str, Any]) -> int:
     return 2
 
 
-def render_note_strokes_to_png(note: Note, job_id: int) -> str:
-    from PIL import Image, ImageDraw
-
-    strokes_sorted = sorted(note.strokes, key=lambda item: (item.created_at, item.id))
-    stroke_sets: List[Tuple[List[Tuple[float, float]], int]] = []
-    min_x = min_y = None
-    max_x = max_y = None
-    for stroke_entry in strokes_sorted:
-        try:
-            payload = json.loads(stroke_entry.payload)
-        except json.JSONDecodeError:
-            continue
-        for stroke in payload.get("strokes", []):
-            points = list(_iter_stroke_points(stroke))
-            if not points:
+def collect_note_strokes(note: Note) -> List[PlacedStroke]:
+    """Decode a note's stroke rows, in render order, into placed strokes."""
+    placed: List[PlacedStroke] = []
+    for stroke_entry in sorted(note.strokes, key=lambda item: (item.created_at, item.id)):
+        batch = unpack_stroke_batch(stroke_entry.payload)
+        for index, stroke in enumerate(batch.strokes):
+            if not len(stroke):
                 continue
-            stroke_sets.append((points, _stroke_width(stroke)))
-            for x, y in points:
-                min_x = x if min_x is None else min(min_x, x)
-                min_y = y if min_y is None else min(min_y, y)
-                max_x = x if max_x is None else max(max_x, x)
-                max_y = y if max_y is None else max(max_y, y)
-
-    if min_x is None or min_y is None or max_x is None or max_y is None:
-        raise ValueError("No stroke data available to render.")
-
-    padding = 20
-    width = max(1, int(math.ceil(max_x - min_x + padding * 2)))
-    height = max(1, int(math.ceil(max_y - min_y + padding * 2)))
-    image = Image.new("RGB", (width, height), color="white")
-    draw = ImageDraw.Draw(image)
-
-    for points, stroke_width in stroke_sets:
-        translated = [
-            (x - min_x + padding, y - min_y + padding)
-            for x, y in points
-        ]
-        if len(translated) == 1:
-            x, y = translated[0]
-            radius = max(1, stroke_width)
-            draw.ellipse(
-                (x - radius, y - radius, x + radius, y + radius),
-                fill="black",
-                outline="black",
+            placed.append(
+                place_stroke(
+                    (stroke_entry.id, index), stroke.x, stroke.y, _stroke_width(stroke.attrs)
+                )
             )
-        else:
-            draw.line(translated, fill="black", width=stroke_width, joint="curve")
+    return placed
+
 
-    note_dir = os.path.join(OCR_IMAGE_DIR, f"note_{note.id}")
+def layout_note_tiles(strokes: Sequence[PlacedStroke]) -> TileLayout:
+    """Plan the grayscale OCR tiles for a page or region without drawing anything."""
+    return layout_tiles(strokes, OCR_TILE_SIZE)
+
+
+def save_ocr_debug_image(note_id: int, job_id: int, pixels: np.ndarray, label: str) -> str:
+    """Keep the raster an OCR job saw, for debugging; see ``OCR_DEBUG_IMAGES``."""
+    from PIL import Image
+
+    note_dir = os.path.join(OCR_IMAGE_DIR, f"note_{note_id}")
     os.makedirs(note_dir, exist_ok=True)
-    image_path = os.path.join(note_dir, f"{job_id}.png")
-    image.save(image_path, format="PNG")
+    image_path = os.path.join(note_dir, f"{job_id}_{label}.png")
+    Image.fromarray(pixels).save(image_path, format="PNG")
     return image_path
 
 
+def prune_ocr_debug_images() -> int:
+    """Delete OCR debug images older than the retention window; returns the count."""
+    cutoff = datetime.datetime.now().timestamp() - OCR_DEBUG_IMAGE_RETENTION_HOURS * 3600
+    removed = 0
+    for root, _, files in os.walk(OCR_IMAGE_DIR, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        if root != OCR_IMAGE_DIR:
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+    if removed:
+        logger.info("Pruned %s OCR debug images", removed)
+    return removed
+
+
 def verify_ocr_reuse() -> None:
     """Run two OCR passes in the same process to verify reuse."""
     if not OCR_ENABLED:
@@ -350,100 +692,368 @@ def verify_ocr_reuse() -> None:
             pass
 
 
+def fail_ocr_job(job: AIJob, error: str) -> None:
+    now = datetime.datetime.utcnow()
+    job.status = JOB_STATUS_FAILED
+    job.error = error
+    job.finished_at = now
+    job.updated_at = now
+
+
+def complete_ocr_job(
+    job: AIJob, note: Note, engine_name: str, text: str, confidence: Optional[float]
+) -> None:
+    now = datetime.datetime.utcnow()
+    note.ocr_text = text or ""
+    note.ocr_engine = engine_name
+    note.ocr_confidence = confidence
+    note.ocr_updated_at = now
+    job.status = JOB_STATUS_SUCCESS
+    job.finished_at = now
+    job.updated_at = now
+
+
+# ------------------------------------------------------------------
+# OCR result cache
+# ------------------------------------------------------------------
+
+
+def ocr_stroke_hash(note: Note) -> str:
+    """Hash the note's stroke payloads in render order; the OCR cache key."""
+    digest = hashlib.sha256()
+    for stroke in sorted(note.strokes, key=lambda item: (item.created_at, item.id)):
+        payload = bytes(stroke.payload)
+        digest.update(len(payload).to_bytes(8, "little"))
+        digest.update(payload)
+    return digest.hexdigest()
+
+
+def lookup_ocr_cache(
+    db: Session, stroke_hash: str, engine: OCREngine
+) -> Optional[OCRCacheEntry]:
+    entry = db.execute(
+        select(OCRCacheEntry).where(
+            OCRCacheEntry.stroke_hash == stroke_hash,
+            OCRCacheEntry.engine == engine.name,
+            OCRCacheEntry.engine_version == engine.version(),
+        )
+    ).scalar_one_or_none()
+    if entry:
+        entry.hit_count = OCRCacheEntry.hit_count + 1
+        entry.last_used_at = datetime.datetime.utcnow()
+    return entry
+
+
+def store_ocr_cache(
+    db: Session,
+    stroke_hash: str,
+    engine: OCREngine,
+    text: str,
+    confidence: Optional[float],
+) -> None:
+    now = datetime.datetime.utcnow()
+    statement = dialect_insert(OCRCacheEntry).values(
+        stroke_hash=stroke_hash,
+        engine=engine.name,
+        engine_version=engine.version(),
+        ocr_text=text or "",
+        ocr_confidence=confidence,
+        hit_count=0,
+        created_at=now,
+        last_used_at=now,
+    )
+    # Another worker may have cached the same stroke set meanwhile.
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["stroke_hash", "engine", "engine_version"],
+            set_={
+                "ocr_text": statement.excluded.ocr_text,
+                "ocr_confidence": statement.excluded.ocr_confidence,
+                "last_used_at": statement.excluded.last_used_at,
+            },
+        )
+    )
+
+
+def prune_ocr_cache() -> int:
+    """Evict cache entries unused for OCR_CACHE_TTL_DAYS, then the least recently
+    used ones beyond OCR_CACHE_MAX_ENTRIES. Returns the number removed."""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=OCR_CACHE_TTL_DAYS)
+        removed = db.execute(
+            delete(OCRCacheEntry).where(OCRCacheEntry.last_used_at < cutoff)
+        ).rowcount
+        overflow = (
+            select(OCRCacheEntry.id)
+            .order_by(OCRCacheEntry.last_used_at.desc(), OCRCacheEntry.id.desc())
+            .offset(OCR_CACHE_MAX_ENTRIES)
+        )
+        removed += db.execute(
+            delete(OCRCacheEntry).where(OCRCacheEntry.id.in_(overflow))
+        ).rowcount
+        db.commit()
+        if removed:
+            logger.info("Evicted %s OCR cache entries", removed)
+        return removed
+    finally:
+        db.close()
+
+
+# ------------------------------------------------------------------
+# Incremental OCR
+# ------------------------------------------------------------------
+
+RegionPlan = List[Tuple[StrokeRegion, Optional[OCRResult]]]
+
+
+def plan_region_ocr(note: Note, engine: OCREngine) -> RegionPlan:
+    """Split a note into line regions and reuse stored results for unchanged ones.
+
+    Regions paired with ``None`` contain strokes added since the last
+    successful OCR (or merged with such strokes) and need recognizing.
+    """
+    regions = group_line_regions(collect_note_strokes(note), OCR_REGION_LINE_GAP)
+    if not regions:
+        raise ValueError("No stroke data available to render.")
+    version = engine.version()
+    stored = {
+        region.stroke_key: (region.ocr_text, region.ocr_confidence)
+        for region in note.ocr_regions
+        if region.engine == engine.name and region.engine_version == version
+    }
+    return [(region, stored.get(region.key)) for region in regions]
+
+
+def save_region_ocr(
+    db: Session, note: Note, engine: OCREngine, results: Sequence[Tuple[StrokeRegion, OCRResult]]
+) -> OCRResult:
+    """Replace the note's stored regions and return the merged (text, confidence)."""
+    version = engine.version()
+    note.ocr_regions.clear()
+    for region, (text, confidence) in results:
+        min_x, min_y, max_x, max_y = region.bounds
+        note.ocr_regions.append(
+            NoteOCRRegion(
+                stroke_key=region.key,
+                min_x=min_x,
+                min_y=min_y,
+                max_x=max_x,
+                max_y=max_y,
+                ocr_text=text or "",
+                ocr_confidence=confidence,
+                engine=engine.name,
+                engine_version=version,
+            )
+        )
+    db.flush()
+    return merge_ocr_results([result for _, result in results])
+
+
+def merge_ocr_results(results: Sequence[OCRResult]) -> OCRResult:
+    """Join per-tile or per-region results in reading order; average confidences."""
+    lines = [text for text, _ in results if text]
+    confidences = [
+        confidence for text, confidence in results if text and confidence is not None
+    ]
+    avg_confidence = sum(confidences) / len(confidences) if confidences else None
+    return "\n".join(lines), avg_confidence
+
+
+OCRPartKey = Tuple[int, int]
+
+
+def iter_ocr_tiles(
+    rendered: Sequence[Tuple[AIJob, Note, str, List[TileLayout], Optional[RegionPlan]]]
+) -> Iterator[Tuple[OCRPartKey, np.ndarray]]:
+    """Draw every job's tiles lazily, tagged with (job index, part index)."""
+    for job_index, (job, note, _, layouts, _) in enumerate(rendered):
+        for part_index, layout in enumerate(layouts):
+            for tile in iter_stroke_tiles(layout):
+                if OCR_DEBUG_IMAGES:
+                    label = f"p{part_index}_t{tile.column}_{tile.row}"
+                    save_ocr_debug_image(note.id, job.id, tile.pixels, label)
+                yield (job_index, part_index), tile.pixels
+
+
+def run_ocr_stream(
+    engine: OCREngine, tiles: Iterator[Tuple[OCRPartKey, np.ndarray]]
+) -> Dict[OCRPartKey, List[OCRResult]]:
+    """Feed tiles to the engine in chunks of OCR_TILE_BATCH_SIZE.
+
+    Only one chunk of tiles is alive at a time, so peak raster memory is
+    bounded by the tile size, not by how large the notes are.
+    """
+    results: Dict[OCRPartKey, List[OCRResult]] = {}
+    keys: List[OCRPartKey] = []
+    images: List[np.ndarray] = []
+
+    def flush() -> None:
+        for key, result in zip(keys, engine.run_batch(images)):
+            results.setdefault(key, []).append(result)
+        keys.clear()
+        images.clear()
+
+    for key, pixels in tiles:
+        keys.append(key)
+        images.append(pixels)
+        if len(images) >= OCR_TILE_BATCH_SIZE:
+            flush()
+    if images:
+        flush()
+    return results
+
+
 def run_ocr_job(job_id: int) -> None:
+    """Inline mode: claim one queued job and run it in this process.
+
+    The compare-and-set claim keeps a job from running twice if a worker
+    process (or a second inline task) picked it up first.
+    """
     db = SessionLocal()
     try:
-        job = db.get(AIJob, job_id)
-        if not job:
-            return
-        if job.status not in {JOB_STATUS_QUEUED, JOB_STATUS_RUNNING}:
+        now = datetime.datetime.utcnow()
+        result = db.execute(
+            update(AIJob)
+            .where(AIJob.id == job_id, AIJob.status == JOB_STATUS_QUEUED)
+            .values(status=JOB_STATUS_RUNNING, started_at=now, updated_at=now)
+        )
+        db.commit()
+    finally:
+        db.close()
+    if result.rowcount == 1:
+        run_ocr_jobs([job_id])
+
+
+def run_ocr_jobs(job_ids: Sequence[int]) -> None:
+    """Render each job's note and OCR all of them with one engine batch call.
+
+    The caller must already have claimed the jobs (moved them to running).
+    Notes whose stroke set is already in the OCR cache finish without
+    rendering. With ``OCR_INCREMENTAL`` only the line regions that changed
+    since the last run are rendered and recognized. A job that cannot be
+    rendered fails on its own; the rest of the batch still runs.
+    """
+    db = SessionLocal()
+    try:
+        jobs: List[AIJob] = []
+        for job_id in job_ids:
+            job = db.get(AIJob, job_id)
+            if job and job.status == JOB_STATUS_RUNNING:
+                jobs.append(job)
+        if not jobs:
             return
         if not OCR_ENABLED:
-            now = datetime.datetime.utcnow()
-            job.status = JOB_STATUS_FAILED
-            job.error = "OCR is disabled. Set OCR_ENABLED=true to enable OCR jobs."
-            job.finished_at = now
-            job.updated_at = now
+            for job in jobs:
+                fail_ocr_job(job, "OCR is disabled. Set OCR_ENABLED=true to enable OCR jobs.")
             db.commit()
             return
-        now = datetime.datetime.utcnow()
-        job.status = JOB_STATUS_RUNNING
-        job.started_at = now
-        job.updated_at = now
-        db.commit()
-
-        note = db.execute(
-            select(Note)
-            .join(Notebook)
-            .where(Note.id == job.note_id, Notebook.user_id == job.user_id)
-        ).scalar_one_or_none()
-        if not note:
-            raise ValueError("Note not found for OCR job.")
 
-        logger.info("OCR job start job_id=%s note_id=%s", job.id, note.id)
-        logger.info("render image start job_id=%s note_id=%s", job.id, note.id)
-        image_path = render_note_strokes_to_png(note, job.id)
-        logger.info("render image finish job_id=%s note_id=%s", job.id, note.id)
         engine = get_engine(OCR_ENGINE)
         if not engine:
-            now = datetime.datetime.utcnow()
-            job.status = JOB_STATUS_FAILED
-            job.error = f"OCR engine '{OCR_ENGINE}' is unavailable."
-            job.finished_at = now
-            job.updated_at = now
+            for job in jobs:
+                fail_ocr_job(job, f"OCR engine '{OCR_ENGINE}' is unavailable.")
             db.commit()
             return
-        try:
-            logger.info(
-                "ocr run start engine=%s job_id=%s note_id=%s",
-                engine.name,
-                job.id,
-                note.id,
-            )
-            text, confidence = engine.run(image_path)
+
+        # Each job contributes its whole page, or (incremental mode) each
+        # changed region, as tile layouts; tiles are drawn while OCR consumes them.
+        rendered: List[Tuple[AIJob, Note, str, List[TileLayout], Optional[RegionPlan]]] = []
+        for job in jobs:
+            note = db.execute(
+                select(Note)
+                .join(Notebook)
+                .where(Note.id == job.note_id, Notebook.user_id == job.user_id)
+            ).scalar_one_or_none()
+            if not note:
+                fail_ocr_job(job, "Note not found for OCR job.")
+                continue
+            logger.info("OCR job start job_id=%s note_id=%s", job.id, note.id)
+            stroke_hash = ocr_stroke_hash(note)
+            cached = lookup_ocr_cache(db, stroke_hash, engine)
+            if cached:
+                complete_ocr_job(job, note, engine.name, cached.ocr_text, cached.ocr_confidence)
+                logger.info("OCR cache hit job_id=%s note_id=%s", job.id, note.id)
+                continue
+            plan: Optional[RegionPlan] = None
+            try:
+                if OCR_INCREMENTAL:
+                    plan = plan_region_ocr(note, engine)
+                    layouts = [
+                        layout_note_tiles(region.strokes)
+                        for region, result in plan
+                        if result is None
+                    ]
+                else:
+                    layouts = [layout_note_tiles(collect_note_strokes(note))]
+            except Exception as exc:  # noqa: BLE001 - preserve job failure detail
+                fail_ocr_job(job, str(exc))
+                logger.exception("OCR job %s failed during render", job.id)
+                continue
             logger.info(
-                "ocr run finish engine=%s job_id=%s note_id=%s",
-                engine.name,
+                "render layout finish job_id=%s note_id=%s parts=%s tiles=%s",
                 job.id,
                 note.id,
+                len(layouts),
+                sum(len(layout) for layout in layouts),
             )
+            rendered.append((job, note, stroke_hash, layouts, plan))
+        db.commit()
+        if not rendered:
+            return
+
+        job_list = ",".join(str(item[0].id) for item in rendered)
+        try:
+            logger.info("ocr run start engine=%s job_ids=%s", engine.name, job_list)
+            tile_results = run_ocr_stream(engine, iter_ocr_tiles(rendered))
+            logger.info("ocr run finish engine=%s job_ids=%s", engine.name, job_list)
         except (ImportError, RuntimeError) as exc:
-            now = datetime.datetime.utcnow()
-            job.status = JOB_STATUS_FAILED
-            job.error = f"OCR engine '{engine.name}' failed: {exc}"
-            job.finished_at = now
-            job.updated_at = now
+            for item in rendered:
+                fail_ocr_job(item[0], f"OCR engine '{engine.name}' failed: {exc}")
             db.commit()
-            logger.exception("OCR job %s failed during OCR run", job_id)
+            logger.exception("OCR jobs %s failed during OCR run", job_list)
             return
-        now = datetime.datetime.utcnow()
-        logger.info("save results start job_id=%s note_id=%s", job.id, note.id)
-        note.ocr_text = text or ""
-        note.ocr_engine = engine.name
-        note.ocr_confidence = confidence
-        note.ocr_updated_at = now
-        job.status = JOB_STATUS_SUCCESS
-        job.finished_at = now
-        job.updated_at = now
+
+        for job_index, (job, note, stroke_hash, layouts, plan) in enumerate(rendered):
+            part_results = iter(
+                merge_ocr_results(tile_results.get((job_index, part_index), []))
+                for part_index in range(len(layouts))
+            )
+            if plan is None:
+                text, confidence = next(part_results)
+            else:
+                region_results = [
+                    (region, result if result is not None else next(part_results))
+                    for region, result in plan
+                ]
+                text, confidence = save_region_ocr(db, note, engine, region_results)
+            complete_ocr_job(job, note, engine.name, text, confidence)
+            store_ocr_cache(db, stroke_hash, engine, text, confidence)
         db.commit()
-        logger.info("save results finish job_id=%s note_id=%s", job.id, note.id)
+        logger.info("save results finish job_ids=%s", job_list)
     except Exception as exc:  # noqa: BLE001 - preserve job failure detail
-        now = datetime.datetime.utcnow()
-        job = db.get(AIJob, job_id)
-        if job:
-            job.status = JOB_STATUS_FAILED
-            job.error = str(exc)
-            job.finished_at = now
-            job.updated_at = now
-            db.commit()
-        logger.exception("OCR job %s failed", job_id)
+        db.rollback()
+        for job_id in job_ids:
+            job = db.get(AIJob, job_id)
+            if job and job.status == JOB_STATUS_RUNNING:
+                fail_ocr_job(job, str(exc))
+        db.commit()
+        logger.exception("OCR jobs %s failed", list(job_ids))
     finally:
         db.close()
 
 
+def is_stale_ocr_job(job: AIJob, now: datetime.datetime) -> bool:
+    # Worker-claimed jobs report liveness; inline jobs only have a start time.
+    if job.heartbeat_at:
+        return now - job.heartbeat_at > OCR_HEARTBEAT_TIMEOUT
+    started_at = job.started_at or job.created_at
+    if not OCR_JOB_TIMEOUT or not started_at:
+        return False
+    return now - started_at > OCR_JOB_TIMEOUT
+
+
 def mark_stale_ocr_jobs() -> None:
-    if not OCR_JOB_TIMEOUT:
-        return
     db = SessionLocal()
     try:
         now = datetime.datetime.utcnow()
@@ -453,30 +1063,365 @@ def mark_stale_ocr_jobs() -> None:
                 AIJob.status == JOB_STATUS_RUNNING,
             )
         ).scalars().all()
-        stale_jobs: List[AIJob] = []
-        for job in running_jobs:
-            started_at = job.started_at or job.created_at
-            if not started_at:
-                continue
-            if now - started_at > OCR_JOB_TIMEOUT:
-                stale_jobs.append(job)
+        stale_jobs = [job for job in running_jobs if is_stale_ocr_job(job, now)]
+        requeued = 0
         for job in stale_jobs:
+            job.updated_at = now
+            if OCR_QUEUE_MODE == "worker" and job.attempts < OCR_MAX_ATTEMPTS:
+                job.status = JOB_STATUS_QUEUED
+                job.error = f"OCR worker {job.worker_id} stopped responding; requeued."
+                job.worker_id = None
+                job.heartbeat_at = None
+                requeued += 1
+                continue
             job.status = JOB_STATUS_FAILED
-            job.error = (
-                f"OCR job timed out after {OCR_JOB_TIMEOUT_MINUTES} minutes."
-            )
+            if job.heartbeat_at:
+                job.error = (
+                    f"OCR worker {job.worker_id} stopped responding after "
+                    f"{job.attempts} attempts."
+                )
+            else:
+                job.error = (
+                    f"OCR job timed out after {OCR_JOB_TIMEOUT_MINUTES} minutes."
+                )
             job.finished_at = now
-            job.updated_at = now
         if stale_jobs:
             db.commit()
             logger.warning(
-                "Marked %s stale OCR jobs as failed.",
+                "Found %s stale OCR jobs (%s requeued, %s failed).",
                 len(stale_jobs),
+                requeued,
+                len(stale_jobs) - requeued,
             )
     finally:
         db.close()
 
 
+# ------------------------------------------------------------------
+# Storage + thumbnails
+# ------------------------------------------------------------------
+
+THUMBNAIL_PREFIX = "thumbnails/"
+THUMBNAIL_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.(webp|png)$")
+# Thumbnail URLs are capabilities: served without auth (for <img>), but named by
+# an unguessable content hash and only handed out by authenticated endpoints.
+# "private" keeps them out of shared caches, which would serve them to anyone.
+THUMBNAIL_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+async def iter_upload_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    """Read an upload in ``UPLOAD_CHUNK_BYTES`` pieces, enforcing ``UPLOAD_MAX_BYTES``."""
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return
+        size += len(chunk)
+        if size > UPLOAD_MAX_BYTES:
+            raise HTTPException(
+                status_code=413, detail=f"File is larger than {UPLOAD_MAX_BYTES} bytes"
+            )
+        yield chunk
+
+
+BLOB_PREFIX = "blobs/"
+
+
+def blob_key(digest: str) -> str:
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest}"
+
+
+async def hash_upload(file: UploadFile) -> Tuple[str, int]:
+    """SHA-256 and size of an upload, read in chunks; rewinds it afterwards.
+
+    This reads the request's local spool file, so storing the upload
+    afterwards is still the only write to storage.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in iter_upload_chunks(file):
+        await run_in_threadpool(digest.update, chunk)
+        size += len(chunk)
+    await file.seek(0)
+    return digest.hexdigest(), size
+
+
+async def link_blob(
+    db: AsyncSession, digest: str, size: int, content_type: str
+) -> Tuple[bool, bool]:
+    """Count one more reference to a blob, creating its row on first use.
+
+    Returns ``(linked, stored)``. ``linked`` is False when the garbage
+    collector has claimed the blob; the caller must then store its own copy
+    instead. ``stored`` is True once some upload has finished writing the
+    blob's object, so this upload need not write it again.
+    """
+    now = datetime.datetime.utcnow()
+    statement = dialect_insert(StoredBlob).values(
+        digest=digest,
+        storage_key=blob_key(digest),
+        size=size,
+        content_type=content_type,
+        ref_count=1,
+        created_at=now,
+        touched_at=now,
+    )
+    stored_at = (
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["digest"],
+                set_={
+                    "ref_count": StoredBlob.ref_count + 1,
+                    "touched_at": now,
+                    "unlinked_at": None,
+                },
+                where=StoredBlob.ref_count >= 0,
+            ).returning(StoredBlob.stored_at)
+        )
+    ).first()
+    if stored_at is None:
+        return False, False
+    return True, stored_at[0] is not None
+
+
+async def mark_blob_stored(db: AsyncSession, digest: str) -> None:
+    await db.execute(
+        update(StoredBlob)
+        .where(StoredBlob.digest == digest, StoredBlob.stored_at.is_(None))
+        .values(stored_at=datetime.datetime.utcnow())
+    )
+
+
+async def unlink_blobs(db: AsyncSession, digests: Iterable[Optional[str]]) -> None:
+    """Drop one reference per entry in ``digests`` (repeats count repeatedly).
+
+    Blobs left with no references get ``unlinked_at``, which starts their
+    collection grace period. The caller commits, together with the change
+    that removed the references.
+    """
+    counts = Counter(digest for digest in digests if digest)
+    if not counts:
+        return
+    by_count: Dict[int, List[str]] = defaultdict(list)
+    for digest, count in counts.items():
+        by_count[count].append(digest)
+    for count, group in by_count.items():
+        await db.execute(
+            update(StoredBlob)
+            .where(StoredBlob.digest.in_(group), StoredBlob.ref_count > 0)
+            .values(
+                ref_count=case(
+                    (StoredBlob.ref_count > count, StoredBlob.ref_count - count), else_=0
+                )
+            )
+        )
+    await db.execute(
+        update(StoredBlob)
+        .where(StoredBlob.digest.in_(list(counts)), StoredBlob.ref_count == 0)
+        .values(unlinked_at=datetime.datetime.utcnow())
+    )
+
+
+async def note_file_blobs(db: AsyncSession, condition: Any) -> List[str]:
+    """Blob digests of the files on notes matching ``condition``, one per file."""
+    return list(
+        (
+            await db.execute(
+                select(NoteFile.blob_digest)
+                .join(Note, Note.id == NoteFile.note_id)
+                .join(Notebook, Notebook.id == Note.notebook_id)
+                .where(condition, NoteFile.blob_digest.is_not(None))
+            )
+        ).scalars()
+    )
+
+
+async def collect_unreferenced_blobs() -> int:
+    """Delete blobs that have had no references for ``BLOB_GC_GRACE_HOURS``.
+
+    ``ref_count`` is authoritative: uploads link before they write and
+    unlink if they fail, and notebook/subject deletes unlink their files.
+    Each blob is first claimed (``ref_count = -1``) so a concurrent upload
+    cannot link to it, then its object is deleted, then its row. Returns
+    how many went.
+    """
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=BLOB_GC_GRACE_HOURS)
+    collectable = or_(
+        StoredBlob.ref_count < 0,
+        and_(StoredBlob.ref_count == 0, StoredBlob.unlinked_at < cutoff),
+    )
+    removed = 0
+    async with AsyncSessionLocal() as db:
+        candidates = (
+            await db.execute(select(StoredBlob.digest, StoredBlob.storage_key).where(collectable))
+        ).all()
+        for digest, key in candidates:
+            claimed = (
+                await db.execute(
+                    update(StoredBlob)
+                    .where(StoredBlob.digest == digest, collectable)
+                    .values(ref_count=-1)
+                )
+            ).rowcount
+            await db.commit()
+            if not claimed:
+                continue
+            await storage.delete(key)
+            await db.execute(
+                delete(StoredBlob).where(StoredBlob.digest == digest, StoredBlob.ref_count < 0)
+            )
+            await db.commit()
+            removed += 1
+    if removed:
+        logger.info("Deleted %s unreferenced blobs", removed)
+    return removed
+
+
+async def collect_blobs_periodically() -> None:
+    while True:
+        try:
+            await collect_unreferenced_blobs()
+        except Exception:  # noqa: BLE001 - retry on the next pass
+            logger.exception("Blob garbage collection failed")
+        await asyncio.sleep(BLOB_GC_INTERVAL_HOURS * 3600)
+
+
+def thumbnail_url(key: Optional[str]) -> Optional[str]:
+    if not key:
+        return None
+    return "/api/thumbnails/" + key[len(THUMBNAIL_PREFIX):]
+
+
+def render_note_thumbnail(note_id: int) -> Optional[Tuple[int, Optional[str], Optional[bytes]]]:
+    """Render a note's preview if strokes were added since the last one.
+
+    Returns ``(newest stroke id, current key, image bytes)``, or None when
+    the stored preview is up to date.
+    """
+    db = SessionLocal()
+    try:
+        note = db.get(Note, note_id)
+        if note is None:
+            return None
+        latest = latest_stroke_id(db, note.id)
+        if not latest or latest == note.thumbnail_stroke_id:
+            return None
+        strokes = collect_note_strokes(note)
+        if not strokes:
+            return latest, note.thumbnail_key, None
+        pixels = render_thumbnail(strokes, THUMBNAIL_SIZE)
+        return latest, note.thumbnail_key, encode_thumbnail(pixels, THUMBNAIL_FORMAT)
+    finally:
+        db.close()
+
+
+def save_note_thumbnail(
+    note_id: int, stroke_id: int, key: Optional[str], previous: Optional[str]
+) -> bool:
+    """Point the note at its new preview; True when ``previous`` is now unused."""
+    db = SessionLocal()
+    try:
+        values: Dict[str, Any] = {"thumbnail_stroke_id": stroke_id}
+        if key:
+            values["thumbnail_key"] = key
+        db.execute(update(Note).where(Note.id == note_id).values(**values))
+        db.commit()
+        if not previous or previous == key or not key:
+            return False
+        return not db.execute(
+            select(Note.id).where(Note.thumbnail_key == previous).limit(1)
+        ).first()
+    finally:
+        db.close()
+
+
+async def refresh_note_thumbnail(note_id: int) -> Optional[str]:
+    """Bring a note's preview up to date and return its storage key.
+
+    The image is stored under its content hash, so its URL changes exactly
+    when its pixels do and can be cached forever.
+    """
+    rendered = await run_in_threadpool(render_note_thumbnail, note_id)
+    if rendered is None:
+        return None
+    stroke_id, previous, data = rendered
+    key = None
+    if data is not None:
+        key = f"{THUMBNAIL_PREFIX}{hashlib.sha256(data).hexdigest()}.{THUMBNAIL_FORMAT}"
+        if key != previous:
+            await storage.put_bytes(key, data, THUMBNAIL_CONTENT_TYPES[THUMBNAIL_FORMAT])
+    if await run_in_threadpool(save_note_thumbnail, note_id, stroke_id, key, previous):
+        await storage.delete(previous)
+    return key or previous
+
+
+async def delete_unused_thumbnails(db: AsyncSession, keys: Iterable[Optional[str]]) -> None:
+    """Drop stored previews that no note points at any more, e.g. after a delete."""
+    keys = {key for key in keys if key}
+    if not keys:
+        return
+    in_use = set(
+        (await db.execute(select(Note.thumbnail_key).where(Note.thumbnail_key.in_(keys))))
+        .scalars()
+    )
+    for key in keys - in_use:
+        await storage.delete(key)
+
+
+async def _refresh_note_thumbnail_logged(note_id: int) -> None:
+    started = datetime.datetime.utcnow()
+    try:
+        key = await refresh_note_thumbnail(note_id)
+    except Exception:
+        logger.exception("Thumbnail render failed for note %s", note_id)
+        return
+    logger.info(
+        "Thumbnail for note %s is %s (%.0f ms)",
+        note_id,
+        key,
+        (datetime.datetime.utcnow() - started).total_seconds() * 1000,
+    )
+
+
+class ThumbnailScheduler:
+    """Debounces thumbnail renders per note on the API event loop.
+
+    Each stroke write pushes the note's render back by ``delay`` seconds, so a
+    burst of writes costs one render; a note that keeps changing is still
+    rendered at least every ``max_delay`` seconds. Rendering runs in the
+    thread pool so it never blocks request handling.
+    """
+
+    def __init__(self, delay: float, max_delay: float) -> None:
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending: Dict[int, Tuple[asyncio.TimerHandle, float]] = {}
+        self._running: set = set()
+
+    def schedule(self, note_ids: Iterable[int]) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        for note_id in note_ids:
+            handle, first_requested = self._pending.pop(note_id, (None, now))
+            if handle is not None:
+                handle.cancel()
+            when = min(now + self.delay, first_requested + self.max_delay)
+            self._pending[note_id] = (
+                loop.call_at(when, self._start, note_id),
+                first_requested,
+            )
+
+    def _start(self, note_id: int) -> None:
+        self._pending.pop(note_id, None)
+        task = asyncio.ensure_future(_refresh_note_thumbnail_logged(note_id))
+        # The loop only keeps weak references to tasks.
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+
+thumbnail_scheduler = ThumbnailScheduler(THUMBNAIL_DEBOUNCE_SECONDS, THUMBNAIL_MAX_DELAY_SECONDS)
+
+
 # ------------------------------------------------------------------
 # Schemas
 # ------------------------------------------------------------------
@@ -529,109 +1474,283 @@ class StrokePayload(BaseModel):
     captured_at: Optional[str] = None
 
 
+class NoteStrokePayload(StrokePayload):
+    note_id: int
+
+
+class BulkStrokePayload(BaseModel):
+    batches: List[NoteStrokePayload]
+
+
 class FlashcardPayload(BaseModel):
     cards: Optional[List[Dict[str, str]]] = None
 
 # ------------------------------------------------------------------
-# Defaults (single-transaction safe)
+# Library counters
 # ------------------------------------------------------------------
-
-INBOX_NOTEBOOKS = {"tablet": "Tablet Inbox"}
+# Subject.notebook_count, Notebook.note_count and Notebook.notes_updated_at
+# are kept in step by every path that adds, removes or writes to notebooks
+# and notes, in the same transaction, so the library endpoints never have to
+# aggregate notes. library_counter_drift() recomputes them to catch paths
+# that forget (see check_library_counters.py).
+
+
+async def count_notebooks(db: AsyncSession, subject_id: int, delta: int) -> None:
+    await db.execute(
+        update(Subject)
+        .where(Subject.id == subject_id)
+        .values(notebook_count=Subject.notebook_count + delta)
+    )
 
 
-def ensure_user_defaults(db: Session, user: User) -> None:
-    subject = db.execute(
-        select(Subject).where(
-            Subject.user_id == user.id,
-            Subject.name == "Unsorted",
+async def recount_notebooks(db: AsyncSession, subject_id: int) -> None:
+    """Set a subject's notebook count from its rows, for upserts that may or
+    may not have inserted one."""
+    await db.execute(
+        update(Subject)
+        .where(Subject.id == subject_id)
+        .values(
+            notebook_count=select(func.count(Notebook.id))
+            .where(Notebook.subject_id == subject_id)
+            .scalar_subquery()
         )
-    ).scalar_one_or_none()
+    )
 
-    if not subject:
-        subject = Subject(name="Unsorted", user_id=user.id)
-        db.add(subject)
-        db.flush()
 
-    notebook = db.execute(
-        select(Notebook).where(
-            Notebook.user_id == user.id,
-            Notebook.subject_id == subject.id,
-            Notebook.name == "Unsorted",
-        )
-    ).scalar_one_or_none()
+async def count_new_note(db: AsyncSession, notebook_id: int, when: datetime.datetime) -> None:
+    await db.execute(
+        update(Notebook)
+        .where(Notebook.id == notebook_id)
+        .values(note_count=Notebook.note_count + 1, notes_updated_at=when)
+    )
 
-    if not notebook:
-        db.add(
-            Notebook(
-                name="Unsorted",
-                color="#14b8a6",
-                icon="Atom",
-                user_id=user.id,
-                subject_id=subject.id,
-            )
-        )
 
+async def touch_notes(db: AsyncSession, note_ids: Iterable[int], when: datetime.datetime) -> None:
+    """Mark notes (and the notebooks holding them) as updated at ``when``."""
+    note_ids = list(note_ids)
+    await db.execute(update(Note).where(Note.id.in_(note_ids)).values(updated_at=when))
+    await db.execute(
+        update(Notebook)
+        .where(Notebook.id.in_(select(Note.notebook_id).where(Note.id.in_(note_ids))))
+        .values(notes_updated_at=when)
+    )
 
-def ensure_user_inbox(db: Session, user: User, inbox_type: str) -> Notebook:
-    normalized_type = inbox_type.strip().lower()
-    inbox_name = INBOX_NOTEBOOKS.get(normalized_type)
-    if not inbox_name:
-        raise HTTPException(status_code=400, detail="Unsupported inbox type")
 
-    subject = db.execute(
-        select(Subject).where(
-            Subject.user_id == user.id,
-            Subject.name == "Inbox",
+def library_counter_drift(
+    db: Session, user_id: Optional[int] = None, fix: bool = False
+) -> List[Dict[str, Any]]:
+    """Compare the stored library counters with the rows they summarize.
+
+    Returns one entry per subject or notebook whose stored value differs
+    from the recomputed one; with ``fix`` the stored values are replaced
+    (the caller commits).
+    """
+    notebook_counts = (
+        select(Notebook.subject_id, func.count(Notebook.id).label("actual"))
+        .group_by(Notebook.subject_id)
+        .subquery()
+    )
+    subjects = select(
+        Subject.id,
+        Subject.notebook_count,
+        func.coalesce(notebook_counts.c.actual, 0),
+    ).outerjoin(notebook_counts, notebook_counts.c.subject_id == Subject.id)
+    note_stats = (
+        select(
+            Note.notebook_id,
+            func.count(Note.id).label("actual"),
+            func.max(Note.updated_at).label("updated_at"),
         )
-    ).scalar_one_or_none()
+        .group_by(Note.notebook_id)
+        .subquery()
+    )
+    notebooks = select(
+        Notebook.id,
+        Notebook.note_count,
+        func.coalesce(note_stats.c.actual, 0),
+        Notebook.notes_updated_at,
+        note_stats.c.updated_at,
+    ).outerjoin(note_stats, note_stats.c.notebook_id == Notebook.id)
+    if user_id is not None:
+        subjects = subjects.where(Subject.user_id == user_id)
+        notebooks = notebooks.where(Notebook.user_id == user_id)
+
+    drift: List[Dict[str, Any]] = []
+    for subject_id, stored, actual in db.execute(subjects):
+        if stored != actual:
+            drift.append(
+                {"subject_id": subject_id, "notebook_count": stored, "actual": actual}
+            )
+            if fix:
+                db.execute(
+                    update(Subject).where(Subject.id == subject_id).values(notebook_count=actual)
+                )
+    for notebook_id, stored, actual, stored_at, actual_at in db.execute(notebooks):
+        if stored != actual or stored_at != actual_at:
+            drift.append(
+                {
+                    "notebook_id": notebook_id,
+                    "note_count": stored,
+                    "actual": actual,
+                    "notes_updated_at": stored_at,
+                    "actual_updated_at": actual_at,
+                }
+            )
+            if fix:
+                db.execute(
+                    update(Notebook)
+                    .where(Notebook.id == notebook_id)
+                    .values(note_count=actual, notes_updated_at=actual_at)
+                )
+    return drift
 
-    if not subject:
-        subject = Subject(name="Inbox", user_id=user.id)
-        db.add(subject)
-        db.flush()
+# ------------------------------------------------------------------
+# Defaults (provisioned once, idempotent)
+# ------------------------------------------------------------------
 
-    notebook = db.execute(
-        select(Notebook).where(
-            Notebook.user_id == user.id,
-            Notebook.subject_id == subject.id,
-            Notebook.name == inbox_name,
+INBOX_NOTEBOOKS = {"tablet": "Tablet Inbox"}
+DEFAULT_NOTEBOOK_STYLE = {"color": "#14b8a6", "icon": "Atom"}
+# Bump when provision_user_defaults learns to create something new; users
+# below it are provisioned again (idempotently) at their next login.
+DEFAULTS_VERSION = 1
+
+# Inbox notebook ids by inbox type. A cached id is re-checked wherever it is
+# used, so a deleted inbox is recreated rather than written to.
+inbox_cache = UserCache(INBOX_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
+
+
+async def upsert_system_subject(db: AsyncSession, user_id: int, key: str, name: str) -> int:
+    """Id of the user's subject with ``system_key``, creating it if needed."""
+    statement = dialect_insert(Subject).values(name=name, user_id=user_id, system_key=key)
+    # The no-op update makes RETURNING yield the existing row on conflict.
+    return (
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["user_id", "system_key"],
+                set_={"system_key": statement.excluded.system_key},
+            ).returning(Subject.id)
         )
-    ).scalar_one_or_none()
+    ).scalar_one()
 
-    if not notebook:
-        notebook = Notebook(
-            name=inbox_name,
-            color="#14b8a6",
-            icon="Atom",
-            user_id=user.id,
-            subject_id=subject.id,
-            is_inbox=True,
-            inbox_type=normalized_type,
+
+async def upsert_system_notebook(
+    db: AsyncSession, user_id: int, subject_id: int, key: str, name: str, **values: Any
+) -> int:
+    """Id of the user's notebook with ``system_key``, creating it if needed."""
+    statement = dialect_insert(Notebook).values(
+        name=name,
+        user_id=user_id,
+        subject_id=subject_id,
+        system_key=key,
+        **DEFAULT_NOTEBOOK_STYLE,
+        **values,
+    )
+    notebook_id = (
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["user_id", "system_key"],
+                set_={"system_key": statement.excluded.system_key},
+            ).returning(Notebook.id)
         )
-        db.add(notebook)
-        db.flush()
-    else:
-        notebook.is_inbox = True
-        notebook.inbox_type = normalized_type
+    ).scalar_one()
+    await recount_notebooks(db, subject_id)
+    return notebook_id
+
+
+async def provision_user_defaults(db: AsyncSession, user: User) -> None:
+    """Create the user's Unsorted subject and notebook, once.
+
+    Costs nothing when ``user.defaults_version`` is current, which is every
+    login after the first. The caller commits.
+    """
+    if user.defaults_version >= DEFAULTS_VERSION:
+        return
+    subject_id = await upsert_system_subject(db, user.id, "unsorted", "Unsorted")
+    await upsert_system_notebook(db, user.id, subject_id, "unsorted", "Unsorted")
+    user.defaults_version = DEFAULTS_VERSION
 
-    return notebook
+
+def inbox_name(inbox_type: str) -> Tuple[str, str]:
+    """Normalized inbox type and its notebook name; 400 for unknown types."""
+    normalized_type = inbox_type.strip().lower()
+    name = INBOX_NOTEBOOKS.get(normalized_type)
+    if not name:
+        raise HTTPException(status_code=400, detail="Unsupported inbox type")
+    return normalized_type, name
+
+
+async def provision_user_inbox(db: AsyncSession, user_id: int, inbox_type: str) -> int:
+    """Create (or find) the user's inbox notebook and cache its id. The caller commits."""
+    normalized_type, name = inbox_name(inbox_type)
+    subject_id = await upsert_system_subject(db, user_id, "inbox", "Inbox")
+    notebook_id = await upsert_system_notebook(
+        db,
+        user_id,
+        subject_id,
+        f"inbox:{normalized_type}",
+        name,
+        is_inbox=True,
+        inbox_type=normalized_type,
+    )
+    inbox_cache.put(user_id, normalized_type, notebook_id)
+    return notebook_id
+
+
+async def add_inbox_note(
+    db: AsyncSession, user_id: int, inbox_type: str, title: str, device: str
+) -> Tuple[int, int]:
+    """Insert a note into the user's inbox; returns ``(note id, notebook id)``.
+
+    With the inbox id cached this is one INSERT ... SELECT, which inserts
+    nothing if that notebook is gone or not the user's; the inbox is then
+    provisioned again. The caller commits.
+    """
+    normalized_type, _ = inbox_name(inbox_type)
+    now = datetime.datetime.utcnow()
+    notebook_id = inbox_cache.get(user_id, normalized_type)
+    if notebook_id is None:
+        notebook_id = await provision_user_inbox(db, user_id, normalized_type)
+    for attempt in range(2):
+        note_id = (
+            await db.execute(
+                insert(Note)
+                .from_select(
+                    ["title", "device", "created_at", "updated_at", "notebook_id"],
+                    select(
+                        literal(title, String),
+                        literal(device, String),
+                        literal(now, DateTime),
+                        literal(now, DateTime),
+                        Notebook.id,
+                    ).where(Notebook.id == notebook_id, Notebook.user_id == user_id),
+                )
+                .returning(Note.id)
+            )
+        ).scalar_one_or_none()
+        if note_id is not None:
+            await count_new_note(db, notebook_id, now)
+            return note_id, notebook_id
+        inbox_cache.invalidate(user_id)
+        notebook_id = await provision_user_inbox(db, user_id, normalized_type)
+    raise HTTPException(status_code=500, detail="Inbox notebook unavailable")
 
 # ------------------------------------------------------------------
 # Auth endpoints
 # ------------------------------------------------------------------
 
 @app.post("/api/auth/signup")
-async def signup(payload: AuthPayload, db: Session = Depends(get_db)):
-    if db.execute(select(User).where(User.email == payload.email.lower())).scalar_one_or_none():
+async def signup(payload: AuthPayload, db: AsyncSession = Depends(get_db)):
+    if (await db.execute(select(User).where(User.email == payload.email.lower()))).scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email already registered")
+    await release_connection(db)
 
-    user = User(email=payload.email.lower(), password_hash=hash_password(payload.password))
+    user = User(email=payload.email.lower(), password_hash=await hash_password(payload.password))
     db.add(user)
-    db.flush()
+    await db.flush()
 
-    ensure_user_defaults(db, user)
-    db.commit()
-    db.refresh(user)
+    await provision_user_defaults(db, user)
+    await db.commit()
+    await db.refresh(user)
 
     return {
         "access_token": create_access_token(user),
@@ -640,13 +1759,20 @@ async def signup(payload: AuthPayload, db: Session = Depends(get_db)):
     }
 
 @app.post("/api/auth/login")
-async def login(payload: AuthPayload, db: Session = Depends(get_db)):
-    user = db.execute(select(User).where(User.email == payload.email.lower())).scalar_one_or_none()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: AuthPayload, db: AsyncSession = Depends(get_db)):
+    user = (await db.execute(select(User).where(User.email == payload.email.lower()))).scalar_one_or_none()
+    await release_connection(db)
+    if not user or not await verify_password(payload.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if password_hasher.needs_rehash(user.password_hash):
+        # BCRYPT_ROUNDS changed since this hash was made; the password is
+        # only ever in hand here, so upgrade it now.
+        user.password_hash = await hash_password(payload.password)
 
-    ensure_user_defaults(db, user)
-    db.commit()
+    # Only accounts from before DEFAULTS_VERSION do any work here; for the
+    # rest this and the commit below issue no statements.
+    await provision_user_defaults(db, user)
+    await db.commit()
 
     return {
         "access_token": create_access_token(user),
@@ -655,47 +1781,55 @@ async def login(payload: AuthPayload, db: Session = Depends(get_db)):
     }
 
 @app.get("/api/auth/me")
-async def me(current_user: User = Depends(get_current_user)):
+async def me(current_user: Principal = Depends(get_current_user)):
     return {"user": serialize_user(current_user)}
 
 
 @app.post("/api/auth/change-password")
 async def change_password(
     payload: ChangePasswordPayload,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    if not verify_password(payload.current_password, current_user.password_hash):
+    user = await db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    await release_connection(db)
+    if not await verify_password(payload.current_password, user.password_hash):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     new_password = payload.new_password.strip()
     if len(new_password) < 8:
         raise HTTPException(status_code=400, detail="New password is too short")
-    current_user.password_hash = hash_password(new_password)
-    db.commit()
+    user.password_hash = await hash_password(new_password)
+    await db.commit()
+    principal_cache.invalidate(user.id)
     return {"status": "ok"}
 
+
+@app.get("/api/metrics/password-hashing")
+async def get_password_hashing_metrics():
+    """Queue depth and timings of the bcrypt pool in this process."""
+    return password_hasher.stats()
+
 # ------------------------------------------------------------------
 # Subjects + Notebooks
 # ------------------------------------------------------------------
 
-def serialize_subject(subject: Subject, notebook_count: int) -> Dict[str, Any]:
+def serialize_subject(subject: Subject) -> Dict[str, Any]:
     return {
         "id": subject.id,
         "name": subject.name,
-        "notebook_count": notebook_count,
+        "notebook_count": subject.notebook_count,
     }
 
 
-def serialize_notebook_base(
-    notebook: Notebook,
-    note_count: int,
-) -> Dict[str, Any]:
+def serialize_notebook_base(notebook: Notebook) -> Dict[str, Any]:
     return {
         "id": notebook.id,
         "name": notebook.name,
         "color": notebook.color,
         "icon": notebook.icon,
-        "note_count": note_count,
+        "note_count": notebook.note_count,
     }
 
 
@@ -713,63 +1847,46 @@ def serialize_inbox_notebook(notebook: Notebook) -> Dict[str, Any]:
 
 @app.get("/api/library")
 async def get_library(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    subjects_with_counts = db.execute(
-        select(Subject, func.count(Notebook.id))
-        .outerjoin(Notebook)
+    subjects = (await db.execute(
+        select(Subject)
         .where(Subject.user_id == current_user.id)
-        .group_by(Subject.id)
         .order_by(Subject.created_at)
-    ).all()
+    )).scalars()
 
-    notebooks_with_counts = db.execute(
-        select(Notebook, func.count(Note.id))
-        .outerjoin(Note)
+    notebooks = (await db.execute(
+        select(Notebook)
         .where(Notebook.user_id == current_user.id)
-        .group_by(Notebook.id)
         .order_by(Notebook.created_at.desc())
-    ).all()
+    )).scalars()
 
     return {
-        "subjects": [
-            serialize_subject(subject, notebook_count)
-            for subject, notebook_count in subjects_with_counts
-        ],
-        "notebooks": [
-            serialize_notebook_base(notebook, note_count)
-            for notebook, note_count in notebooks_with_counts
-        ],
+        "subjects": [serialize_subject(subject) for subject in subjects],
+        "notebooks": [serialize_notebook_base(notebook) for notebook in notebooks],
     }
 
 
 @app.get("/api/subjects")
 async def list_subjects(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    subjects_with_counts = db.execute(
-        select(Subject, func.count(Notebook.id))
-        .outerjoin(Notebook)
+    subjects = (await db.execute(
+        select(Subject)
         .where(Subject.user_id == current_user.id)
-        .group_by(Subject.id)
         .order_by(Subject.created_at)
-    ).all()
+    )).scalars()
 
-    return {
-        "subjects": [
-            serialize_subject(subject, notebook_count)
-            for subject, notebook_count in subjects_with_counts
-        ]
-    }
+    return {"subjects": [serialize_subject(subject) for subject in subjects]}
 
 
 @app.post("/api/subjects")
 async def create_subject(
     payload: SubjectCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
     name = payload.name.strip()
     if not name:
@@ -777,23 +1894,23 @@ async def create_subject(
 
     subject = Subject(name=name, user_id=current_user.id)
     db.add(subject)
-    db.commit()
-    db.refresh(subject)
-    return serialize_subject(subject, 0)
+    await db.commit()
+    await db.refresh(subject)
+    return serialize_subject(subject)
 
 
 @app.patch("/api/subjects/{subject_id}")
 async def update_subject(
     subject_id: int,
     payload: SubjectUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    subject = db.execute(
+    subject = (await db.execute(
         select(Subject).where(
             Subject.id == subject_id, Subject.user_id == current_user.id
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
 
@@ -802,58 +1919,87 @@ async def update_subject(
         raise HTTPException(status_code=400, detail="Name is required")
 
     subject.name = name
-    db.commit()
-    db.refresh(subject)
-    return serialize_subject(subject, len(subject.notebooks))
+    await db.commit()
+    await db.refresh(subject)
+    return serialize_subject(subject)
 
 
 @app.delete("/api/subjects/{subject_id}")
 async def delete_subject(
     subject_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    subject = db.execute(
+    subject = (await db.execute(
         select(Subject).where(
             Subject.id == subject_id, Subject.user_id == current_user.id
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
 
-    db.delete(subject)
-    db.commit()
+    thumbnail_keys = (await db.execute(
+        select(Note.thumbnail_key)
+        .join(Notebook)
+        .where(Notebook.subject_id == subject.id, Note.thumbnail_key.is_not(None))
+    )).scalars().all()
+    # The cascade removes the files' rows; their blob references go with them.
+    await unlink_blobs(db, await note_file_blobs(db, Notebook.subject_id == subject.id))
+    await db.delete(subject)
+    await db.commit()
+    inbox_cache.invalidate(current_user.id)
+    await delete_unused_thumbnails(db, thumbnail_keys)
     return {"status": "ok"}
 
 
 @app.get("/api/subjects/{subject_id}/notebooks")
 async def get_subject_notebooks(
     subject_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    subject = db.execute(
+    subject = (await db.execute(
         select(Subject).where(
             Subject.id == subject_id, Subject.user_id == current_user.id
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
 
-    notebooks_with_stats = db.execute(
-        select(Notebook, func.count(Note.id), func.max(Note.updated_at))
-        .outerjoin(Note)
+    subject_notebooks = (await db.execute(
+        select(Notebook)
         .where(Notebook.subject_id == subject.id, Notebook.user_id == current_user.id)
-        .group_by(Notebook.id)
         .order_by(Notebook.created_at)
-    ).all()
+    )).scalars()
+
+    # Cover preview: the most recently updated note that has a thumbnail.
+    latest_thumbnails = (
+        select(
+            Note.notebook_id,
+            Note.thumbnail_key,
+            func.row_number()
+            .over(partition_by=Note.notebook_id, order_by=Note.updated_at.desc())
+            .label("position"),
+        )
+        .join(Notebook)
+        .where(Notebook.subject_id == subject.id, Note.thumbnail_key.is_not(None))
+        .subquery()
+    )
+    covers = dict(
+        (await db.execute(
+            select(latest_thumbnails.c.notebook_id, latest_thumbnails.c.thumbnail_key).where(
+                latest_thumbnails.c.position == 1
+            )
+        )).all()
+    )
 
     notebooks = []
-    for notebook, note_count, updated_at in notebooks_with_stats:
-        notebook_data = serialize_notebook_base(notebook, note_count)
+    for notebook in subject_notebooks:
+        notebook_data = serialize_notebook_base(notebook)
         notebook_data["updated_at"] = (
-            updated_at or notebook.created_at
+            notebook.notes_updated_at or notebook.created_at
         ).isoformat()
+        notebook_data["thumbnail_url"] = thumbnail_url(covers.get(notebook.id))
         notebooks.append(notebook_data)
 
     return {"subject": {"id": subject.id, "name": subject.name}, "notebooks": notebooks}
@@ -863,14 +2009,14 @@ async def get_subject_notebooks(
 async def create_notebook(
     subject_id: int,
     payload: NotebookCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    subject = db.execute(
+    subject = (await db.execute(
         select(Subject).where(
             Subject.id == subject_id, Subject.user_id == current_user.id
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
 
@@ -886,20 +2032,26 @@ async def create_notebook(
         subject_id=subject.id,
     )
     db.add(notebook)
-    db.commit()
-    db.refresh(notebook)
-    return serialize_notebook_base(notebook, 0)
+    await count_notebooks(db, subject.id, 1)
+    await db.commit()
+    await db.refresh(notebook)
+    return serialize_notebook_base(notebook)
 
 
 @app.get("/api/notebooks/inbox")
 async def get_inbox_notebook(
     inbox_type: str = Query(..., alias="type"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    notebook = ensure_user_inbox(db, current_user, inbox_type)
-    db.commit()
-    db.refresh(notebook)
+    normalized_type, _ = inbox_name(inbox_type)
+    notebook_id = inbox_cache.get(current_user.id, normalized_type)
+    notebook = await db.get(Notebook, notebook_id) if notebook_id is not None else None
+    if notebook is None or notebook.user_id != current_user.id:
+        inbox_cache.invalidate(current_user.id)
+        notebook_id = await provision_user_inbox(db, current_user.id, normalized_type)
+        await db.commit()
+        notebook = await db.get(Notebook, notebook_id)
     return serialize_inbox_notebook(notebook)
 
 
@@ -907,14 +2059,14 @@ async def get_inbox_notebook(
 async def update_notebook(
     notebook_id: int,
     payload: NotebookUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    notebook = db.execute(
+    notebook = (await db.execute(
         select(Notebook).where(
             Notebook.id == notebook_id, Notebook.user_id == current_user.id
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     if not notebook:
         raise HTTPException(status_code=404, detail="Notebook not found")
 
@@ -928,65 +2080,129 @@ async def update_notebook(
     if payload.icon is not None:
         notebook.icon = payload.icon
 
-    db.commit()
-    db.refresh(notebook)
-    return serialize_notebook_base(notebook, len(notebook.notes))
+    await db.commit()
+    await db.refresh(notebook)
+    return serialize_notebook_base(notebook)
 
 
 @app.delete("/api/notebooks/{notebook_id}")
 async def delete_notebook(
     notebook_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    notebook = db.execute(
+    notebook = (await db.execute(
         select(Notebook).where(
             Notebook.id == notebook_id, Notebook.user_id == current_user.id
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     if not notebook:
         raise HTTPException(status_code=404, detail="Notebook not found")
 
-    db.delete(notebook)
-    db.commit()
+    thumbnail_keys = (await db.execute(
+        select(Note.thumbnail_key).where(
+            Note.notebook_id == notebook.id, Note.thumbnail_key.is_not(None)
+        )
+    )).scalars().all()
+    await unlink_blobs(db, await note_file_blobs(db, Notebook.id == notebook.id))
+    await db.delete(notebook)
+    await count_notebooks(db, notebook.subject_id, -1)
+    await db.commit()
+    inbox_cache.invalidate(current_user.id)
+    await delete_unused_thumbnails(db, thumbnail_keys)
     return {"status": "ok"}
 
 # ------------------------------------------------------------------
 # Notes (OWNERSHIP ALWAYS VIA NOTEBOOK)
 # ------------------------------------------------------------------
 
-def owned_note(db: Session, note_id: int, user_id: int) -> Optional[Note]:
-    return db.execute(
+def encode_page_cursor(scope: str, scope_id: int, **key: Any) -> str:
+    """Opaque keyset cursor: the sort key of a page's last row.
+
+    ``scope``/``scope_id`` name the list it belongs to (for example
+    ``("notes", notebook_id)``); values are ints, or datetimes in fields
+    ending with ``_at``.
+    """
+    values = {
+        name: value.isoformat() if isinstance(value, datetime.datetime) else value
+        for name, value in key.items()
+    }
+    raw = json.dumps({"scope": [scope, scope_id], **values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_page_cursor(
+    token: str, scope: str, scope_id: int, fields: Sequence[str]
+) -> Dict[str, Any]:
+    """Inverse of ``encode_page_cursor``; 400 unless it is a cursor for this list."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if values.pop("scope") != [scope, scope_id] or sorted(values) != sorted(fields):
+            raise ValueError("cursor does not belong to this list")
+        return {
+            name: datetime.datetime.fromisoformat(value) if name.endswith("_at") else int(value)
+            for name, value in values.items()
+        }
+    except (ValueError, TypeError, KeyError, AttributeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+async def owned_note(
+    db: AsyncSession, note_id: int, user_id: int, *loads: Any
+) -> Optional[Note]:
+    """The user's note, or None. ``loads`` are loader options for the
+    relationships the caller reads, which async sessions cannot lazy-load."""
+    return (await db.execute(
         select(Note)
         .join(Notebook)
         .where(
             Note.id == note_id,
             Notebook.user_id == user_id,
         )
-    ).scalar_one_or_none()
+        .options(*loads)
+    )).scalar_one_or_none()
 
 
 @app.get("/api/notebooks/{notebook_id}/notes")
 async def get_notebook_notes(
     notebook_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    limit: int = Query(NOTE_PAGE_MAX_SIZE, ge=1),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    notebook = db.execute(
+    notebook = (await db.execute(
         select(Notebook).where(
             Notebook.id == notebook_id, Notebook.user_id == current_user.id
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     if not notebook:
         raise HTTPException(status_code=404, detail="Notebook not found")
 
-    notes_with_counts = db.execute(
-        select(Note, func.count(Flashcard.id))
-        .outerjoin(Flashcard)
-        .where(Note.notebook_id == notebook_id)
-        .group_by(Note.id)
-        .order_by(Note.updated_at.desc())
-    ).all()
+    # Newest first, keyed on (updated_at, id) so each page is an index seek
+    # however deep the client has paged. Flashcards are counted for the
+    # page's rows only.
+    page_size = min(limit, NOTE_PAGE_MAX_SIZE)
+    flashcard_count = (
+        select(func.count(Flashcard.id))
+        .where(Flashcard.note_id == Note.id)
+        .correlate(Note)
+        .scalar_subquery()
+    )
+    query = select(Note, flashcard_count).where(Note.notebook_id == notebook_id)
+    if cursor is not None:
+        after = decode_page_cursor(cursor, "notes", notebook_id, ("updated_at", "id"))
+        query = query.where(tuple_(Note.updated_at, Note.id) < (after["updated_at"], after["id"]))
+    notes_with_counts = (await db.execute(
+        query.order_by(Note.updated_at.desc(), Note.id.desc()).limit(page_size + 1)
+    )).all()
+    if len(notes_with_counts) > page_size:
+        notes_with_counts = notes_with_counts[:page_size]
+        last = notes_with_counts[-1][0]
+        response.headers[NEXT_CURSOR_HEADER] = encode_page_cursor(
+            "notes", notebook_id, updated_at=last.updated_at, id=last.id
+        )
 
     return [
         {
@@ -994,6 +2210,7 @@ async def get_notebook_notes(
             "title": note.title,
             "updated_at": note.updated_at.isoformat(),
             "flashcard_count": flashcard_count,
+            "thumbnail_url": thumbnail_url(note.thumbnail_key),
         }
         for note, flashcard_count in notes_with_counts
     ]
@@ -1002,149 +2219,682 @@ async def get_notebook_notes(
 @app.post("/api/device/notes")
 async def create_device_note(
     payload: DeviceNoteCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
     device_type = payload.device_type.strip()
     if not device_type:
         raise HTTPException(status_code=400, detail="Device type is required")
 
-    notebook = ensure_user_inbox(db, current_user, device_type)
-
-    note = Note(
-        title=payload.title or "Untitled Note",
-        device=device_type,
-        created_at=datetime.datetime.utcnow(),
-        updated_at=datetime.datetime.utcnow(),
-        notebook_id=notebook.id,
+    note_id, notebook_id = await add_inbox_note(
+        db, current_user.id, device_type, payload.title or "Untitled Note", device_type
     )
-    db.add(note)
-    db.commit()
-    db.refresh(note)
+    await db.commit()
 
-    return {"note_id": note.id, "notebook_id": notebook.id}
+    return {"note_id": note_id, "notebook_id": notebook_id}
 
 
 @app.post("/api/notes")
 async def create_note(
     payload: NoteCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
     # Repro: new user signs up -> Flutter send -> note should create in Tablet Inbox.
     if payload.notebook_id:
-        notebook = db.execute(
+        notebook = (await db.execute(
             select(Notebook).where(
                 Notebook.id == payload.notebook_id,
                 Notebook.user_id == current_user.id,
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         if not notebook:
             raise HTTPException(status_code=404, detail="Notebook not found")
     else:
-        notebook = ensure_user_inbox(db, current_user, "tablet")
+        # The common case for device uploads: one INSERT ... SELECT.
+        title = payload.title or "Untitled Note"
+        note_id, _ = await add_inbox_note(
+            db, current_user.id, "tablet", title, payload.device or "unknown"
+        )
+        await db.commit()
+        return {"id": note_id, "title": title}
 
+    now = datetime.datetime.utcnow()
     note = Note(
         title=payload.title or "Untitled Note",
         device=payload.device or "unknown",
-        created_at=datetime.datetime.utcnow(),
-        updated_at=datetime.datetime.utcnow(),
+        created_at=now,
+        updated_at=now,
         notebook_id=notebook.id,
     )
     db.add(note)
-    db.commit()
-    db.refresh(note)
+    await count_new_note(db, notebook.id, now)
+    await db.commit()
+    await db.refresh(note)
 
     return {"id": note.id, "title": note.title}
 
+async def add_stroke_cells(db: AsyncSession, rows: Sequence[Tuple[int, int, StrokeBatch]]) -> None:
+    """File new stroke rows in the note_stroke_cells spatial index."""
+    cells = [
+        {"note_id": note_id, "cell_x": cell_x, "cell_y": cell_y, "stroke_id": stroke_id}
+        for note_id, stroke_id, batch in rows
+        for cell_x, cell_y in index_cells(batch, STROKE_INDEX_CELL_SIZE, STROKE_INDEX_MAX_CELLS)
+    ]
+    if cells:
+        await db.execute(insert(NoteStrokeCell), cells)
+
+
 @app.post("/api/notes/{note_id}/strokes")
 async def add_strokes(
     note_id: int,
     payload: StrokePayload,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    note = owned_note(db, note_id, current_user.id)
+    note = await owned_note(db, note_id, current_user.id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    db.add(
-        NoteStroke(
-            note_id=note.id,
-            payload=json.dumps(normalize_stroke_payload(payload.dict())),
+    batch = normalize_stroke_batch(payload.dict())
+    stroke = NoteStroke(note_id=note.id, payload=pack_stroke_batch(batch))
+    db.add(stroke)
+    await db.flush()
+    await add_stroke_cells(db, [(note.id, stroke.id, batch)])
+    await touch_notes(db, [note.id], datetime.datetime.utcnow())
+    await db.commit()
+    thumbnail_scheduler.schedule([note.id])
+    return {"status": "ok"}
+
+
+@app.post("/api/strokes/bulk")
+async def add_strokes_bulk(
+    payload: BulkStrokePayload,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    # Offline backlog replay: many batches across many notes in one round trip.
+    if len(payload.batches) > STROKE_BULK_MAX_BATCHES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {STROKE_BULK_MAX_BATCHES} batches per request",
         )
+
+    requested_ids = {batch.note_id for batch in payload.batches}
+    owned_ids = set(
+        (await db.execute(
+            select(Note.id)
+            .join(Notebook)
+            .where(Note.id.in_(requested_ids), Notebook.user_id == current_user.id)
+        )).scalars()
     )
-    note.updated_at = datetime.datetime.utcnow()
-    db.commit()
-    return {"status": "ok"}
+
+    results: List[Dict[str, Any]] = []
+    rows: List[Dict[str, Any]] = []
+    normalized_batches: List[StrokeBatch] = []
+    inserted: List[Dict[str, Any]] = []
+    for index, batch in enumerate(payload.batches):
+        result: Dict[str, Any] = {"index": index, "note_id": batch.note_id}
+        results.append(result)
+        if batch.note_id not in owned_ids:
+            result.update(status="error", detail="Note not found")
+            continue
+        try:
+            normalized = normalize_stroke_batch(batch.dict(exclude={"note_id"}))
+            packed = pack_stroke_batch(normalized)
+        except (TypeError, ValueError):
+            result.update(status="error", detail="Invalid stroke payload")
+            continue
+        result["status"] = "ok"
+        rows.append({"note_id": batch.note_id, "payload": packed})
+        normalized_batches.append(normalized)
+        inserted.append(result)
+
+    if rows:
+        stroke_ids = (await db.execute(
+            insert(NoteStroke).returning(NoteStroke.id, sort_by_parameter_order=True),
+            rows,
+        )).scalars().all()
+        for result, stroke_id in zip(inserted, stroke_ids):
+            result["stroke_id"] = stroke_id
+        await add_stroke_cells(
+            db,
+            [
+                (row["note_id"], stroke_id, normalized)
+                for row, stroke_id, normalized in zip(rows, stroke_ids, normalized_batches)
+            ],
+        )
+        await touch_notes(db, {row["note_id"] for row in rows}, datetime.datetime.utcnow())
+        await db.commit()
+        thumbnail_scheduler.schedule({row["note_id"] for row in rows})
+
+    return {"results": results}
+
+
+def note_strokes_query(
+    note_id: int,
+    after_id: Optional[int] = None,
+    upto_id: Optional[int] = None,
+    bbox: Optional[BBox] = None,
+    page_after: Optional[Tuple[datetime.datetime, int]] = None,
+):
+    """Stroke rows of a note in reading order; ``page_after`` is the
+    ``(created_at, id)`` of the previous page's last row."""
+    query = select(NoteStroke).where(NoteStroke.note_id == note_id)
+    if bbox is not None:
+        # Candidate rows from the grid index; serialize_note_stroke clips exactly.
+        cx0, cy0, cx1, cy1 = cell_range(bbox, STROKE_INDEX_CELL_SIZE)
+        candidates = select(NoteStrokeCell.stroke_id).where(
+            NoteStrokeCell.note_id == note_id,
+            or_(
+                and_(
+                    NoteStrokeCell.cell_x.between(cx0, cx1),
+                    NoteStrokeCell.cell_y.between(cy0, cy1),
+                ),
+                and_(
+                    NoteStrokeCell.cell_x == OVERSIZED_CELL[0],
+                    NoteStrokeCell.cell_y == OVERSIZED_CELL[1],
+                ),
+            ),
+        )
+        query = query.where(NoteStroke.id.in_(candidates))
+    if upto_id is not None:
+        # "+ 0" keeps planners from range-scanning ix_note_strokes_note_id_id
+        # for this bound and then sorting all of the note's rows; they walk
+        # the ordering index instead and stop at the page limit.
+        query = query.where(NoteStroke.id + 0 <= upto_id)
+    if after_id is not None:
+        # Incremental reads follow NoteStroke.id, which is what the cursor tracks.
+        if page_after is not None:
+            after_id = max(after_id, page_after[1])
+        return query.where(NoteStroke.id > after_id).order_by(NoteStroke.id.asc())
+    if page_after is not None:
+        query = query.where(tuple_(NoteStroke.created_at, NoteStroke.id) > page_after)
+    return query.order_by(NoteStroke.created_at.asc(), NoteStroke.id.asc())
+
+
+def latest_stroke_id(db: Session, note_id: int) -> int:
+    return (
+        db.execute(
+            select(func.max(NoteStroke.id)).where(NoteStroke.note_id == note_id)
+        ).scalar()
+        or 0
+    )
+
+
+def wants_ndjson(request: Request, response_format: Optional[str]) -> bool:
+    if response_format:
+        return response_format.strip().lower() == "ndjson"
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def serialize_note_strokes(
+    strokes: Iterable[NoteStroke],
+    bbox: Optional[BBox] = None,
+    payloads: Optional[Dict[int, bytes]] = None,
+) -> Iterator[str]:
+    for stroke in strokes:
+        payload = payloads.get(stroke.id) if payloads else None
+        serialized = serialize_note_stroke(stroke, bbox, payload)
+        if serialized is not None:
+            yield serialized
+
+
+def ensure_stroke_lods(db: Session, strokes: Sequence[NoteStroke], lod: int) -> Dict[int, bytes]:
+    """Return ``{stroke_id: simplified payload}`` for ``lod``.
+
+    Cached copies are reused; rows added since the last read (or cached under
+    a different tolerance) are simplified now and written to the cache. A
+    cached copy must also match the stroke's note and source size, so a
+    leftover row under a reused stroke id is rebuilt rather than served.
+    The caller commits.
+    """
+    tolerance = STROKE_LOD_TOLERANCES[lod - 1]
+    sources = {stroke.id: (stroke.note_id, len(stroke.payload)) for stroke in strokes}
+    payloads: Dict[int, bytes] = {
+        stroke_id: payload
+        for stroke_id, note_id, source_byte_size, payload in db.execute(
+            select(
+                NoteStrokeLOD.stroke_id,
+                NoteStrokeLOD.note_id,
+                NoteStrokeLOD.source_byte_size,
+                NoteStrokeLOD.payload,
+            ).where(
+                NoteStrokeLOD.stroke_id.in_(list(sources)),
+                NoteStrokeLOD.lod == lod,
+                NoteStrokeLOD.tolerance == tolerance,
+            )
+        )
+        if sources[stroke_id] == (note_id, source_byte_size)
+    }
+    entries: List[Dict[str, Any]] = []
+    for stroke in strokes:
+        if stroke.id in payloads:
+            continue
+        batch = unpack_stroke_batch(stroke.payload)
+        packed = pack_stroke_batch(simplify_batch(batch, tolerance))
+        payloads[stroke.id] = packed
+        entries.append(
+            {
+                "stroke_id": stroke.id,
+                "lod": lod,
+                "note_id": stroke.note_id,
+                "tolerance": tolerance,
+                "payload": packed,
+                "point_count": point_count(unpack_stroke_batch(packed)),
+                "byte_size": len(packed),
+                "source_point_count": point_count(batch),
+                "source_byte_size": len(stroke.payload),
+                "created_at": datetime.datetime.utcnow(),
+            }
+        )
+    if entries:
+        statement = dialect_insert(NoteStrokeLOD)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["stroke_id", "lod"],
+                set_={
+                    column: statement.excluded[column]
+                    for column in (
+                        "note_id",
+                        "tolerance",
+                        "payload",
+                        "point_count",
+                        "byte_size",
+                        "source_point_count",
+                        "source_byte_size",
+                        "created_at",
+                    )
+                },
+            ),
+            entries,
+        )
+        logger.info(
+            "stroke LOD cached lod=%s rows=%s points=%s->%s bytes=%s->%s",
+            lod,
+            len(entries),
+            sum(entry["source_point_count"] for entry in entries),
+            sum(entry["point_count"] for entry in entries),
+            sum(entry["source_byte_size"] for entry in entries),
+            sum(entry["byte_size"] for entry in entries),
+        )
+    return payloads
+
+
+def cache_stroke_lods(strokes: Sequence[NoteStroke], lod: int) -> Dict[int, bytes]:
+    """``ensure_stroke_lods`` on its own session, committed; run it in a thread.
+
+    Simplifying is CPU-bound, so it must not run on the event loop.
+    """
+    db = SessionLocal()
+    try:
+        payloads = ensure_stroke_lods(db, strokes, lod)
+        db.commit()
+        return payloads
+    finally:
+        db.close()
+
+
+async def iter_note_strokes_ndjson(
+    note_id: int,
+    after_id: Optional[int],
+    upto_id: int,
+    bbox: Optional[BBox] = None,
+    lod: int = 0,
+    page_after: Optional[Tuple[datetime.datetime, int]] = None,
+    limit: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Yield one NDJSON chunk per server-side cursor batch of stroke rows.
+
+    Uses its own session because the response body is produced after the
+    request-scoped ``get_db`` session has been released. Simplified copies
+    are built and cached on a worker thread with its own session, so
+    committing them never closes the open cursor.
+    """
+    async with AsyncSessionLocal() as db:
+        strokes = (
+            await db.stream(
+                note_strokes_query(note_id, after_id, upto_id, bbox, page_after)
+                .limit(limit)
+                .execution_options(yield_per=STROKE_STREAM_BATCH_SIZE)
+            )
+        ).scalars()
+        async for batch in strokes.partitions():
+            payloads = await run_in_threadpool(cache_stroke_lods, batch, lod) if lod else None
+            lines = "\n".join(serialize_note_strokes(batch, bbox, payloads))
+            if lines:
+                yield (lines + "\n").encode("utf-8")
 
 
 @app.get("/api/notes/{note_id}/strokes")
 async def get_note_strokes(
     note_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    after_id: Optional[int] = Query(None, ge=0),
+    response_format: Optional[str] = Query(None, alias="format"),
+    bbox: Optional[str] = Query(None, description="x0,y0,x1,y1 viewport in note units"),
+    lod: int = Query(0, ge=0, description="0 for raw points, 1.. for simplified levels"),
+    limit: int = Query(STROKE_PAGE_MAX_SIZE, ge=1),
+    page_cursor: Optional[str] = Query(
+        None, alias="cursor", description="X-Next-Cursor of the previous page"
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    note = owned_note(db, note_id, current_user.id)
+    note = await owned_note(db, note_id, current_user.id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
+    if lod > len(STROKE_LOD_TOLERANCES):
+        raise HTTPException(
+            status_code=400, detail=f"lod must be between 0 and {len(STROKE_LOD_TOLERANCES)}"
+        )
+    viewport: Optional[BBox] = None
+    if bbox is not None:
+        try:
+            viewport = parse_bbox(bbox)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    # Strokes are append-only, so the newest id identifies the stroke history.
+    # It doubles as the cursor clients pass back as ``after_id``. Later pages
+    # keep the first page's, so every page reads the same history.
+    page_size = min(limit, STROKE_PAGE_MAX_SIZE)
+    page_after: Optional[Tuple[datetime.datetime, int]] = None
+    if page_cursor is not None:
+        page = decode_page_cursor(
+            page_cursor, "strokes", note.id, ("created_at", "id", "upto_id")
+        )
+        page_after = (page["created_at"], page["id"])
+        cursor = page["upto_id"]
+    else:
+        cursor = await db.run_sync(latest_stroke_id, note.id)
+    stream = wants_ndjson(request, response_format)
+    variant = "ndjson" if stream else "json"
+    if viewport is not None:
+        variant += "-bbox:" + ",".join(f"{value:g}" for value in viewport)
+    if lod:
+        variant += f"-lod:{lod}:{STROKE_LOD_TOLERANCES[lod - 1]:g}"
+    variant += f"-page:{page_size}:{page_cursor or ''}"
+    headers = {
+        "ETag": f'"strokes-{note.id}-{after_id or 0}-{cursor}-{variant}"',
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept",
+        STROKE_CURSOR_HEADER: str(cursor),
+    }
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+
+    query = note_strokes_query(note.id, after_id, cursor, viewport, page_after)
+
+    def next_page(last_created_at: datetime.datetime, last_id: int) -> str:
+        return encode_page_cursor(
+            "strokes", note.id, created_at=last_created_at, id=last_id, upto_id=cursor
+        )
 
-    strokes = db.execute(
-        select(NoteStroke)
+    if stream:
+        # Headers go out before the body, so look up the page's last row (and
+        # whether one follows it) first; both are reads along the index.
+        boundary = (await db.execute(
+            query.with_only_columns(NoteStroke.created_at, NoteStroke.id)
+            .offset(page_size - 1)
+            .limit(2)
+        )).all()
+        if len(boundary) == 2:
+            headers[NEXT_CURSOR_HEADER] = next_page(*boundary[0])
+        return StreamingResponse(
+            iter_note_strokes_ndjson(
+                note.id, after_id, cursor, viewport, lod, page_after, page_size
+            ),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers,
+        )
+
+    strokes = (await db.execute(query.limit(page_size + 1))).scalars().all()
+    if len(strokes) > page_size:
+        strokes = strokes[:page_size]
+        headers[NEXT_CURSOR_HEADER] = next_page(strokes[-1].created_at, strokes[-1].id)
+    payloads = await run_in_threadpool(cache_stroke_lods, strokes, lod) if lod else None
+    content = "[" + ",".join(serialize_note_strokes(strokes, viewport, payloads)) + "]"
+    return Response(content=content, media_type="application/json", headers=headers)
+
+@app.get("/api/notes/{note_id}/strokes/lod-stats")
+async def get_note_stroke_lod_stats(
+    note_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Point counts and byte sizes per level of detail, for tuning tolerances."""
+    note = await owned_note(db, note_id, current_user.id)
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+
+    stroke_rows, raw_bytes = (await db.execute(
+        select(func.count(NoteStroke.id), func.coalesce(func.sum(func.length(NoteStroke.payload)), 0))
         .where(NoteStroke.note_id == note.id)
-        .order_by(NoteStroke.created_at.asc(), NoteStroke.id.asc())
-    ).scalars()
-    return [serialize_note_stroke(stroke) for stroke in strokes]
+    )).one()
+    cached = {
+        (lod, tolerance): (rows, points, size, source_points, source_size)
+        for lod, tolerance, rows, points, size, source_points, source_size in await db.execute(
+            select(
+                NoteStrokeLOD.lod,
+                NoteStrokeLOD.tolerance,
+                func.count(),
+                func.sum(NoteStrokeLOD.point_count),
+                func.sum(NoteStrokeLOD.byte_size),
+                func.sum(NoteStrokeLOD.source_point_count),
+                func.sum(NoteStrokeLOD.source_byte_size),
+            )
+            .where(NoteStrokeLOD.note_id == note.id)
+            .group_by(NoteStrokeLOD.lod, NoteStrokeLOD.tolerance)
+        )
+    }
+    levels = []
+    for lod, tolerance in enumerate(STROKE_LOD_TOLERANCES, start=1):
+        rows, points, size, source_points, source_size = cached.get(
+            (lod, tolerance), (0, 0, 0, 0, 0)
+        )
+        levels.append(
+            {
+                "lod": lod,
+                "tolerance": tolerance,
+                "cached_rows": rows,
+                "points": points,
+                "bytes": size,
+                "source_points": source_points,
+                "source_bytes": source_size,
+                "point_ratio": points / source_points if source_points else None,
+                "byte_ratio": size / source_size if source_size else None,
+            }
+        )
+    return {
+        "note_id": note.id,
+        "stroke_rows": stroke_rows,
+        "raw_bytes": raw_bytes,
+        "levels": levels,
+    }
+
 
 @app.post("/api/notes/{note_id}/upload")
 async def upload_note_file(
     note_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    note = owned_note(db, note_id, current_user.id)
+    note = await owned_note(db, note_id, current_user.id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    filename = f"{uuid.uuid4().hex}{os.path.splitext(file.filename)[1]}"
-    content = await file.read()
-
-    if STORAGE_BACKEND == "s3":
-        get_s3_client().put_object(
-            Bucket=s3_settings.bucket,
-            Key=filename,
-            Body=content,
-            ContentType=file.content_type,
+    declared_size = getattr(file, "size", None)
+    if declared_size is not None and declared_size > UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=413, detail=f"File is larger than {UPLOAD_MAX_BYTES} bytes"
         )
+
+    # Content-addressed: identical bytes are stored once and shared.
+    digest, size = await hash_upload(file)
+    linked, stored = await link_blob(db, digest, size, file.content_type)
+    # Commit the link before writing, so the collector never deletes a blob
+    # an upload is about to rely on.
+    await db.commit()
+    if linked:
+        key = blob_key(digest)
     else:
-        with open(os.path.join(STORAGE_DIR, filename), "wb") as f:
-            f.write(content)
+        # The collector is deleting this blob right now; keep a private copy.
+        key = f"{uuid.uuid4().hex}{os.path.splitext(file.filename)[1]}"
 
-    db.add(
-        NoteFile(
+    try:
+        # Only the first upload of these bytes writes them (or a repeat, if
+        # that first write never finished); the object is put straight at
+        # its final key.
+        deduplicated = linked and stored
+        if not deduplicated:
+            await storage.put(key, iter_upload_chunks(file), file.content_type)
+            if linked:
+                await mark_blob_stored(db, digest)
+        # The file row only appears once its bytes are in place.
+        note_file = NoteFile(
             note_id=note.id,
-            stored_filename=filename,
+            stored_filename=key,
             original_filename=file.filename,
             content_type=file.content_type,
+            blob_digest=digest if linked else None,
+        )
+        db.add(note_file)
+        await touch_notes(db, [note.id], datetime.datetime.utcnow())
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        if linked:
+            await unlink_blobs(db, [digest])
+            await db.commit()
+        raise
+
+    return {"status": "ok", "file_id": note_file.id, "deduplicated": deduplicated}
+
+def not_modified_since(request: Request, modified: datetime.datetime) -> bool:
+    """If-Modified-Since check; ignored when If-None-Match is sent (RFC 9110)."""
+    if request.headers.get("if-none-match"):
+        return False
+    header = request.headers.get("if-modified-since")
+    if not header:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    return modified.replace(microsecond=0) <= since
+
+
+@app.get("/api/notes/{note_id}/file")
+async def get_note_file(
+    note_id: int,
+    request: Request,
+    file_id: Optional[int] = Query(None, description="Defaults to the newest upload"),
+    download: bool = Query(False, description="Ask the browser to save instead of display"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    note = await owned_note(db, note_id, current_user.id)
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+
+    query = select(NoteFile).where(NoteFile.note_id == note.id)
+    if file_id is not None:
+        query = query.where(NoteFile.id == file_id)
+    else:
+        query = query.order_by(NoteFile.created_at.desc(), NoteFile.id.desc()).limit(1)
+    note_file = (await db.execute(query)).scalars().first()
+    if not note_file:
+        raise HTTPException(status_code=404, detail="File not found")
+    disposition_type = "attachment" if download else "inline"
+
+    disposition = f"{disposition_type}; filename*=utf-8''{quote(note_file.original_filename)}"
+    url = await storage.presign(
+        note_file.stored_filename,
+        content_type=note_file.content_type,
+        content_disposition=disposition,
+    )
+    if url:
+        # Bytes go straight from the bucket to the client.
+        return RedirectResponse(url, status_code=302, headers={"Cache-Control": "no-store"})
+
+    path = storage.local_path(note_file.stored_filename)
+    if path is None:
+        try:
+            stream = await storage.get_stream(note_file.stored_filename)
+        except ObjectNotFound:
+            raise HTTPException(status_code=404, detail="File not found")
+        return StreamingResponse(
+            stream,
+            media_type=note_file.content_type,
+            headers={"Content-Disposition": disposition},
         )
+    try:
+        stat = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    modified = datetime.datetime.fromtimestamp(stat.st_mtime, datetime.timezone.utc)
+    headers = {
+        # Blob files are named by their digest, which makes a strong validator.
+        "ETag": f'"{note_file.blob_digest}"'
+        if note_file.blob_digest
+        else f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+        "Last-Modified": email.utils.format_datetime(modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if etag_matches(request, headers["ETag"]) or not_modified_since(request, modified):
+        return not_modified(headers)
+    # FileResponse answers Range/If-Range requests and uses the server's
+    # zero-copy file send when it offers one.
+    return FileResponse(
+        path,
+        media_type=note_file.content_type,
+        filename=note_file.original_filename,
+        content_disposition_type=disposition_type,
+        stat_result=stat,
+        headers=headers,
     )
-    note.updated_at = datetime.datetime.utcnow()
-    db.commit()
 
-    return {"status": "ok"}
+
+@app.get("/api/thumbnails/{name}")
+async def get_thumbnail(name: str, request: Request):
+    # No auth: the unguessable content-hash name is the capability, and the
+    # bytes behind one never change.
+    if not THUMBNAIL_NAME_PATTERN.match(name):
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    headers = {"ETag": f'"{name.split(".")[0]}"', "Cache-Control": THUMBNAIL_CACHE_CONTROL}
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    try:
+        data = await storage.get_bytes(THUMBNAIL_PREFIX + name)
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    media_type = THUMBNAIL_CONTENT_TYPES[name.rsplit(".", 1)[1]]
+    return Response(content=data, media_type=media_type, headers=headers)
+
 
 @app.get("/api/notes/{note_id}")
 async def get_note(
     note_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    note = owned_note(db, note_id, current_user.id)
+    note = await owned_note(
+        db,
+        note_id,
+        current_user.id,
+        selectinload(Note.notebook).selectinload(Notebook.subject),
+        selectinload(Note.files),
+        selectinload(Note.flashcards),
+    )
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    return {
+    note_data = {
         "id": note.id,
         "title": note.title,
         "summary": note.summary,
@@ -1163,31 +2913,33 @@ async def get_note(
             "name": note.notebook.name,
         },
         "updated_at": note.updated_at.isoformat(),
-        "file_url": None,
+        "file_url": f"/api/notes/{note.id}/file" if note.files else None,
+        "thumbnail_url": thumbnail_url(note.thumbnail_key),
         "cards": [
             {"question": card.question, "answer": card.answer}
             for card in note.flashcards
         ],
     }
+    return json_response_with_etag(request, note_data)
 
 @app.post("/api/notes/{note_id}/ocr/enqueue")
 async def enqueue_ocr(
     note_id: int,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
     # Principle: feature-flagged, non-fatal. If disabled, fail fast with clear signal.
     if not OCR_ENABLED:
         raise HTTPException(status_code=503, detail="OCR disabled")
 
-    note = owned_note(db, note_id, current_user.id)
+    note = await owned_note(db, note_id, current_user.id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
     # Principle: idempotency. If an OCR job is already queued/running for this note, return it.
     # Also: do not assume uniqueness; select latest and limit to 1.
-    existing_job = db.execute(
+    existing_job = (await db.execute(
         select(AIJob)
         .where(
             AIJob.note_id == note.id,
@@ -1197,7 +2949,7 @@ async def enqueue_ocr(
         )
         .order_by(AIJob.created_at.desc(), AIJob.id.desc())
         .limit(1)
-    ).scalars().first()
+    )).scalars().first()
 
     if existing_job:
         return {"job": serialize_ai_job(existing_job)}
@@ -1212,11 +2964,13 @@ async def enqueue_ocr(
         updated_at=now,
     )
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
+    await db.refresh(job)
 
-    # Principle: async + isolated (within current constraints). Never block request thread.
-    background_tasks.add_task(run_ocr_job, job.id)
+    # Principle: async + isolated. In worker mode ocr_worker.py claims the row;
+    # otherwise run it after the response without blocking the request thread.
+    if OCR_QUEUE_MODE != "worker":
+        background_tasks.add_task(run_ocr_job, job.id)
 
     return {"job": serialize_ai_job(job)}
 
@@ -1224,10 +2978,10 @@ async def enqueue_ocr(
 @app.get("/api/notes/{note_id}/ocr")
 async def get_note_ocr(
     note_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    note = owned_note(db, note_id, current_user.id)
+    note = await owned_note(db, note_id, current_user.id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
@@ -1244,7 +2998,7 @@ async def get_note_ocr(
         }
 
     # Principle: status endpoint must never 500 due to duplicates; always pick latest deterministically.
-    latest_job = db.execute(
+    latest_job = (await db.execute(
         select(AIJob)
         .where(
             AIJob.note_id == note.id,
@@ -1253,7 +3007,7 @@ async def get_note_ocr(
         )
         .order_by(AIJob.created_at.desc(), AIJob.id.desc())
         .limit(1)
-    ).scalars().first()
+    )).scalars().first()
 
     # Optional but helpful: a top-level status that the frontend can rely on.
     # - If a job exists, status is job status.
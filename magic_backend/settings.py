@@ -3,11 +3,8 @@ load_dotenv()
 
 import os
 from dataclasses import dataclass
-from functools import lru_cache
 from typing import List
 
-import boto3
-
 
 def _parse_origins(value: str | None) -> List[str]:
     if not value:
@@ -18,6 +15,19 @@ def _parse_origins(value: str | None) -> List[str]:
 DATABASE_URL = os.environ.get("DATABASE_URL")
 JWT_SECRET = os.environ.get("JWT_SECRET")
 JWT_EXPIRES_SECONDS = int(os.environ.get("JWT_EXPIRES_SECONDS", "604800"))
+# Authenticated users are cached per process for AUTH_CACHE_TTL_SECONDS (0 turns
+# the cache off), at most AUTH_CACHE_MAX_ENTRIES tokens at a time.
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Inbox notebook ids are cached per process (same entry limit); a stale id is
+# detected at use and the inbox is looked up again.
+INBOX_CACHE_TTL_SECONDS = float(os.environ.get("INBOX_CACHE_TTL_SECONDS", "3600"))
+# bcrypt cost (log2 rounds) for new hashes; older hashes are upgraded at login.
+# Hashing runs on PASSWORD_HASH_WORKERS threads, and at most
+# PASSWORD_HASH_MAX_QUEUE more calls wait for one before sign-ins get 503.
+BCRYPT_ROUNDS = min(31, max(4, int(os.environ.get("BCRYPT_ROUNDS", "12"))))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", "64"))
 
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
@@ -40,7 +50,83 @@ OCR_ENABLED = os.environ.get("OCR_ENABLED", "false").strip().lower() in {
     "yes",
     "on",
 }
+# Rasters are handed to the OCR engine in memory; set OCR_DEBUG_IMAGES to also
+# keep PNGs under STORAGE_DIR/ocr for OCR_DEBUG_IMAGE_RETENTION_HOURS.
+OCR_DEBUG_IMAGES = os.environ.get("OCR_DEBUG_IMAGES", "false").strip().lower() in {
+    "1",
+    "true",
+    "yes",
+    "on",
+}
+OCR_DEBUG_IMAGE_RETENTION_HOURS = float(
+    os.environ.get("OCR_DEBUG_IMAGE_RETENTION_HOURS", "24")
+)
 OCR_JOB_TIMEOUT_MINUTES = int(os.environ.get("OCR_JOB_TIMEOUT_MINUTES", "10"))
+# "inline" runs OCR in the API process; "worker" leaves jobs for ocr_worker.py.
+OCR_QUEUE_MODE = os.environ.get("OCR_QUEUE_MODE", "inline").strip().lower()
+OCR_WORKER_CONCURRENCY = int(os.environ.get("OCR_WORKER_CONCURRENCY", "2"))
+OCR_WORKER_POLL_SECONDS = float(os.environ.get("OCR_WORKER_POLL_SECONDS", "2"))
+OCR_HEARTBEAT_SECONDS = int(os.environ.get("OCR_HEARTBEAT_SECONDS", "15"))
+OCR_HEARTBEAT_TIMEOUT_SECONDS = int(os.environ.get("OCR_HEARTBEAT_TIMEOUT_SECONDS", "60"))
+OCR_MAX_ATTEMPTS = int(os.environ.get("OCR_MAX_ATTEMPTS", "3"))
+# Workers gather up to OCR_BATCH_MAX_SIZE queued jobs per engine call, waiting at
+# most OCR_BATCH_MAX_WAIT_SECONDS for a partial batch to fill.
+OCR_BATCH_MAX_SIZE = int(os.environ.get("OCR_BATCH_MAX_SIZE", "8"))
+OCR_BATCH_MAX_WAIT_SECONDS = float(os.environ.get("OCR_BATCH_MAX_WAIT_SECONDS", "0.5"))
+# Incremental OCR splits notes into line bands (strokes closer than
+# OCR_REGION_LINE_GAP vertically share a band) and re-recognizes only the bands
+# whose strokes changed since the last run.
+OCR_INCREMENTAL = os.environ.get("OCR_INCREMENTAL", "false").strip().lower() in {
+    "1",
+    "true",
+    "yes",
+    "on",
+}
+OCR_REGION_LINE_GAP = float(os.environ.get("OCR_REGION_LINE_GAP", "12"))
+# Notes are rasterized for OCR as OCR_TILE_SIZE px grayscale tiles, and at most
+# OCR_TILE_BATCH_SIZE tiles are held in memory per engine call.
+OCR_TILE_SIZE = int(os.environ.get("OCR_TILE_SIZE", "2048"))
+OCR_TILE_BATCH_SIZE = int(os.environ.get("OCR_TILE_BATCH_SIZE", "8"))
+# OCR results are cached per stroke set; entries unused for OCR_CACHE_TTL_DAYS
+# are evicted, and the least recently used go first above OCR_CACHE_MAX_ENTRIES.
+OCR_CACHE_TTL_DAYS = float(os.environ.get("OCR_CACHE_TTL_DAYS", "30"))
+OCR_CACHE_MAX_ENTRIES = int(os.environ.get("OCR_CACHE_MAX_ENTRIES", "50000"))
+STROKE_STREAM_BATCH_SIZE = int(os.environ.get("STROKE_STREAM_BATCH_SIZE", "200"))
+STROKE_BULK_MAX_BATCHES = int(os.environ.get("STROKE_BULK_MAX_BATCHES", "1000"))
+# Most rows one page of GET /api/notebooks/{id}/notes or GET /api/notes/{id}/strokes
+# returns (also the default page size); clients follow X-Next-Cursor for more.
+NOTE_PAGE_MAX_SIZE = int(os.environ.get("NOTE_PAGE_MAX_SIZE", "200"))
+STROKE_PAGE_MAX_SIZE = int(os.environ.get("STROKE_PAGE_MAX_SIZE", "2000"))
+# Spatial index for ?bbox= stroke reads: grid cell size in note units, and the
+# most cells one stroke may cover before it is indexed as "oversized".
+STROKE_INDEX_CELL_SIZE = float(os.environ.get("STROKE_INDEX_CELL_SIZE", "512"))
+STROKE_INDEX_MAX_CELLS = int(os.environ.get("STROKE_INDEX_MAX_CELLS", "64"))
+# Simplification tolerance (note units) for ?lod=1, ?lod=2, ...; lod=0 is raw.
+STROKE_LOD_TOLERANCES = [
+    float(value)
+    for value in os.environ.get("STROKE_LOD_TOLERANCES", "1,4,16").split(",")
+    if value.strip()
+]
+# Note previews are re-rendered once stroke writes to a note pause for
+# THUMBNAIL_DEBOUNCE_SECONDS (but at least every THUMBNAIL_MAX_DELAY_SECONDS
+# while writes continue), at THUMBNAIL_SIZE px on the longer side.
+THUMBNAIL_SIZE = int(os.environ.get("THUMBNAIL_SIZE", "256"))
+THUMBNAIL_FORMAT = os.environ.get("THUMBNAIL_FORMAT", "webp").strip().lower()
+THUMBNAIL_DEBOUNCE_SECONDS = float(os.environ.get("THUMBNAIL_DEBOUNCE_SECONDS", "5"))
+THUMBNAIL_MAX_DELAY_SECONDS = float(os.environ.get("THUMBNAIL_MAX_DELAY_SECONDS", "30"))
+
+# Uploads are copied to storage in UPLOAD_CHUNK_BYTES pieces (S3 multipart parts,
+# so at least 5 MiB) with at most UPLOAD_S3_MAX_INFLIGHT_PARTS parts in flight,
+# and rejected with 413 once they pass UPLOAD_MAX_BYTES.
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = max(
+    5 * 1024 * 1024, int(os.environ.get("UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+)
+UPLOAD_S3_MAX_INFLIGHT_PARTS = int(os.environ.get("UPLOAD_S3_MAX_INFLIGHT_PARTS", "4"))
+# Uploads are stored once per distinct content. Every BLOB_GC_INTERVAL_HOURS the
+# API deletes blobs no file links to anymore, once unlinked for BLOB_GC_GRACE_HOURS.
+BLOB_GC_INTERVAL_HOURS = float(os.environ.get("BLOB_GC_INTERVAL_HOURS", "6"))
+BLOB_GC_GRACE_HOURS = float(os.environ.get("BLOB_GC_GRACE_HOURS", "24"))
 
 
 @dataclass(frozen=True)
@@ -51,6 +137,10 @@ class S3Settings:
     access_key_id: str
     secret_access_key: str
     presigned_expires: int
+    # HTTP connections kept alive per process; also the size of the thread
+    # pool S3 calls run on.
+    max_pool_connections: int
+    max_attempts: int
 
 
 def _get_s3_env(name: str) -> str:
@@ -68,20 +158,10 @@ def _load_s3_settings() -> S3Settings:
         access_key_id=_get_s3_env("S3_ACCESS_KEY_ID"),
         secret_access_key=_get_s3_env("S3_SECRET_ACCESS_KEY"),
         presigned_expires=int(os.environ.get("S3_PRESIGNED_EXPIRES", "3600")),
+        max_pool_connections=int(os.environ.get("S3_MAX_POOL_CONNECTIONS", "32")),
+        max_attempts=int(os.environ.get("S3_MAX_ATTEMPTS", "3")),
     )
 
 
 s3_settings = _load_s3_settings() if STORAGE_BACKEND == "s3" else None
 
-
-@lru_cache(maxsize=1)
-def get_s3_client():
-    if STORAGE_BACKEND != "s3" or s3_settings is None:
-        raise RuntimeError("S3 client requested but STORAGE_BACKEND is not 's3'.")
-    return boto3.client(
-        "s3",
-        region_name=s3_settings.region,
-        endpoint_url=s3_settings.endpoint_url,
-        aws_access_key_id=s3_settings.access_key_id,
-        aws_secret_access_key=s3_settings.secret_access_key,
-    )
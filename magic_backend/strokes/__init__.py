@@ -0,0 +1,55 @@
+from .codec import (
+    StrokeBatch,
+    StrokeColumns,
+    pack_stroke_batch,
+    stroke_batch_to_json,
+    unpack_stroke_batch,
+)
+from .normalize import normalize_stroke_batch
+from .raster import StrokeTile, TileLayout, iter_stroke_tiles, layout_tiles
+from .regions import (
+    PlacedStroke,
+    StrokeRegion,
+    group_line_regions,
+    place_stroke,
+    union_bounds,
+)
+from .simplify import point_count, simplify_batch
+from .spatial import (
+    OVERSIZED_CELL,
+    BBox,
+    cell_range,
+    clip_batch,
+    index_cells,
+    parse_bbox,
+)
+from .thumbnail import THUMBNAIL_CONTENT_TYPES, encode_thumbnail, render_thumbnail
+
+__all__ = [
+    "OVERSIZED_CELL",
+    "THUMBNAIL_CONTENT_TYPES",
+    "BBox",
+    "PlacedStroke",
+    "StrokeBatch",
+    "StrokeColumns",
+    "StrokeRegion",
+    "StrokeTile",
+    "TileLayout",
+    "cell_range",
+    "clip_batch",
+    "encode_thumbnail",
+    "group_line_regions",
+    "index_cells",
+    "iter_stroke_tiles",
+    "layout_tiles",
+    "normalize_stroke_batch",
+    "pack_stroke_batch",
+    "parse_bbox",
+    "place_stroke",
+    "point_count",
+    "render_thumbnail",
+    "simplify_batch",
+    "stroke_batch_to_json",
+    "union_bounds",
+    "unpack_stroke_batch",
+]
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import json
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+# Packed stroke batch layout (little-endian):
+#
+#   header   magic "MNSP", version u8, flags u8, stroke_count u32, meta_len u32
+#   meta     compact JSON: {"fields": {...}, "strokes": [{...}, ...]}
+#   strokes  per stroke: point_count u32, column flags u8, then the columns
+#            x f32[n], y f32[n], pressure f32[n]?, tilt f32[n]?, dt i16/i64[n]?
+#
+# x/y are delta-encoded (first value absolute) unless COL_ABSOLUTE_XY is set.
+# Missing pressure/tilt values are NaN; missing dt values use the dtype minimum.
+# Version 1 payloads stored wide dt as i32; version 2 widened it to i64.
+
+MAGIC = b"MNSP"
+VERSION = 2
+
+FLAG_RAW_TEXT = 0x01
+
+COL_PRESSURE = 0x01
+COL_TILT = 0x02
+COL_DT = 0x04
+COL_DT_WIDE = 0x08
+COL_ABSOLUTE_XY = 0x10
+
+_HEADER = struct.Struct("<4sBBII")
+_STROKE_HEADER = struct.Struct("<IB")
+_JSON_SEPARATORS = (",", ":")
+
+_F32 = np.dtype("<f4")
+_I16 = np.dtype("<i2")
+_I32 = np.dtype("<i4")
+_I64 = np.dtype("<i8")
+_I16_MISSING = np.iinfo(np.int16).min
+_I32_MISSING = np.iinfo(np.int32).min
+_I64_MISSING = np.iinfo(np.int64).min
+
+
+@dataclass
+class StrokeColumns:
+    """Columnar view of one stroke: parallel point arrays plus stroke attributes."""
+
+    attrs: Dict[str, Any]
+    x: np.ndarray
+    y: np.ndarray
+    pressure: np.ndarray
+    tilt: np.ndarray
+    dt: np.ndarray
+    dt_mask: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.x.shape[0])
+
+
+@dataclass
+class StrokeBatch:
+    """A decoded ``NoteStroke`` row: top-level payload fields plus its strokes."""
+
+    fields: Dict[str, Any] = field(default_factory=dict)
+    strokes: List[StrokeColumns] = field(default_factory=list)
+    raw: Optional[str] = None
+
+
+def empty_stroke(attrs: Dict[str, Any]) -> StrokeColumns:
+    return StrokeColumns(
+        attrs=attrs,
+        x=np.empty(0, dtype=np.float64),
+        y=np.empty(0, dtype=np.float64),
+        pressure=np.empty(0, dtype=np.float64),
+        tilt=np.empty(0, dtype=np.float64),
+        dt=np.empty(0, dtype=np.int64),
+        dt_mask=np.empty(0, dtype=bool),
+    )
+
+
+def batch_from_normalized(payload: Dict[str, Any]) -> StrokeBatch:
+    """Build a ``StrokeBatch`` from an already-normalized payload dict."""
+    fields = {key: value for key, value in payload.items() if key != "strokes"}
+    strokes: List[StrokeColumns] = []
+    for stroke in payload.get("strokes") or []:
+        attrs = {key: value for key, value in stroke.items() if key != "points"}
+        points = stroke.get("points") or []
+        if not points:
+            strokes.append(empty_stroke(attrs))
+            continue
+        dt_values = [point.get("dt") for point in points]
+        strokes.append(
+            StrokeColumns(
+                attrs=attrs,
+                x=np.array([point["x"] for point in points], dtype=np.float64),
+                y=np.array([point["y"] for point in points], dtype=np.float64),
+                pressure=np.array(
+                    [point.get("pressure") for point in points], dtype=np.float64
+                ),
+                tilt=np.array([point.get("tilt") for point in points], dtype=np.float64),
+                dt=np.array(
+                    [0 if value is None else value for value in dt_values], dtype=np.int64
+                ),
+                dt_mask=np.array([value is not None for value in dt_values], dtype=bool),
+            )
+        )
+    return StrokeBatch(fields=fields, strokes=strokes)
+
+
+def batch_to_normalized(batch: StrokeBatch) -> Dict[str, Any]:
+    """Inverse of ``batch_from_normalized``; builds one dict per point."""
+    if batch.raw is not None:
+        raise ValueError("Raw stroke payloads have no normalized form.")
+    strokes: List[Dict[str, Any]] = []
+    for stroke in batch.strokes:
+        pressures = [None if np.isnan(value) else value for value in stroke.pressure.tolist()]
+        tilts = [None if np.isnan(value) else value for value in stroke.tilt.tolist()]
+        points: List[Dict[str, Any]] = []
+        for x, y, pressure, tilt, dt, has_dt in zip(
+            stroke.x.tolist(),
+            stroke.y.tolist(),
+            pressures,
+            tilts,
+            stroke.dt.tolist(),
+            stroke.dt_mask.tolist(),
+        ):
+            point: Dict[str, Any] = {"x": x, "y": y, "pressure": pressure, "tilt": tilt}
+            if has_dt:
+                point["dt"] = dt
+            points.append(point)
+        strokes.append({**stroke.attrs, "points": points})
+    return {**batch.fields, "strokes": strokes}
+
+
+def _delta_encode(values: np.ndarray) -> Optional[np.ndarray]:
+    absolute = values.astype(_F32)
+    deltas = absolute.copy()
+    np.subtract(absolute[1:], absolute[:-1], out=deltas[1:])
+    # Float32 deltas only round-trip when every subtraction was exact.
+    if not np.array_equal(np.cumsum(deltas, dtype=_F32), absolute):
+        return None
+    return deltas
+
+
+def pack_stroke_batch(batch: StrokeBatch) -> bytes:
+    """Serialize a ``StrokeBatch`` into the packed binary format."""
+    if batch.raw is not None:
+        raw = batch.raw.encode("utf-8")
+        return _HEADER.pack(MAGIC, VERSION, FLAG_RAW_TEXT, 0, len(raw)) + raw
+
+    meta = json.dumps(
+        {"fields": batch.fields, "strokes": [stroke.attrs for stroke in batch.strokes]},
+        separators=_JSON_SEPARATORS,
+    ).encode("utf-8")
+    chunks: List[bytes] = [
+        _HEADER.pack(MAGIC, VERSION, 0, len(batch.strokes), len(meta)),
+        meta,
+    ]
+    for stroke in batch.strokes:
+        flags = 0
+        x_deltas = _delta_encode(stroke.x)
+        y_deltas = _delta_encode(stroke.y)
+        if x_deltas is None or y_deltas is None:
+            flags |= COL_ABSOLUTE_XY
+            columns = [stroke.x.astype(_F32).tobytes(), stroke.y.astype(_F32).tobytes()]
+        else:
+            columns = [x_deltas.tobytes(), y_deltas.tobytes()]
+        if not np.isnan(stroke.pressure).all():
+            flags |= COL_PRESSURE
+            columns.append(stroke.pressure.astype(_F32).tobytes())
+        if not np.isnan(stroke.tilt).all():
+            flags |= COL_TILT
+            columns.append(stroke.tilt.astype(_F32).tobytes())
+        if stroke.dt_mask.any():
+            flags |= COL_DT
+            present = stroke.dt[stroke.dt_mask]
+            if present.min() <= _I16_MISSING or present.max() > np.iinfo(np.int16).max:
+                flags |= COL_DT_WIDE
+                dt = np.where(stroke.dt_mask, stroke.dt, _I64_MISSING).astype(_I64)
+            else:
+                dt = np.where(stroke.dt_mask, stroke.dt, _I16_MISSING).astype(_I16)
+            columns.append(dt.tobytes())
+        chunks.append(_STROKE_HEADER.pack(len(stroke), flags))
+        chunks.extend(columns)
+    return b"".join(chunks)
+
+
+def is_packed(data: Union[bytes, bytearray, memoryview, str, None]) -> bool:
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:4]) == MAGIC
+
+
+def _unpack_legacy(data: Union[bytes, bytearray, memoryview, str]) -> StrokeBatch:
+    text = data if isinstance(data, str) else bytes(data).decode("utf-8", "replace")
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError:
+        return StrokeBatch(raw=text)
+    if not isinstance(payload, dict):
+        return StrokeBatch(raw=text)
+    return batch_from_normalized(payload)
+
+
+def unpack_stroke_batch(data: Union[bytes, bytearray, memoryview, str]) -> StrokeBatch:
+    """Decode a stored ``NoteStroke.payload`` into columnar arrays.
+
+    Rows that predate the packed format (JSON text) are decoded as well.
+    """
+    if not is_packed(data):
+        return _unpack_legacy(data)
+
+    buffer = memoryview(data)
+    _, version, flags, stroke_count, meta_len = _HEADER.unpack_from(buffer, 0)
+    if version not in (1, VERSION):
+        raise ValueError(f"Unsupported stroke payload version {version}.")
+    wide_dtype, wide_missing = (_I32, _I32_MISSING) if version == 1 else (_I64, _I64_MISSING)
+    offset = _HEADER.size
+    meta_bytes = bytes(buffer[offset : offset + meta_len])
+    offset += meta_len
+    if flags & FLAG_RAW_TEXT:
+        return StrokeBatch(raw=meta_bytes.decode("utf-8"))
+
+    meta = json.loads(meta_bytes)
+    strokes: List[StrokeColumns] = []
+    for attrs in meta["strokes"][:stroke_count]:
+        count, column_flags = _STROKE_HEADER.unpack_from(buffer, offset)
+        offset += _STROKE_HEADER.size
+
+        def take(dtype: np.dtype) -> np.ndarray:
+            nonlocal offset
+            values = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            offset += count * dtype.itemsize
+            return values
+
+        x = take(_F32)
+        y = take(_F32)
+        if not column_flags & COL_ABSOLUTE_XY:
+            x = np.cumsum(x, dtype=_F32)
+            y = np.cumsum(y, dtype=_F32)
+        pressure = take(_F32) if column_flags & COL_PRESSURE else np.full(count, np.nan, _F32)
+        tilt = take(_F32) if column_flags & COL_TILT else np.full(count, np.nan, _F32)
+        if column_flags & COL_DT:
+            wide = column_flags & COL_DT_WIDE
+            dt = take(wide_dtype if wide else _I16)
+            dt_mask = dt != (wide_missing if wide else _I16_MISSING)
+        else:
+            dt = np.zeros(count, dtype=_I16)
+            dt_mask = np.zeros(count, dtype=bool)
+        strokes.append(
+            StrokeColumns(
+                attrs=attrs,
+                x=x,
+                y=y,
+                pressure=pressure,
+                tilt=tilt,
+                dt=dt,
+                dt_mask=dt_mask,
+            )
+        )
+    return StrokeBatch(fields=meta["fields"], strokes=strokes)
+
+
+def _float_tokens(values: np.ndarray) -> np.ndarray:
+    # float32 -> str gives the shortest repr that round-trips, e.g. "100.3".
+    tokens = values.astype(_F32).astype(str)
+    missing = ~np.isfinite(values)
+    if missing.any():
+        tokens = np.where(missing, "null", tokens)
+    return tokens
+
+
+def _points_json(stroke: StrokeColumns) -> str:
+    if not len(stroke):
+        return "[]"
+    xs = _float_tokens(stroke.x).tolist()
+    ys = _float_tokens(stroke.y).tolist()
+    pressures = _float_tokens(stroke.pressure).tolist()
+    tilts = _float_tokens(stroke.tilt).tolist()
+    if stroke.dt_mask.any():
+        dts = np.where(
+            stroke.dt_mask, np.char.add(',"dt":', stroke.dt.astype(str)), ""
+        ).tolist()
+    else:
+        dts = [""] * len(stroke)
+    template = '{{"x":{},"y":{},"pressure":{},"tilt":{}{}}}'
+    return "[" + ",".join(map(template.format, xs, ys, pressures, tilts, dts)) + "]"
+
+
+def _object_json(attrs: Dict[str, Any], tail: str) -> str:
+    head = json.dumps(attrs, separators=_JSON_SEPARATORS)
+    if head == "{}":
+        return "{" + tail + "}"
+    return head[:-1] + "," + tail + "}"
+
+
+def stroke_batch_to_json(batch: StrokeBatch) -> str:
+    """Render a batch as the JSON payload clients expect, straight from the columns."""
+    if batch.raw is not None:
+        return json.dumps(batch.raw)
+    strokes = ",".join(
+        _object_json(stroke.attrs, '"points":' + _points_json(stroke))
+        for stroke in batch.strokes
+    )
+    return _object_json(batch.fields, '"strokes":[' + strokes + "]")
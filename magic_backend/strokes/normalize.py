@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .codec import StrokeBatch, StrokeColumns
+
+
+class _RawColumn:
+    """Values for one point attribute across the whole payload.
+
+    Runs of points that never carry the attribute (e.g. ``[x, y]`` pairs have
+    no pressure) are recorded as skipped spans instead of ``None`` padding, so
+    the final conversion only touches values clients actually sent.
+    """
+
+    __slots__ = ("values", "lengths", "supplied")
+
+    def __init__(self) -> None:
+        self.values: List[Any] = []
+        self.lengths: List[int] = []
+        self.supplied: List[bool] = []
+
+    def extend(self, values: List[Any]) -> None:
+        self.values.extend(values)
+        self.lengths.append(len(values))
+        self.supplied.append(True)
+
+    def skip(self, count: int) -> None:
+        self.lengths.append(count)
+        self.supplied.append(False)
+
+    def supplied_mask(self) -> np.ndarray:
+        return np.repeat(np.array(self.supplied, dtype=bool), self.lengths)
+
+
+class _RawPoints:
+    __slots__ = ("x", "y", "pressure", "tilt", "dt")
+
+    def __init__(self) -> None:
+        self.x = _RawColumn()
+        self.y = _RawColumn()
+        self.pressure = _RawColumn()
+        self.tilt = _RawColumn()
+        self.dt = _RawColumn()
+
+    def extend_dicts(self, points: List[Dict[str, Any]]) -> None:
+        self.x.extend(_dict_column(points, "x"))
+        self.y.extend(_dict_column(points, "y"))
+        self.pressure.extend(_dict_column(points, "p", "pressure"))
+        self.tilt.extend(_dict_column(points, "t", "tilt"))
+        self.dt.extend(_dict_column(points, "dt"))
+
+    def extend_pairs(self, xs: List[Any], ys: List[Any]) -> None:
+        self.x.extend(xs)
+        self.y.extend(ys)
+        self.pressure.skip(len(xs))
+        self.tilt.skip(len(xs))
+        self.dt.skip(len(xs))
+
+
+def _dict_column(
+    points: List[Dict[str, Any]], key: str, fallback: Optional[str] = None
+) -> List[Any]:
+    try:
+        return list(map(itemgetter(key), points))
+    except KeyError:
+        pass
+    if fallback is None:
+        return [point.get(key) for point in points]
+    return [point.get(key, point.get(fallback)) for point in points]
+
+
+def _extend_points(points: List[Any], raw: _RawPoints) -> None:
+    kinds = set(map(type, points))
+    if kinds == {dict}:
+        raw.extend_dicts(points)
+    elif kinds <= {list, tuple} and min(map(len, points)) >= 2:
+        raw.extend_pairs(list(map(itemgetter(0), points)), list(map(itemgetter(1), points)))
+    else:
+        for point in points:
+            if isinstance(point, dict):
+                raw.extend_dicts([point])
+            elif isinstance(point, (list, tuple)) and len(point) >= 2:
+                raw.extend_pairs([point[0]], [point[1]])
+            else:
+                raw.extend_pairs([None], [None])
+
+
+def _extend_stroke(stroke: Dict[str, Any], raw: _RawPoints) -> int:
+    x_values = stroke.get("x")
+    y_values = stroke.get("y")
+    if isinstance(x_values, list) and isinstance(y_values, list):
+        count = min(len(x_values), len(y_values))
+        raw.extend_pairs(x_values[:count], y_values[:count])
+        return count
+    candidates = stroke.get("points") or stroke.get("path") or stroke.get("segments")
+    if not candidates or not isinstance(candidates, (list, tuple)):
+        return 0
+    _extend_points(list(candidates), raw)
+    return len(candidates)
+
+
+def _float_column(raw: _RawColumn, total: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert to float64 the way ``float()`` would; missing values become NaN."""
+    result = np.full(total, np.nan, dtype=np.float64)
+    present = raw.supplied_mask()
+    values = np.array(raw.values, dtype=np.float64)
+    result[present] = values
+    if np.isnan(values).any():
+        # NaN can also be a real value; only ``None`` marks a missing entry.
+        present[present] = np.fromiter(
+            (value is not None for value in raw.values), bool, len(raw.values)
+        )
+    return result, present
+
+
+# The int64 minimum is the packed codec's missing-dt marker, so it is excluded.
+_INT64_MIN = int(np.iinfo(np.int64).min) + 1
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+
+def _coerce_int(value: Any) -> Optional[int]:
+    try:
+        result = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    # Values outside the int64 column's range are treated as missing.
+    if not _INT64_MIN <= result <= _INT64_MAX:
+        return None
+    return result
+
+
+def _int_column(raw: _RawColumn, total: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert to int64 the way ``int()`` would; unconvertible values are masked out."""
+    result = np.zeros(total, dtype=np.int64)
+    present = raw.supplied_mask()
+    try:
+        values = np.array(raw.values)
+    except (TypeError, ValueError):
+        values = None
+    # Nested lists give a 2-D array and values above int64 give uint64;
+    # both, and the reserved minimum, go through the per-value path instead.
+    if (
+        values is not None
+        and values.ndim == 1
+        and values.dtype.kind == "i"
+        and (not values.size or values.min() >= _INT64_MIN)
+    ):
+        result[present] = values
+        return result, present
+    coerced = [_coerce_int(value) for value in raw.values]
+    result[present] = [0 if value is None else value for value in coerced]
+    present[present] = np.fromiter(
+        (value is not None for value in coerced), bool, len(coerced)
+    )
+    return result, present
+
+
+def normalize_stroke_batch(payload: Dict[str, Any]) -> StrokeBatch:
+    """Normalize an uploaded stroke payload straight into columnar arrays.
+
+    Accepts every shape clients send: ``points``, ``path`` or ``segments``
+    lists of dicts or ``[x, y]`` pairs, and parallel ``x``/``y`` lists.
+    Points without an x or y value are dropped.
+    """
+    raw = _RawPoints()
+    attrs: List[Dict[str, Any]] = []
+    counts: List[int] = []
+    for stroke in payload.get("strokes") or []:
+        if not isinstance(stroke, dict):
+            continue
+        counts.append(_extend_stroke(stroke, raw))
+        attrs.append({key: value for key, value in stroke.items() if key != "points"})
+
+    total = sum(counts)
+    x, x_present = _float_column(raw.x, total)
+    y, y_present = _float_column(raw.y, total)
+    pressure, _ = _float_column(raw.pressure, total)
+    tilt, _ = _float_column(raw.tilt, total)
+    dt, dt_mask = _int_column(raw.dt, total)
+    keep = x_present & y_present
+
+    strokes: List[StrokeColumns] = []
+    bounds = np.cumsum([0] + counts).tolist()
+    for index, stroke_attrs in enumerate(attrs):
+        window = slice(bounds[index], bounds[index + 1])
+        selected = keep[window]
+        strokes.append(
+            StrokeColumns(
+                attrs=stroke_attrs,
+                x=x[window][selected],
+                y=y[window][selected],
+                pressure=pressure[window][selected],
+                tilt=tilt[window][selected],
+                dt=dt[window][selected],
+                dt_mask=dt_mask[window][selected],
+            )
+        )
+
+    fields = {key: value for key, value in payload.items() if key != "strokes"}
+    return StrokeBatch(fields=fields, strokes=strokes)
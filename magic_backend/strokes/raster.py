@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from .regions import PlacedStroke, union_bounds
+
+CANVAS_PADDING = 20
+INK = 0
+PAPER = 255
+
+
+@dataclass
+class StrokeTile:
+    """One rendered tile: grayscale pixels plus its grid position and canvas offset."""
+
+    column: int
+    row: int
+    left: int
+    top: int
+    pixels: np.ndarray
+
+
+@dataclass
+class TileLayout:
+    """Where the strokes land on a (virtual) canvas and which tiles they touch.
+
+    The full canvas is never allocated. ``cells`` is a uniform-grid spatial
+    index from tile ``(column, row)`` to the strokes whose ink reaches it.
+    """
+
+    strokes: Sequence[PlacedStroke]
+    origin: Tuple[float, float]
+    width: int
+    height: int
+    tile_size: int
+    cells: Dict[Tuple[int, int], List[int]]
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+
+def _polyline_cells(stroke: PlacedStroke, origin: np.ndarray, cell: int) -> np.ndarray:
+    """Grid cells touched by a stroke's path, inflated by its width.
+
+    Segments are sampled at half-cell spacing, so the work is bounded by the
+    path length in tiles rather than by its bounding box; a long diagonal or a
+    stroke to a stray far-away point only touches the tiles it crosses.
+    """
+    points = stroke.points - origin
+    if len(points) > 1:
+        steps = np.ceil(
+            np.hypot(*np.diff(points, axis=0).T) / (cell / 2)
+        ).astype(np.int64)
+        steps = np.maximum(steps, 1)
+        starts = np.repeat(points[:-1], steps, axis=0)
+        deltas = np.repeat(np.diff(points, axis=0) / steps[:, None], steps, axis=0)
+        offsets = np.arange(int(steps.sum())) - np.repeat(np.cumsum(steps) - steps, steps)
+        points = np.vstack((starts + deltas * offsets[:, None], points[-1:]))
+    reach = stroke.width + 1
+    corners = [points + (dx, dy) for dx in (-reach, reach) for dy in (-reach, reach)]
+    cells = np.floor_divide(np.vstack(corners), cell).astype(np.int64)
+    return np.unique(cells, axis=0)
+
+
+def layout_tiles(strokes: Sequence[PlacedStroke], tile_size: int) -> TileLayout:
+    """Index strokes into the fixed-size tiles of the canvas they span."""
+    min_x, min_y, max_x, max_y = union_bounds([stroke.bounds for stroke in strokes])
+    origin = (min_x - CANVAS_PADDING, min_y - CANVAS_PADDING)
+    width = max(1, int(math.ceil(max_x - min_x + CANVAS_PADDING * 2)))
+    height = max(1, int(math.ceil(max_y - min_y + CANVAS_PADDING * 2)))
+    columns = -(-width // tile_size)
+    rows = -(-height // tile_size)
+    cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    origin_array = np.array(origin)
+    for index, stroke in enumerate(strokes):
+        for column, row in _polyline_cells(stroke, origin_array, tile_size).tolist():
+            if 0 <= column < columns and 0 <= row < rows:
+                cells[(column, row)].append(index)
+    return TileLayout(
+        strokes=strokes,
+        origin=origin,
+        width=width,
+        height=height,
+        tile_size=tile_size,
+        cells=dict(cells),
+    )
+
+
+def draw_tile(layout: TileLayout, column: int, row: int) -> StrokeTile:
+    from PIL import Image, ImageDraw
+
+    left = column * layout.tile_size
+    top = row * layout.tile_size
+    width = min(layout.tile_size, layout.width - left)
+    height = min(layout.tile_size, layout.height - top)
+    image = Image.new("L", (width, height), color=PAPER)
+    draw = ImageDraw.Draw(image)
+    offset = np.array([-layout.origin[0] - left, -layout.origin[1] - top])
+    for index in layout.cells.get((column, row), []):
+        stroke = layout.strokes[index]
+        # Pillow accepts a flat [x0, y0, x1, y1, ...] sequence and clips to the tile.
+        translated = (stroke.points + offset).ravel().tolist()
+        if len(translated) == 2:
+            x, y = translated
+            radius = max(1, stroke.width)
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=INK, outline=INK)
+        else:
+            draw.line(translated, fill=INK, width=stroke.width, joint="curve")
+    return StrokeTile(column=column, row=row, left=left, top=top, pixels=np.asarray(image))
+
+
+def iter_stroke_tiles(layout: TileLayout) -> Iterator[StrokeTile]:
+    """Render the tiles that contain ink, row by row, one at a time."""
+    for column, row in sorted(layout.cells, key=lambda cell: (cell[1], cell[0])):
+        yield draw_tile(layout, column, row)
+
+
+def rasterize_strokes(strokes: Sequence[PlacedStroke]) -> np.ndarray:
+    """Draw strokes onto one grayscale canvas fitted to their bounds.
+
+    Allocates the whole canvas; prefer ``iter_stroke_tiles`` for notes of
+    unbounded size.
+    """
+    min_x, min_y, max_x, max_y = union_bounds([stroke.bounds for stroke in strokes])
+    size = int(math.ceil(max(max_x - min_x, max_y - min_y))) + CANVAS_PADDING * 2 + 1
+    layout = layout_tiles(strokes, max(size, 1))
+    if not layout.cells:
+        return np.full((layout.height, layout.width), PAPER, dtype=np.uint8)
+    return draw_tile(layout, 0, 0).pixels
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+Bounds = Tuple[float, float, float, float]
+
+
+@dataclass
+class PlacedStroke:
+    """One drawable stroke of a note, in note coordinates.
+
+    ``ref`` is ``(NoteStroke.id, index within that row's batch)``; stroke rows
+    are append-only, so it identifies the same ink across OCR runs.
+    """
+
+    ref: Tuple[int, int]
+    points: np.ndarray
+    width: int
+    bounds: Bounds
+
+
+@dataclass
+class StrokeRegion:
+    """A horizontal band of strokes that is rendered and recognized on its own."""
+
+    strokes: List[PlacedStroke] = field(default_factory=list)
+
+    @property
+    def bounds(self) -> Bounds:
+        return union_bounds(stroke.bounds for stroke in self.strokes)
+
+    @property
+    def key(self) -> str:
+        """Identity of the band's stroke set; unchanged bands keep their key."""
+        refs = sorted(stroke.ref for stroke in self.strokes)
+        return hashlib.sha256(repr(refs).encode("ascii")).hexdigest()
+
+
+def place_stroke(ref: Tuple[int, int], xs: np.ndarray, ys: np.ndarray, width: int) -> PlacedStroke:
+    points = np.column_stack((xs.astype(np.float64), ys.astype(np.float64)))
+    low = points.min(axis=0)
+    high = points.max(axis=0)
+    bounds = (float(low[0]), float(low[1]), float(high[0]), float(high[1]))
+    return PlacedStroke(ref=ref, points=points, width=width, bounds=bounds)
+
+
+def union_bounds(bounds: Sequence[Bounds]) -> Bounds:
+    boxes = np.array(list(bounds), dtype=np.float64).reshape(-1, 4)
+    if not len(boxes):
+        raise ValueError("No stroke data available to render.")
+    return (
+        float(boxes[:, 0].min()),
+        float(boxes[:, 1].min()),
+        float(boxes[:, 2].max()),
+        float(boxes[:, 3].max()),
+    )
+
+
+def group_line_regions(strokes: Sequence[PlacedStroke], gap: float) -> List[StrokeRegion]:
+    """Merge strokes whose vertical extents overlap (or sit within ``gap``) into bands.
+
+    Bands come back top to bottom, i.e. in reading order. Appending a stroke
+    only changes the bands its vertical extent touches, which is what lets
+    incremental OCR reuse the others.
+    """
+    regions: List[StrokeRegion] = []
+    band_bottom = None
+    for stroke in sorted(strokes, key=lambda item: (item.bounds[1], item.ref)):
+        top, bottom = stroke.bounds[1], stroke.bounds[3]
+        if band_bottom is None or top > band_bottom + gap:
+            regions.append(StrokeRegion())
+            band_bottom = bottom
+        else:
+            band_bottom = max(band_bottom, bottom)
+        regions[-1].strokes.append(stroke)
+    return regions
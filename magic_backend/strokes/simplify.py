@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+
+from .codec import StrokeBatch, StrokeColumns
+
+
+def _segment_distances(points: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Distance from each point to the segment ``start``-``end``."""
+    direction = end - start
+    length_sq = float(direction @ direction)
+    if length_sq == 0.0:
+        return np.hypot(*(points - start).T)
+    t = np.clip(((points - start) @ direction) / length_sq, 0.0, 1.0)
+    projections = start + t[:, None] * direction
+    return np.hypot(*(points - projections).T)
+
+
+def rdp_keep_mask(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Ramer–Douglas–Peucker: mask of the points to keep for ``tolerance``.
+
+    Iterative (explicit stack) so long strokes cannot hit the recursion limit;
+    each step measures a whole span with one vectorized distance computation.
+    """
+    count = len(points)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(points[first + 1 : last], points[first], points[last])
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def simplify_stroke(stroke: StrokeColumns, tolerance: float) -> StrokeColumns:
+    """Drop points within ``tolerance`` of the simplified path.
+
+    Pressure is kept at the surviving points (it drives line width); tilt and
+    dt describe the pen between samples and are dropped.
+    """
+    points = np.column_stack((stroke.x, stroke.y)).astype(np.float64)
+    keep = rdp_keep_mask(points, tolerance)
+    count = int(keep.sum())
+    return StrokeColumns(
+        attrs=stroke.attrs,
+        x=stroke.x[keep],
+        y=stroke.y[keep],
+        pressure=stroke.pressure[keep],
+        tilt=np.full(count, np.nan, dtype=np.float64),
+        dt=np.zeros(count, dtype=np.int64),
+        dt_mask=np.zeros(count, dtype=bool),
+    )
+
+
+def simplify_batch(batch: StrokeBatch, tolerance: float) -> StrokeBatch:
+    if batch.raw is not None:
+        return batch
+    strokes: List[StrokeColumns] = [
+        simplify_stroke(stroke, tolerance) for stroke in batch.strokes
+    ]
+    return StrokeBatch(fields=batch.fields, strokes=strokes)
+
+
+def point_count(batch: StrokeBatch) -> int:
+    return sum(len(stroke) for stroke in batch.strokes)
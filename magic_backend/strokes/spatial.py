@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import math
+from typing import Optional, Set, Tuple
+
+import numpy as np
+
+from .codec import StrokeBatch, StrokeColumns
+
+BBox = Tuple[float, float, float, float]
+Cell = Tuple[int, int]
+
+# Strokes whose bounding box spans more cells than the index allows are filed
+# under this cell instead, which every query matches.
+OVERSIZED_CELL: Cell = (-(2**31), -(2**31))
+
+
+def parse_bbox(text: str) -> BBox:
+    """Parse ``x0,y0,x1,y1``; corners may come in any order."""
+    parts = text.split(",")
+    if len(parts) != 4:
+        raise ValueError("bbox must be x0,y0,x1,y1")
+    x0, y0, x1, y1 = (float(part) for part in parts)
+    if not all(math.isfinite(value) for value in (x0, y0, x1, y1)):
+        raise ValueError("bbox must be finite")
+    return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+
+def stroke_bounds(stroke: StrokeColumns) -> Optional[BBox]:
+    """Bounds of the stored (float32) coordinates, or None for an empty stroke."""
+    if not len(stroke):
+        return None
+    xs = stroke.x.astype(np.float32)
+    ys = stroke.y.astype(np.float32)
+    return (float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max()))
+
+
+def cell_range(bbox: BBox, cell_size: float) -> Tuple[int, int, int, int]:
+    """Inclusive ``(cx0, cy0, cx1, cy1)`` of the grid cells a box overlaps."""
+    return (
+        math.floor(bbox[0] / cell_size),
+        math.floor(bbox[1] / cell_size),
+        math.floor(bbox[2] / cell_size),
+        math.floor(bbox[3] / cell_size),
+    )
+
+
+def index_cells(batch: StrokeBatch, cell_size: float, max_cells: int) -> Set[Cell]:
+    """Grid cells to file a stroke row under: the union over its strokes' boxes."""
+    cells: Set[Cell] = set()
+    for stroke in batch.strokes:
+        bounds = stroke_bounds(stroke)
+        if bounds is None:
+            continue
+        cx0, cy0, cx1, cy1 = cell_range(bounds, cell_size)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > max_cells:
+            cells.add(OVERSIZED_CELL)
+            continue
+        cells.update(
+            (cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)
+        )
+    return cells
+
+
+def intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def clip_batch(batch: StrokeBatch, bbox: BBox) -> StrokeBatch:
+    """Keep only the strokes whose bounding box intersects ``bbox``."""
+    if batch.raw is not None:
+        return StrokeBatch(fields=batch.fields)
+    kept = []
+    for stroke in batch.strokes:
+        bounds = stroke_bounds(stroke)
+        if bounds is not None and intersects(bounds, bbox):
+            kept.append(stroke)
+    return StrokeBatch(fields=batch.fields, strokes=kept)
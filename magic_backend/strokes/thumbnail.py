@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import io
+from typing import Sequence
+
+import numpy as np
+
+from .raster import CANVAS_PADDING, rasterize_strokes
+from .regions import PlacedStroke, union_bounds
+
+THUMBNAIL_CONTENT_TYPES = {"webp": "image/webp", "png": "image/png"}
+
+
+def render_thumbnail(strokes: Sequence[PlacedStroke], max_size: int) -> np.ndarray:
+    """Draw strokes scaled down to fit ``max_size`` px on the longer side.
+
+    Uses the OCR rasterizer on scaled copies of the strokes, so previews match
+    what OCR sees; small notes are drawn at full size rather than enlarged.
+    """
+    min_x, min_y, max_x, max_y = union_bounds([stroke.bounds for stroke in strokes])
+    extent = max(max_x - min_x, max_y - min_y, 1.0)
+    scale = min(1.0, max(1, max_size - CANVAS_PADDING * 2) / extent)
+    scaled = [
+        PlacedStroke(
+            ref=stroke.ref,
+            points=stroke.points * scale,
+            width=max(1, int(round(stroke.width * scale))),
+            bounds=tuple(value * scale for value in stroke.bounds),
+        )
+        for stroke in strokes
+    ]
+    return rasterize_strokes(scaled)
+
+
+def encode_thumbnail(pixels: np.ndarray, image_format: str) -> bytes:
+    """Encode grayscale pixels as ``webp`` or ``png``."""
+    from PIL import Image
+
+    if image_format not in THUMBNAIL_CONTENT_TYPES:
+        raise ValueError(f"Unsupported thumbnail format: {image_format}")
+    buffer = io.BytesIO()
+    if image_format == "webp":
+        Image.fromarray(pixels).save(buffer, format="WEBP", quality=80, method=4)
+    else:
+        Image.fromarray(pixels).save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
@@ -105,15 +105,25 @@ class ApiService {
   }
 
   Future<List<NoteSummary>> fetchNotes(int notebookId) async {
-    final response = await http.get(
-      _buildUri('/api/notebooks/$notebookId/notes'),
-      headers: _headers(),
-    );
+    // One page per request; X-Next-Cursor points at the next one.
+    final notes = <NoteSummary>[];
+    String? cursor;
+    do {
+      final uri = _buildUri('/api/notebooks/$notebookId/notes');
+      final response = await http.get(
+        cursor == null
+            ? uri
+            : uri.replace(queryParameters: {'cursor': cursor}),
+        headers: _headers(),
+      );
 
-    await _throwIfError(response, 'Failed to load notes');
+      await _throwIfError(response, 'Failed to load notes');
 
-    final decoded = jsonDecode(response.body) as List<dynamic>;
-    return decoded.map((note) => NoteSummary.fromJson(note)).toList();
+      final decoded = jsonDecode(response.body) as List<dynamic>;
+      notes.addAll(decoded.map((note) => NoteSummary.fromJson(note)));
+      cursor = response.headers['x-next-cursor'];
+    } while (cursor != null);
+    return notes;
   }
 
   Future<NoteDetail> fetchNoteDetail(int noteId) async {